@@ -0,0 +1,88 @@
+"""Benchmark OCR image preprocessing (tess.preprocess) against the previous implementation.
+
+Usage (from the repository root):
+    python benchmarks/bench_preprocess.py [--pages 10] [--repeat 3]
+
+Synthetic A4 pages at 300 DPI (2480x3508) are generated: a full text page,
+a sparse page (one paragraph, mostly whitespace) and a blank page. Each is
+timed through the old path (wrapper on BGR + second grayscale conversion),
+the new pipeline on the same BGR input, and the new pipeline on grayscale
+input as FileReader now supplies it (grayscale render / imread).
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import tess  # noqa: E402
+
+A4_300DPI = (3508, 2480)  # rows, cols
+
+
+def legacy_preprocess(img):
+    """The pipeline before tess.preprocess: up to three grayscale conversions and a full-resolution morphology."""
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    _, binary = cv2.threshold(gray, 200, 255, cv2.THRESH_BINARY)
+    if np.sum(binary == 255) / binary.size <= 0.7:
+        return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    _, thresh = cv2.threshold(gray, 240, 255, cv2.THRESH_BINARY_INV)
+    kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (11, 11))
+    closed = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, kernel)
+    contours, _ = cv2.findContours(closed, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    x, y, w, h = cv2.boundingRect(max(contours, key=cv2.contourArea))
+    return img[y:y + h, x:x + w]  # Cropped images were passed to OCR in colour
+
+
+def synthetic_page(lines: int, seed: int) -> np.ndarray:
+    """A BGR A4 scan with `lines` lines of text, light paper noise and a slight off-white tone."""
+    rng = np.random.default_rng(seed)
+    page = np.full(A4_300DPI + (3,), 245, dtype=np.uint8)
+    page += rng.integers(0, 8, size=page.shape, dtype=np.uint8)
+    for i in range(lines):
+        text = " ".join("".join(chr(c) for c in rng.integers(97, 123, size=rng.integers(2, 10)))
+                        for _ in range(8))
+        cv2.putText(page, text, (240, 300 + i * 70), cv2.FONT_HERSHEY_SIMPLEX, 1.6, (20, 20, 20), 3)
+    return page
+
+
+def bench(func, pages, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):  # Blank pages log a warning each
+            start = time.perf_counter()
+            for page in pages:
+                func(page)
+            elapsed = time.perf_counter() - start
+        best = min(best, elapsed)
+    return best / len(pages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=10, help="pages per kind")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    kinds = {"full text": 45, "sparse": 6, "blank": 0}
+    print(f"{'page kind':<12}{'legacy ms':>12}{'new ms':>10}{'gray in ms':>12}{'speedup':>10}")
+    for kind, lines in kinds.items():
+        pages = [synthetic_page(lines, seed) for seed in range(args.pages)]
+        legacy = bench(legacy_preprocess, pages, args.repeat)
+        new = bench(tess.preprocess, pages, args.repeat)
+        gray = bench(tess.preprocess, [tess.to_gray(page) for page in pages], args.repeat)
+        print(f"{kind:<12}{legacy * 1000:>12.2f}{new * 1000:>10.2f}{gray * 1000:>12.2f}{legacy / gray:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
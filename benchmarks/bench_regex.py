@@ -0,0 +1,134 @@
+"""Benchmark RegexDetector's single-pass scanner against one findall per pattern.
+
+Usage (from the repository root):
+    python benchmarks/bench_regex.py [--sizes 100000 1000000] [--repeat 3]
+
+Scan time is reported for growing pattern counts and text sizes, on prose
+with sparse PII and on a PII-dense CSV export, and every run checks that
+both strategies return the same per-type result dict.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from regex_detector import RegexDetector  # noqa: E402
+
+# Extra synthetic PII types used to grow the pattern count beyond the shipped file.
+EXTRA_PATTERNS = {
+    "passport": r"\b[A-PR-WY][1-9]\d\s?\d{4}[1-9]\b",
+    "voter_id": r"\b[A-Z]{3}[0-9]{7}\b",
+    "gstin": r"\b\d{2}[A-Z]{5}\d{4}[A-Z][1-9A-Z]Z[0-9A-Z]\b",
+    "vehicle": r"\b[A-Z]{2}[-\s]?\d{2}[-\s]?[A-Z]{1,2}[-\s]?\d{4}\b",
+    "upi": r"\b[a-zA-Z0-9.\-_]{2,}@(?:okaxis|oksbi|okhdfcbank|paytm|ybl)\b",
+    "pincode": r"\bPIN[:\s]*\d{6}\b",
+    "employee_id": r"\bEMP\d{6}\b",
+    "credit_card": r"\b(?:\d{4}[-\s]?){3}\d{4}\b",
+    "ipv4": r"\b(?:\d{1,3}\.){3}\d{1,3}\b",
+    "url": r"https?://[^\s]+",
+}
+
+WORDS = ("the quick brown fox jumps over lazy dog invoice account customer "
+         "address branch payment salary statement report Mumbai Delhi").split()
+
+
+def load_base_patterns():
+    with open("data/regex_patterns.json", "r", encoding="utf-8-sig") as file:
+        return json.load(file)
+
+
+def synthetic_text(size: int, seed: int = 0) -> str:
+    """Mostly prose with a sprinkling of PII-like values, similar to OCR output."""
+    rng = random.Random(seed)
+    samples = [
+        lambda: f"{rng.randint(1000, 9999)} {rng.randint(1000, 9999)} {rng.randint(1000, 9999)}",
+        lambda: "ABCDE" + str(rng.randint(1000, 9999)) + "F",
+        lambda: f"+91 {rng.randint(6000000000, 9999999999)}",
+        lambda: f"{rng.randint(6000000000, 9999999999)}",
+        lambda: f"user{rng.randint(1, 999)}@example.com",
+        lambda: "SBIN0" + str(rng.randint(100000, 999999)),
+        lambda: f"{rng.randint(10, 28)}/{rng.randint(10, 12)}/{rng.randint(1950, 2024)}",
+        lambda: f"{rng.randint(6000000000, 9999999999)}@ybl",
+    ]
+    parts = []
+    length = 0
+    while length < size:
+        token = rng.choice(samples)() if rng.random() < 0.02 else rng.choice(WORDS)
+        parts.append(token)
+        length += len(token) + 1
+    return " ".join(parts)[:size]
+
+
+def dense_text(size: int, seed: int = 0) -> str:
+    """CSV rows where nearly every field is PII, like a customer master export."""
+    rng = random.Random(seed)
+    rows = ["name,aadhaar,pan,phone,email,ifsc,dob,card"]
+    length = len(rows[0])
+    while length < size:
+        row = ",".join([
+            rng.choice(WORDS).title() + " " + rng.choice(WORDS).title(),
+            f"{rng.randint(1000, 9999)} {rng.randint(1000, 9999)} {rng.randint(1000, 9999)}",
+            "".join(rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ") for _ in range(5)) + str(rng.randint(1000, 9999)) + "F",
+            f"+91 {rng.randint(6000000000, 9999999999)}",
+            f"user{rng.randint(1, 99999)}@example.com",
+            "SBIN0" + str(rng.randint(100000, 999999)),
+            f"{rng.randint(10, 28)}/{rng.randint(10, 12)}/{rng.randint(1950, 2024)}",
+            "-".join(str(rng.randint(1000, 9999)) for _ in range(4)),
+        ])
+        rows.append(row)
+        length += len(row) + 1
+    return "\n".join(rows)[:size]
+
+
+def legacy_detect(patterns, text):
+    """The original per-pattern loop, kept here as the reference implementation."""
+    matches = {}
+    for pii_type, pattern in patterns.items():
+        found = pattern.findall(text)
+        if found:
+            matches[pii_type] = found
+    return matches
+
+
+def best_of(repeat, func, *args):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000, 4_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    base = load_base_patterns()
+    all_patterns = dict(base)
+    all_patterns.update(EXTRA_PATTERNS)
+    counts = sorted({1, 3, len(base), len(all_patterns) // 2 + len(base) // 2, len(all_patterns)})
+
+    print(f"{'text':>6} {'patterns':>8} {'chars':>10} {'per-pattern s':>14} {'single-pass s':>14} {'speedup':>8}")
+    for kind, generate in (("prose", synthetic_text), ("dense", dense_text)):
+        for size in args.sizes:
+            text = generate(size)
+            for count in counts:
+                subset = dict(list(all_patterns.items())[:count])
+                RegexDetector.set_patterns(subset)
+                legacy_time, expected = best_of(args.repeat, legacy_detect, RegexDetector.PATTERNS, text)
+                combined_time, actual = best_of(args.repeat, RegexDetector.detect, text)
+                if actual != expected:
+                    raise SystemExit(f"[ERROR] Result mismatch with {count} patterns on {size} {kind} chars")
+                print(f"{kind:>6} {count:>8} {size:>10} {legacy_time:>14.4f} {combined_time:>14.4f} "
+                      f"{legacy_time / combined_time:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
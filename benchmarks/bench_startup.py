@@ -0,0 +1,76 @@
+"""Benchmark start-up cost per detector selection.
+
+Usage (from the repository root):
+    python benchmarks/bench_startup.py [--modes startup regex small transformer] [--repeat 3]
+
+Every run starts a fresh interpreter, so module imports and model loads are
+paid in full. "startup" only imports what main.py/gui.py import before a scan
+starts (what --help or opening the GUI costs); the detector modes then load
+their models and analyze one short document. Reported times are the best of
+--repeat runs, with the peak RSS of that run.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+SAMPLE = ("Invoice for Rahul Sharma, Acme Industries Pvt Ltd, dated 12/05/2023. "
+          "PAN ABCDE1234F, phone 9876543210, email rahul.sharma@example.com.")
+
+CHILD = r"""
+import json, sys, time
+started = time.perf_counter()
+import main, pipeline, input_handler, output_handler  # noqa: F401
+imported = time.perf_counter()
+loaded = analyzed = imported
+mode = sys.argv[1]
+if mode != "startup":
+    from pii_analyzer import PIIAnalyzer
+    PIIAnalyzer.configure(mode)
+    PIIAnalyzer.load()
+    loaded = time.perf_counter()
+    PIIAnalyzer.analyze(sys.argv[2])
+    analyzed = time.perf_counter()
+try:
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+except ImportError:  # Windows
+    rss = None
+print(json.dumps({"import": imported - started, "load": loaded - imported,
+                  "first_doc": analyzed - loaded, "peak_rss_mb": rss}))
+"""
+
+
+def run_once(mode: str) -> dict:
+    started = time.perf_counter()
+    output = subprocess.run([sys.executable, "-c", CHILD, mode, SAMPLE], cwd=ROOT, check=True,
+                            stdout=subprocess.PIPE, text=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result["total"] = time.perf_counter() - started
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", default=["startup", "regex", "small", "transformer"])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'mode':<12}{'total s':>9}{'import s':>10}{'load s':>9}{'1st doc s':>11}{'peak MB':>10}")
+    for mode in args.modes:
+        try:
+            best = min((run_once(mode) for _ in range(args.repeat)), key=lambda r: r["total"])
+        except subprocess.CalledProcessError:
+            print(f"{mode:<12}  failed (model or dependency not installed?)")
+            continue
+        rss = f"{best['peak_rss_mb']:.0f}" if best["peak_rss_mb"] is not None else "-"
+        print(f"{mode:<12}{best['total']:>9.2f}{best['import']:>10.2f}{best['load']:>9.2f}"
+              f"{best['first_doc']:>11.2f}{rss:>10}")
+
+
+if __name__ == "__main__":
+    main()
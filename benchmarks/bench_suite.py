@@ -0,0 +1,317 @@
+"""Reproducible benchmark suite over a synthetic corpus with ground-truth PII labels.
+
+Usage (from the repository root):
+    python benchmarks/bench_suite.py [--scale 1] [--seed 0] [--stages regex extract preprocess scan]
+                                     [--detectors regex] [--workers N] [--output results.json]
+                                     [--compare baseline.json] [--tolerance 0.15]
+
+The corpus (see benchmarks/corpus.py) is generated once per seed/scale into
+--corpus and reused. Each stage runs offline in a fresh interpreter, so its
+peak RSS and import costs are its own:
+
+    regex       RegexDetector.detect over the plain-text documents
+    extract     FileReader.extract_text over every document
+    preprocess  tess.preprocess over the PNG/TIFF scans
+    scan        the full pipeline (discovery, extraction, detection) via ScanPipeline
+
+Every stage reports throughput, per-document latency percentiles and peak
+RSS. regex and scan also score the detected values against the labels
+(precision/recall per PII type); extract reports how many labelled values
+survive extraction, which is what catches OCR regressions. Results are
+written as JSON. With --compare, throughput and recall are checked against
+an earlier results file: the exit status is 1 if recall dropped, or if
+throughput fell by more than --tolerance.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, "..")
+sys.path.insert(0, HERE)
+sys.path.insert(0, ROOT)
+
+import corpus  # noqa: E402
+import instrumentation  # noqa: E402
+from instrumentation import InstrumentationConfig  # noqa: E402
+
+STAGES = ("regex", "extract", "preprocess", "scan")
+NER_TYPES = ("names", "orgs")  # Labelled NER types, scored when NER is enabled
+RECALL_SLACK = 1e-9
+RESULT_MARKER = "BENCH_RESULT "  # Prefix of the child's result line; workers may log to the same stdout
+
+
+def percentiles(latencies):
+    if not latencies:
+        return {}
+    ordered = sorted(latencies)
+
+    def at(fraction):
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+    return {"p50_ms": at(0.5) * 1000, "p90_ms": at(0.9) * 1000, "p99_ms": at(0.99) * 1000,
+            "max_ms": ordered[-1] * 1000, "mean_ms": sum(ordered) / len(ordered) * 1000}
+
+
+def peak_rss_mb():
+    """Peak RSS of this process and of its largest child process (MB), where the platform reports it."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None, None
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024  # Bytes on macOS, KiB on Linux
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024 / scale / 1024,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * 1024 / scale / 1024)
+
+
+class Score:
+    """True/false positives and false negatives per PII type, comparing value sets per document."""
+
+    def __init__(self, types):
+        self.types = set(types)
+        self.counts = {}
+
+    def add(self, labels: dict, detected: dict):
+        for pii_type in self.types & (set(labels) | set(detected)):
+            expected = set(labels.get(pii_type, []))
+            found = {value.strip() for value in detected.get(pii_type, [])}
+            counts = self.counts.setdefault(pii_type, {"tp": 0, "fp": 0, "fn": 0})
+            counts["tp"] += len(expected & found)
+            counts["fp"] += len(found - expected)
+            counts["fn"] += len(expected - found)
+
+    def result(self) -> dict:
+        scored = {}
+        for pii_type, c in sorted(self.counts.items()):
+            scored[pii_type] = dict(c, precision=c["tp"] / (c["tp"] + c["fp"]) if c["tp"] + c["fp"] else 1.0,
+                                    recall=c["tp"] / (c["tp"] + c["fn"]) if c["tp"] + c["fn"] else 1.0)
+        return scored
+
+
+def scored_types(detectors: str):
+    from regex_detector import RegexDetector
+    RegexDetector.ensure_loaded()
+    return list(RegexDetector.PATTERNS) + (list(NER_TYPES) if detectors != "regex" else [])
+
+
+def stage_regex(corpus_dir, manifest, args):
+    from regex_detector import RegexDetector
+    RegexDetector.ensure_loaded()
+    documents = []
+    for entry in manifest["files"]:
+        if entry["kind"] == "txt":
+            with open(os.path.join(corpus_dir, entry["path"]), "r", encoding="utf-8") as file:
+                documents.append((file.read(), entry["pii"]))
+    score = Score(RegexDetector.PATTERNS)
+    latencies = []
+    for text, labels in documents:
+        started = time.perf_counter()
+        detected = RegexDetector.detect(text)
+        latencies.append(time.perf_counter() - started)
+        score.add(labels, detected)
+    return {"documents": len(documents), "bytes": sum(len(text.encode("utf-8")) for text, _ in documents),
+            "seconds": sum(latencies), "latencies": latencies, "quality": score.result()}
+
+
+def stage_extract(corpus_dir, manifest, args):
+    from filereader import FileReader
+    latencies, total_bytes = [], 0
+    kept = {}  # kind -> [labelled values found in the text, labelled values]
+    for entry in manifest["files"]:
+        started = time.perf_counter()
+        text = FileReader.extract_text(os.path.join(corpus_dir, entry["path"]), entry["mime"])
+        latencies.append(time.perf_counter() - started)
+        total_bytes += entry["size"]
+        normalized = " ".join(text.split())
+        counts = kept.setdefault(entry["kind"], [0, 0])
+        for values in entry["pii"].values():
+            counts[0] += sum(1 for value in values if value in normalized)
+            counts[1] += len(values)
+    quality = {kind: {"values_kept": found, "values": total, "recall": found / total if total else 1.0}
+               for kind, (found, total) in sorted(kept.items())}
+    return {"documents": len(latencies), "bytes": total_bytes, "seconds": sum(latencies), "latencies": latencies,
+            "quality": quality}
+
+
+def stage_preprocess(corpus_dir, manifest, args):
+    import cv2
+    import tess
+    latencies, total_bytes = [], 0
+    for entry in manifest["files"]:
+        if entry["kind"] in ("png", "tiff"):
+            image = cv2.imread(os.path.join(corpus_dir, entry["path"]), cv2.IMREAD_GRAYSCALE)
+            started = time.perf_counter()
+            tess.preprocess(image)
+            latencies.append(time.perf_counter() - started)
+            total_bytes += image.nbytes
+    return {"documents": len(latencies), "bytes": total_bytes, "seconds": sum(latencies), "latencies": latencies}
+
+
+def stage_scan(corpus_dir, manifest, args):
+    """End to end; per-file latencies come from the pipeline's own instrumentation."""
+    from input_handler import InputHandler
+    from pipeline import ScanPipeline
+    instrumentation.configure(InstrumentationConfig(enabled=True, log_level="WARNING"))
+    labels = {os.path.normpath(os.path.join(corpus_dir, entry["path"])): entry["pii"] for entry in manifest["files"]}
+    score = Score(scored_types(args.detectors))
+    pipeline = ScanPipeline(cpu_workers=args.workers, detectors=args.detectors, tiered=args.tiered)
+    handler = InputHandler(corpus_dir)
+    files, total_bytes = 0, 0
+    started = time.perf_counter()
+    first_result = None
+    for result in pipeline.iter_results(handler.collect_files()):
+        first_result = first_result or time.perf_counter() - started
+        path = os.path.normpath(result.file_path)
+        if path not in labels:
+            continue  # manifest.json itself
+        files += 1
+        total_bytes += result.size or 0
+        score.add(labels[path], result.pii_data)
+    elapsed = time.perf_counter() - started
+    metrics = instrumentation.recorder.report()
+    file_latency = metrics["stages"].pop("file", {})
+    return {"documents": files, "bytes": total_bytes, "seconds": elapsed, "latencies": [],
+            # Histogram bucket bounds (powers of two), so coarser than the other stages' percentiles.
+            **{f"{key[:-2]}_ms": file_latency[key] * 1000 for key in ("p50_s", "p90_s", "p99_s", "max_s")
+               if key in file_latency},
+            "time_to_first_result_s": first_result, "stage_metrics": metrics["stages"],
+            "quality": score.result()}
+
+
+STAGE_FUNCTIONS = {"regex": stage_regex, "extract": stage_extract, "preprocess": stage_preprocess,
+                   "scan": stage_scan}
+
+
+def run_stage(stage, args):
+    """Run one stage in this process and print its result as JSON (called in a child interpreter)."""
+    instrumentation.configure_logging("WARNING")
+    manifest = corpus.load_or_generate(args.corpus, args.scale, args.seed)
+    with contextlib.redirect_stdout(sys.stderr):
+        wall_started = time.perf_counter()
+        result = STAGE_FUNCTIONS[stage](args.corpus, manifest, args)
+        wall = time.perf_counter() - wall_started
+    latencies = result.pop("latencies")
+    seconds = result["seconds"]
+    if latencies:
+        result.update(percentiles(latencies))
+    result["wall_s"] = wall
+    result["docs_per_s"] = result["documents"] / seconds if seconds else None
+    result["mb_per_s"] = result["bytes"] / 1e6 / seconds if seconds else None
+    result["peak_rss_mb"], result["peak_child_rss_mb"] = peak_rss_mb()
+    print(RESULT_MARKER + json.dumps(result))
+
+
+def spawn_stage(stage, args):
+    command = [sys.executable, os.path.abspath(__file__), "--run-stage", stage, "--corpus", args.corpus,
+               "--scale", str(args.scale), "--seed", str(args.seed), "--detectors", args.detectors]
+    if args.workers:
+        command += ["--workers", str(args.workers)]
+    if args.tiered:
+        command.append("--tiered")
+    completed = subprocess.run(command, cwd=ROOT, stdout=subprocess.PIPE, text=True)
+    if completed.returncode != 0:
+        return {"error": f"stage exited with status {completed.returncode}"}
+    lines = [line for line in completed.stdout.splitlines() if line.startswith(RESULT_MARKER)]
+    return json.loads(lines[-1][len(RESULT_MARKER):])
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, stdout=subprocess.PIPE,
+                                stderr=subprocess.DEVNULL, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+            "commit": commit, "time": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+
+def compare(results, baseline, tolerance):
+    """Print changes against a baseline; return True if recall dropped or throughput regressed."""
+    regressed = False
+    print(f"\n{'stage':<12}{'metric':<28}{'baseline':>12}{'current':>12}{'change':>10}")
+    for stage, current in results["stages"].items():
+        before = baseline.get("stages", {}).get(stage)
+        if not before or "error" in before or "error" in current:
+            continue
+        if before.get("docs_per_s") and current.get("docs_per_s"):
+            change = current["docs_per_s"] / before["docs_per_s"] - 1
+            flag = "  <-" if change < -tolerance else ""
+            regressed |= change < -tolerance
+            print(f"{stage:<12}{'docs/s':<28}{before['docs_per_s']:>12.2f}{current['docs_per_s']:>12.2f}"
+                  f"{change:>+9.1%}{flag}")
+        for key, quality in current.get("quality", {}).items():
+            old = before.get("quality", {}).get(key)
+            if old is None:
+                continue
+            dropped = quality["recall"] < old["recall"] - RECALL_SLACK
+            regressed |= dropped
+            if dropped or quality["recall"] != old["recall"]:
+                print(f"{stage:<12}{'recall ' + key:<28}{old['recall']:>12.4f}{quality['recall']:>12.4f}"
+                      f"{quality['recall'] - old['recall']:>+10.4f}{'  <-' if dropped else ''}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=os.path.join(ROOT, "output", "bench_corpus"))
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--detectors", choices=["regex", "small", "transformer"], default="regex",
+                        help="detectors for the scan stage")
+    parser.add_argument("--tiered", action="store_true")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--output", help="write the results JSON here")
+    parser.add_argument("--compare", metavar="BASELINE", help="results JSON of an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed throughput drop (0.15 = 15%%)")
+    parser.add_argument("--run-stage", choices=STAGES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    args.corpus = os.path.abspath(args.corpus)
+
+    if args.run_stage:
+        run_stage(args.run_stage, args)
+        return 0
+
+    manifest = corpus.load_or_generate(args.corpus, args.scale, args.seed)
+    print(f"[INFO] Corpus: {len(manifest['files'])} files in {args.corpus}"
+          + (f" (skipped: {', '.join(manifest['skipped_kinds'])})" if manifest["skipped_kinds"] else ""))
+
+    results = {"environment": environment(), "seed": args.seed, "scale": args.scale, "detectors": args.detectors,
+               "tiered": args.tiered, "skipped_kinds": manifest["skipped_kinds"], "stages": {}}
+    print(f"{'stage':<12}{'docs':>7}{'docs/s':>10}{'MB/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'peak MB':>9}{'recall':>8}")
+    for stage in args.stages:
+        result = results["stages"][stage] = spawn_stage(stage, args)
+        if "error" in result:
+            print(f"{stage:<12}  failed: {result['error']}")
+            continue
+        recalls = [q["recall"] for q in result.get("quality", {}).values()]
+        recall = f"{min(recalls):.3f}" if recalls else "-"
+        peak = max(filter(None, (result["peak_rss_mb"], result["peak_child_rss_mb"])), default=None)
+
+        def fmt(value, spec):
+            return format(value, spec) if value is not None else format("-", spec.split(".")[0])
+        print(f"{stage:<12}{result['documents']:>7}{fmt(result['docs_per_s'], '>10.1f')}"
+              f"{fmt(result['mb_per_s'], '>9.2f')}{fmt(result.get('p50_ms'), '>9.2f')}"
+              f"{fmt(result.get('p99_ms'), '>9.2f')}{fmt(peak, '>9.0f')}{recall:>8}")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+        print(f"[INFO] Results saved to {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as file:
+            baseline = json.load(file)
+        if compare(results, baseline, args.tolerance):
+            print("[WARNING] Regression against the baseline.")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,257 @@
+"""Generate a deterministic synthetic corpus with ground-truth PII labels.
+
+Usage (from the repository root):
+    python benchmarks/corpus.py OUTPUT_DIR [--scale 1.0] [--seed 0] [--kinds txt docx pdf_text ...]
+
+The same seed and scale always produce the same documents and labels. Kinds:
+plain text, DOCX, PDFs with a text layer, scanned PDFs (page images only),
+and PNG/TIFF scans with the values rendered into the image. Each document
+mixes filler prose with Aadhaar, PAN, IFSC, phone, email and date values (plus
+person and organisation names for NER), and manifest.json records what went
+into every file. Kinds whose library (python-docx, PyMuPDF) isn't installed
+are skipped and listed in the manifest.
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+import string
+import sys
+
+import cv2
+import numpy as np
+
+GENERATOR_VERSION = 1  # Bump when the output for a given seed changes
+
+KINDS = ("txt", "docx", "pdf_text", "pdf_scanned", "png", "tiff")
+BASE_COUNTS = {"txt": 200, "docx": 40, "pdf_text": 40, "pdf_scanned": 10, "png": 20, "tiff": 10}
+MIME_TYPES = {
+    "txt": "text/plain",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "pdf_text": "application/pdf",
+    "pdf_scanned": "application/pdf",
+    "png": "image/png",
+    "tiff": "image/tiff",
+}
+EXTENSIONS = {"txt": ".txt", "docx": ".docx", "pdf_text": ".pdf", "pdf_scanned": ".pdf", "png": ".png", "tiff": ".tiff"}
+
+# Scanned pages: A4 at 150 DPI, large enough type for Tesseract.
+PAGE_SIZE = (1754, 1240)  # rows, cols
+LINE_HEIGHT = 48
+MARGIN = 80
+CHARS_PER_LINE = 58
+
+FIRST_NAMES = ["Rahul", "Priya", "Amit", "Sneha", "Vikram", "Anjali", "Arjun", "Kavya", "Rohan", "Meera"]
+LAST_NAMES = ["Sharma", "Patel", "Iyer", "Reddy", "Gupta", "Nair", "Singh", "Das", "Menon", "Joshi"]
+ORGS = ["Acme Industries", "Sunrise Traders", "Bharat Logistics", "Lotus Textiles", "Indus Software"]
+BANK_CODES = ["SBIN", "HDFC", "ICIC", "UTIB", "KKBK", "PUNB"]
+FILLER = ("the customer requested an update to the account records and the branch confirmed the "
+          "details were verified against the original application form before processing the "
+          "request for the quarterly statement").split()
+
+# Sentence templates; every placeholder is one PII value.
+TEMPLATES = [
+    "Customer {names} from {orgs} can be reached at {phone} or {email}",
+    "Aadhaar number {aadhaar} was submitted with PAN {pan} on {date}",
+    "Salary is credited to the branch with IFSC {ifsc} for {names}",
+    "Please call {phone} before {date} regarding the application",
+    "The statement for {email} lists PAN {pan} and Aadhaar {aadhaar}",
+]
+
+
+def _aadhaar(rng):
+    return f"{rng.randint(2, 9)}{rng.randint(0, 999):03d} {rng.randint(0, 9999):04d} {rng.randint(0, 9999):04d}"
+
+
+def _pan(rng):
+    letters = "".join(rng.choice(string.ascii_uppercase) for _ in range(3))
+    return f"{letters}{rng.choice('PCHF')}{rng.choice(string.ascii_uppercase)}{rng.randint(0, 9999):04d}" \
+           f"{rng.choice(string.ascii_uppercase)}"
+
+
+def _ifsc(rng):
+    return f"{rng.choice(BANK_CODES)}0{rng.randint(0, 999999):06d}"
+
+
+def _phone(rng):
+    number = f"{rng.randint(6, 9)}{rng.randint(0, 999999999):09d}"
+    return f"+91 {number}" if rng.random() < 0.3 else number
+
+
+def _email(rng):
+    return f"{rng.choice(FIRST_NAMES).lower()}.{rng.choice(LAST_NAMES).lower()}{rng.randint(1, 999)}" \
+           f"@example.{rng.choice(['com', 'in', 'org'])}"
+
+
+def _date(rng):
+    return f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.randint(1960, 2024)}"
+
+
+def _name(rng):
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+VALUES = {"aadhaar": _aadhaar, "pan": _pan, "ifsc": _ifsc, "phone": _phone, "email": _email, "date": _date,
+          "names": _name, "orgs": lambda rng: rng.choice(ORGS)}
+
+
+def document(rng: random.Random, sentences: int):
+    """Return (lines, labels): prose with PII sentences mixed in, and the values per PII type."""
+    labels = {}
+    words = []
+    for _ in range(sentences):
+        if rng.random() < 0.5:
+            template = rng.choice(TEMPLATES)
+            values = {}
+            for key in VALUES:
+                if "{" + key + "}" in template:
+                    values[key] = VALUES[key](rng)
+                    labels.setdefault(key, []).append(values[key])
+            # Placeholders are whole words, so each value stays one unbreakable token when wrapping.
+            words += [word.format(**values) for word in (template + ".").split()]
+        else:
+            words += (" ".join(rng.choice(FILLER) for _ in range(rng.randint(6, 14))) + ".").split()
+
+    lines, line = [], ""
+    for word in words:
+        if line and len(line) + 1 + len(word) > CHARS_PER_LINE:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}" if line else word
+    if line:
+        lines.append(line)
+    return lines, labels
+
+
+def render_pages(lines):
+    """Grayscale page images with the lines typeset in a Hershey font."""
+    per_page = (PAGE_SIZE[0] - 2 * MARGIN) // LINE_HEIGHT
+    pages = []
+    for start in range(0, len(lines), per_page):
+        page = np.full(PAGE_SIZE, 255, dtype=np.uint8)
+        for i, line in enumerate(lines[start:start + per_page]):
+            cv2.putText(page, line, (MARGIN, MARGIN + (i + 1) * LINE_HEIGHT), cv2.FONT_HERSHEY_SIMPLEX,
+                        1.0, 0, 2, cv2.LINE_AA)
+        pages.append(page)
+    return pages
+
+
+def write_txt(path, lines):
+    with open(path, "w", encoding="utf-8", newline="\n") as file:
+        file.write("\n".join(lines) + "\n")
+
+
+def write_docx(path, lines):
+    import docx
+    document_ = docx.Document()
+    for line in lines:
+        document_.add_paragraph(line)
+    fixed = datetime.datetime(2024, 1, 1)
+    document_.core_properties.created = document_.core_properties.modified = fixed
+    document_.save(path)
+
+
+def write_pdf_text(path, lines):
+    import fitz
+    with fitz.open() as pdf:
+        per_page = 50
+        for start in range(0, len(lines), per_page):
+            page = pdf.new_page()  # A4
+            page.insert_text((50, 60), "\n".join(lines[start:start + per_page]), fontsize=10)
+        pdf.save(path, deflate=True)
+
+
+def write_pdf_scanned(path, lines):
+    import fitz
+    with fitz.open() as pdf:
+        for image in render_pages(lines):
+            page = pdf.new_page()
+            ok, encoded = cv2.imencode(".png", image)
+            page.insert_image(page.rect, stream=encoded.tobytes())
+        pdf.save(path, deflate=True)
+
+
+def write_image(path, lines):
+    cv2.imwrite(path, render_pages(lines)[0])
+
+
+WRITERS = {"txt": write_txt, "docx": write_docx, "pdf_text": write_pdf_text, "pdf_scanned": write_pdf_scanned,
+           "png": write_image, "tiff": write_image}
+SENTENCES = {"txt": (20, 400), "docx": (20, 200), "pdf_text": (40, 300), "pdf_scanned": (10, 40),
+             "png": (8, 20), "tiff": (8, 20)}
+REQUIRES = {"docx": "docx", "pdf_text": "fitz", "pdf_scanned": "fitz"}
+
+
+def available(kind: str) -> bool:
+    module = REQUIRES.get(kind)
+    if module is None:
+        return True
+    try:
+        __import__(module)
+        return True
+    except ImportError:
+        return False
+
+
+def generate(output_dir: str, scale: float = 1.0, seed: int = 0, kinds=KINDS) -> dict:
+    """Write the corpus and manifest.json into output_dir and return the manifest."""
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = {"generator_version": GENERATOR_VERSION, "seed": seed, "scale": scale, "files": [],
+                "skipped_kinds": []}
+    for kind in kinds:
+        if not available(kind):
+            print(f"[WARNING] {kind}: {REQUIRES[kind]} is not installed, skipped.")
+            manifest["skipped_kinds"].append(kind)
+            continue
+        rng = random.Random(f"{seed}:{kind}")  # Per kind, so adding a kind doesn't change the others
+        os.makedirs(os.path.join(output_dir, kind), exist_ok=True)
+        for index in range(max(1, round(BASE_COUNTS[kind] * scale))):
+            lines, labels = document(rng, rng.randint(*SENTENCES[kind]))
+            if kind in ("png", "tiff"):
+                lines = lines[:(PAGE_SIZE[0] - 2 * MARGIN) // LINE_HEIGHT]
+                labels = {key: [v for v in values if any(v in line for line in lines)]
+                          for key, values in labels.items()}
+                labels = {key: values for key, values in labels.items() if values}
+            relative = os.path.join(kind, f"{kind}_{index:05d}{EXTENSIONS[kind]}")
+            path = os.path.join(output_dir, relative)
+            WRITERS[kind](path, lines)
+            manifest["files"].append({"path": relative.replace(os.sep, "/"), "kind": kind, "mime": MIME_TYPES[kind],
+                                      "size": os.path.getsize(path), "pii": labels})
+
+    with open(os.path.join(output_dir, "manifest.json"), "w", encoding="utf-8") as file:
+        json.dump(manifest, file, indent=1)
+    return manifest
+
+
+def load_or_generate(output_dir: str, scale: float = 1.0, seed: int = 0, kinds=KINDS) -> dict:
+    """Reuse a corpus already generated with the same parameters, otherwise (re)generate it."""
+    try:
+        with open(os.path.join(output_dir, "manifest.json"), "r", encoding="utf-8") as file:
+            manifest = json.load(file)
+        kinds_present = {entry["kind"] for entry in manifest["files"]} | set(manifest["skipped_kinds"])
+        if (manifest["generator_version"], manifest["seed"], manifest["scale"]) == (GENERATOR_VERSION, seed, scale) \
+                and kinds_present == set(kinds):
+            return manifest
+    except (OSError, ValueError, KeyError):
+        pass
+    return generate(output_dir, scale, seed, kinds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("output_dir")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplies the number of documents per kind")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--kinds", nargs="+", choices=KINDS, default=list(KINDS))
+    args = parser.parse_args()
+
+    manifest = generate(args.output_dir, args.scale, args.seed, args.kinds)
+    total = sum(entry["size"] for entry in manifest["files"])
+    print(f"[INFO] {len(manifest['files'])} files ({total / 1e6:.1f} MB) written to {args.output_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
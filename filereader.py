@@ -1,15 +1,35 @@
-import pdfplumber
-from docx import Document
-from PIL import Image
-import pytesseract
-from pdf2image import convert_from_path
+import os
+import mmap
+import logging
+import codecs
+import collections
+import concurrent.futures
+from typing import Iterable, Iterator, List, Optional, Tuple
 import subprocess
-from tess import wrapper
-import cv2
-import numpy as np
-import fitz
-# Set this globally for ALL calls through this module
-pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+import threading
+import ocr_backend
+import ooxml_reader
+import instrumentation
+import limits
+
+# Format libraries (PyMuPDF, OpenCV, pdf2image) are imported by the
+# readers that need them, so importing this module doesn't load all of them.
+
+OCR_DPI = 300
+
+# Streaming extraction (iter_text_chunks)
+STREAM_THRESHOLD_BYTES = 64 * 1024 * 1024  # Larger files are scanned chunk by chunk instead of as one string
+STREAM_CHUNK_CHARS = 1_000_000             # Characters each chunk is responsible for
+CHUNK_OVERLAP_CHARS = 1024                 # Context shared by neighbouring chunks (half before, half after)
+READ_BLOCK_BYTES = 1024 * 1024
+
+# PDF page classification thresholds
+MIN_TEXT_LAYER_CHARS = 20        # Fewer non-space characters means the page is effectively a scan
+MAX_UNMAPPED_GLYPH_SHARE = 0.1   # Share of U+FFFD characters above which the text layer is unusable
+MIN_OCR_REGION_SHARE = 0.02      # Images smaller than this share of the page (logos, icons) aren't OCR'd
+MIN_OCR_REGION_SIDE = 36         # ... nor images narrower than half an inch (in points)
+
+logger = logging.getLogger(__name__)
 
 
 class FileReader:
@@ -22,18 +42,103 @@ class FileReader:
             elif mime_type == "application/pdf":
                 return FileReader._extract_from_pdf(file_path)
             elif mime_type.startswith("application/vnd.openxmlformats-officedocument"):
-                return FileReader._extract_from_docx(file_path)
+                return "".join(ooxml_reader.iter_text(file_path, mime_type))
             elif mime_type == "application/msword":
                 return FileReader._extract_from_legacy_doc(file_path)
             elif mime_type.startswith("image/"):
-                imagefile=cv2.imread(file_path)
-                return FileReader._ocr_image(imagefile)
+                import cv2
+                imagefile=cv2.imread(file_path, cv2.IMREAD_GRAYSCALE)  # OCR only needs grayscale
+                return FileReader._ocr_image(limits.fit_pixels(imagefile, file_path))
             else:
                 return ""
         except Exception as e:
-            print(f"[ERROR] Failed to extract from {file_path}: {e}")
+            logger.error("Failed to extract from %s: %s", file_path, e, extra={"file": file_path})
             return ""
 
+    @staticmethod
+    def should_stream(file_path: str) -> bool:
+        """True if the file is too large to extract into a single string."""
+        try:
+            return os.path.getsize(file_path) > STREAM_THRESHOLD_BYTES
+        except OSError:
+            return False
+
+    @staticmethod
+    def iter_text_chunks(file_path: str, mime_type: str, chunk_chars: int = STREAM_CHUNK_CHARS,
+                         overlap: int = CHUNK_OVERLAP_CHARS) -> Iterator[Tuple[int, str, int, int]]:
+        """Extract text as overlapping (offset, text, start, stop) chunks with bounded memory.
+
+        Positions refer to the text extract_text would return (before
+        stripping). See window_chunks for the chunk layout.
+        """
+        try:
+            yield from FileReader.window_chunks(FileReader._iter_pieces(file_path, mime_type), chunk_chars, overlap)
+        except Exception as e:
+            logger.error("Failed to extract from %s: %s", file_path, e, extra={"file": file_path})
+
+    @staticmethod
+    def _iter_pieces(file_path: str, mime_type: str) -> Iterator[str]:
+        """Extracted text as consecutive pieces, read incrementally where the format allows."""
+        if mime_type.startswith("text/"):
+            yield from FileReader._iter_text_file(file_path)
+        elif mime_type == "application/pdf":
+            for index, page_text in enumerate(FileReader.iter_pdf_pages(file_path)):
+                if index:
+                    yield "\n"
+                yield page_text
+        elif mime_type.startswith("application/vnd.openxmlformats-officedocument"):
+            yield from ooxml_reader.iter_text(file_path, mime_type)
+        elif mime_type == "application/msword":
+            yield from FileReader._iter_legacy_doc(file_path)
+        else:
+            text = FileReader.extract_text(file_path, mime_type)
+            if text:
+                yield text
+
+    @staticmethod
+    def window_chunks(pieces: Iterable[str], chunk_chars: int = STREAM_CHUNK_CHARS,
+                      overlap: int = CHUNK_OVERLAP_CHARS) -> Iterator[Tuple[int, str, int, int]]:
+        """Regroup text pieces into chunks of about chunk_chars characters.
+
+        Each chunk is (offset, text, start, stop): text starts at absolute
+        position offset and owns [start, stop); the owned ranges tile the
+        document. text also carries up to overlap // 2 characters on each
+        side as context, so matches crossing a boundary can be found whole
+        by whichever chunk owns their start. Boundaries fall on a line
+        break or space where possible.
+        """
+        context = overlap // 2
+        buffer = ""
+        base = start = 0  # Absolute positions of buffer[0] and of the next owned range
+        for piece in pieces:
+            buffer += piece
+            while len(buffer) - (start - base) >= chunk_chars + context:
+                limit = start - base + chunk_chars
+                cut = buffer.rfind("\n", limit - chunk_chars // 2, limit)
+                if cut == -1:
+                    cut = buffer.rfind(" ", limit - chunk_chars // 2, limit)
+                stop = base + (cut + 1 if cut != -1 else limit)
+                yield base, buffer[:stop - base + context], start, stop
+                keep = max(0, stop - context - base)
+                buffer = buffer[keep:]
+                base += keep
+                start = stop
+        if len(buffer) > start - base:
+            yield base, buffer, start, base + len(buffer)
+
+    @staticmethod
+    def _iter_text_file(file_path: str) -> Iterator[str]:
+        """Decode a text file block by block through a memory map."""
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+        with open(file_path, "rb") as file:
+            size = os.fstat(file.fileno()).st_size
+            if size == 0:
+                return
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                for position in range(0, size, READ_BLOCK_BYTES):
+                    yield decoder.decode(mapped[position:position + READ_BLOCK_BYTES])
+        yield decoder.decode(b"", final=True)
+
     @staticmethod
     def _read_text(file_path: str) -> str:
         with open(file_path, 'r', encoding='utf-8', errors='ignore') as file:
@@ -41,71 +146,178 @@ class FileReader:
 
     @staticmethod
     def _extract_from_pdf(file_path: str) -> str:
-        """Extracts text from a PDF using pdfplumber and OCR for image-heavy pages."""
-        full_text = ""
+        """Extracts text from a PDF using its text layer and OCR for image-heavy pages."""
+        return "\n".join(FileReader.extract_pdf_pages(file_path)).strip()
 
-        with pdfplumber.open(file_path) as pdf:
-            for page_number, page in enumerate(pdf.pages, start=1):
-                # Extract text using pdfplumber
-                text = page.extract_text()
+    @staticmethod
+    def extract_pdf_pages(file_path: str, ocr_workers: Optional[int] = None) -> List[str]:
+        """Return the text of every page, in page order."""
+        return list(FileReader.iter_pdf_pages(file_path, ocr_workers))
 
-                # If text is found AND no images, use pdfplumber text only
-                if text and not page.images:
-                    full_text += text + "\n"
-                else:
-                    print(f"[INFO] Page {page_number} contains images or no text, performing OCR...")
-                    full_text += FileReader._ocr_pdf_page(file_path, page_number)
-        return full_text.strip()
+    @staticmethod
+    def iter_pdf_pages(file_path: str, ocr_workers: Optional[int] = None) -> Iterator[str]:
+        """Yield the text of every page, in page order, as soon as it is complete.
+
+        The document is opened once and each page is classified (see
+        classify_pdf_page). Regions and pages that need OCR are rendered here
+        (PyMuPDF is not thread-safe) and OCR'd on a thread pool, since
+        Tesseract and OpenCV do their work outside the GIL. At most a few
+        rendered images, and only the pages still waiting on them, are held
+        in memory at a time.
+        """
+        import fitz
+        workers = ocr_workers or ocr_backend.get_config().workers
+        counts = collections.Counter()
+        max_pages = limits.get_limits().max_pages
+        with fitz.open(file_path) as pdf_document:
+            # Per page, the native text followed by one slot per OCR'd image.
+            page_parts = {}
+            next_page = 0
+            with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+                in_flight = {}
+                for index, page in enumerate(pdf_document):
+                    if max_pages and index >= max_pages:
+                        limits.hit(file_path, "max_pages", f"only the first {max_pages} of "
+                                                           f"{pdf_document.page_count} pages were read")
+                        break
+                    kind, text, regions = FileReader.classify_pdf_page(page)
+                    counts[kind] += 1
+                    page_parts[index] = [text] if kind in ("text", "mixed") else []
+                    with instrumentation.stage("pdf_render"):
+                        images = [FileReader._render_page(page, file_path=file_path)] if kind == "ocr" \
+                            else [FileReader._render_page(page, clip=region, file_path=file_path) for region in regions]
+
+                    for image in images:
+                        in_flight[executor.submit(FileReader._ocr_image, image)] = (index, len(page_parts[index]))
+                        page_parts[index].append(None)
+                        if len(in_flight) >= workers * 2:
+                            FileReader._collect_ocr(in_flight, page_parts, concurrent.futures.FIRST_COMPLETED)
+                    next_page = yield from FileReader._finished_pages(page_parts, next_page)
+                FileReader._collect_ocr(in_flight, page_parts, concurrent.futures.ALL_COMPLETED)
+                yield from FileReader._finished_pages(page_parts, next_page)
+
+        for kind, pages in counts.items():
+            instrumentation.count(f"pdf_pages_{kind}", pages)  # text / mixed / ocr / empty
+        logger.info("%s: %d pages - %d text layer, %d text layer + image OCR, %d full-page OCR, %d empty",
+                    file_path, sum(counts.values()), counts["text"], counts["mixed"], counts["ocr"], counts["empty"],
+                    extra={"file": file_path, "pages": dict(counts)})
 
     @staticmethod
-    def _ocr_pdf_page(file_path: str, page_number: int) -> str:
-        """Extracts the entire page as an image and runs OCR."""
-        extracted_text = ""
+    def _finished_pages(page_parts: dict, next_page: int):
+        """Yield (and forget) leading pages whose OCR is done; returns the next page to wait for."""
+        while next_page in page_parts and None not in page_parts[next_page]:
+            yield "\n".join(part for part in page_parts.pop(next_page) if part)
+            next_page += 1
+        return next_page
 
-        # Open the PDF using PyMuPDF
-        pdf_document = fitz.open(file_path)
-        page = pdf_document[page_number - 1]  # PyMuPDF is 0-indexed, pdfplumber is 1-indexed
+    @staticmethod
+    def classify_pdf_page(page) -> Tuple[str, str, list]:
+        """Decide how to read a page: returns (kind, native_text, image_regions_to_ocr).
 
-        # Convert the entire page to an image
-        pix = page.get_pixmap(dpi=300)  # Render at 300 DPI for better OCR accuracy
-        image_pil = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+        kind is one of:
+          * "text"  - the text layer is complete, images (logos, icons) are ignored
+          * "mixed" - use the text layer and OCR only the images large enough to hold text
+          * "ocr"   - the text layer is missing or unusable, OCR the whole page
+          * "empty" - nothing to read
+        """
+        import fitz
+        text = page.get_text("text")
+        chars = sum(1 for c in text if not c.isspace())
+        page_area = abs(page.rect) or 1.0
 
-        # Convert to OpenCV format
-        image_cv = cv2.cvtColor(np.array(image_pil), cv2.COLOR_RGB2BGR)
+        regions = []
+        for info in page.get_image_info():
+            rect = fitz.Rect(info["bbox"]) & page.rect
+            if rect.is_empty:
+                continue
+            if abs(rect) / page_area >= MIN_OCR_REGION_SHARE and min(rect.width, rect.height) >= MIN_OCR_REGION_SIDE:
+                regions.append(rect)
 
-        # Perform OCR on the entire page
-        ocr_text = FileReader._ocr_image(image_cv)
-        extracted_text += ocr_text + "\n"
+        # Font/glyph signals: Tesseract's invisible "GlyphLessFont" means the page was
+        # already OCR'd into its text layer; unmapped glyphs (U+FFFD) mean the layer is garbage.
+        already_ocred = any("GlyphLessFont" in font[3] for font in page.get_fonts())
+        garbled = chars and text.count("\ufffd") / chars > MAX_UNMAPPED_GLYPH_SHARE
 
-        print(f"[INFO] OCR completed for full page {page_number}.")
+        if chars >= MIN_TEXT_LAYER_CHARS and not garbled:
+            if already_ocred or not regions:
+                return "text", text, []
+            regions.sort(key=lambda r: (r.y0, r.x0))  # Reading order for the merged text
+            return "mixed", text, regions
+        if regions or garbled or page.get_images() or page.get_drawings():
+            return "ocr", "", []  # Scanned page, unusable text layer or text drawn as vector paths
+        return "empty", text, []
 
-        pdf_document.close()
-        return extracted_text.strip()
+    @staticmethod
+    def _collect_ocr(in_flight: dict, page_parts: dict, return_when: str):
+        done, _pending = concurrent.futures.wait(in_flight, return_when=return_when)
+        for future in done:
+            index, slot = in_flight.pop(future)
+            page_parts[index][slot] = future.result()
 
     @staticmethod
-    def _extract_from_docx(file_path: str) -> str:
-        doc = Document(file_path)
-        return "\n".join(para.text for para in doc.paragraphs)
+    def _render_page(page, clip=None, file_path: str = ""):
+        """Render a PyMuPDF page (or a region of it) straight to a grayscale image for OCR."""
+        import fitz
+        import numpy as np
+        # Render at 300 DPI for better OCR accuracy, less for pages too large to OCR whole
+        area = clip or page.rect
+        dpi = limits.render_dpi(area.width, area.height, OCR_DPI, file_path)
+        matrix = fitz.Matrix(dpi / 72, dpi / 72)
+        pix = page.get_pixmap(matrix=matrix, clip=clip, colorspace=fitz.csGRAY, alpha=False)
+        return np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width)
 
     @staticmethod
     def _extract_from_legacy_doc(file_path: str) -> str:
-        result = subprocess.run(["catdoc", file_path], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        timeout = limits.get_limits().catdoc_timeout
+        try:
+            result = subprocess.run(["catdoc", file_path], stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                    timeout=timeout or None)
+        except subprocess.TimeoutExpired:
+            limits.hit(file_path, "catdoc_timeout", f"catdoc killed after {timeout:g}s")
+            return ""
         return result.stdout.decode("utf-8", errors='ignore')
 
+    @staticmethod
+    def _iter_legacy_doc(file_path: str) -> Iterator[str]:
+        """Stream catdoc's output instead of buffering all of it; catdoc is killed once catdoc_timeout runs out."""
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+        timeout = limits.get_limits().catdoc_timeout
+        with subprocess.Popen(["catdoc", file_path], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL) as process:
+            killed = threading.Event()
+
+            def kill():
+                killed.set()
+                process.kill()
+
+            timer = threading.Timer(timeout, kill) if timeout else None
+            if timer:
+                timer.start()
+            try:
+                while block := process.stdout.read(READ_BLOCK_BYTES):
+                    yield decoder.decode(block)
+            finally:
+                if timer:
+                    timer.cancel()
+            if killed.is_set():
+                limits.hit(file_path, "catdoc_timeout", f"catdoc killed after {timeout:g}s, its output so far kept")
+        yield decoder.decode(b"", final=True)
+
     @staticmethod
     def _ocr_image(imagefile):
-        image=imagefile
-        image,flag=wrapper(image)
-        if flag==0:
-            image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        # Perform OCR
-        text = pytesseract.image_to_string(image)
-        return text.strip()
+        with instrumentation.stage("ocr_page"):
+            # Grayscale (once) and crop whitespace
+            from tess import preprocess
+            with instrumentation.stage("ocr_preprocess"):
+                image = preprocess(imagefile)
+            if image is None:
+                return ""
+            # Perform OCR
+            text = ocr_backend.image_to_string(image)
+            return text.strip()
 
     @staticmethod
     def extract_from_scanned_pdf(file_path: str) -> str:
+        import numpy as np
+        from pdf2image import convert_from_path
         images = convert_from_path(file_path)
-        text = ""
-        for img in images:
-            text += pytesseract.image_to_string(img)
-        return text
+        return "".join(ocr_backend.image_to_string(np.asarray(img.convert("L"))) for img in images)
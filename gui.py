@@ -1,86 +1,224 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox, scrolledtext
+import time
+import queue
 import threading
-import concurrent.futures
+import collections
 
 # Import your modules as in your original code
 from input_handler import InputHandler    # Module 1
-from filereader import FileReader          # Module 2
-from pii_analyzer import PIIAnalyzer        # Module 3
-from output_handler import OutputHandler    # Module 5
+from output_handler import CsvResultSink, JsonlResultSink, QuarantineSink  # Module 5
+from pipeline import ScanPipeline, DEFAULT_DETECTORS  # Modules 2 & 3
+from ner_detector import DETECTOR_MODELS
+import instrumentation
 
+POLL_MS = 100               # How often the Tk main loop drains the result queue
+MAX_EVENTS_PER_POLL = 500   # Upper bound on work per poll, so the UI stays responsive
+LOG_MAX_LINES = 5000        # Older log lines are dropped beyond this
+RATE_WINDOW_SECONDS = 10.0  # Throughput is averaged over this recent window
 
-def process_file(file_path, mime_type):
-    """Process a single file - Extract text & Detect PII."""
-    reader = FileReader()
-    extracted_text = reader.extract_text(file_path, mime_type)
-    
-    
-    if not extracted_text.strip():
-        return (file_path, {})
 
-    # PII Detection
-    pii_results = PIIAnalyzer.analyze(extracted_text)
-    return (file_path, pii_results)
+class ScanProgress:
+    """Files/bytes done and the rates derived from them (no Tk, updated from the main loop)."""
 
+    def __init__(self):
+        self.started = time.monotonic()
+        self.files = 0
+        self.bytes = 0
+        self.with_pii = 0
+        self._samples = collections.deque([(self.started, 0, 0)])
 
-def run_processing(directory, max_depth, include_hidden, log_widget):
-    """Main processing function to be run in a separate thread."""
+    def add(self, result):
+        self.files += 1
+        self.bytes += result.size or 0
+        self.with_pii += bool(result.pii_data)
+
+    def sample(self):
+        now = time.monotonic()
+        self._samples.append((now, self.files, self.bytes))
+        while len(self._samples) > 2 and now - self._samples[1][0] >= RATE_WINDOW_SECONDS:
+            self._samples.popleft()
+
+    def rates(self):
+        """(files/sec, bytes/sec) over the recent window."""
+        (t0, files0, bytes0), (t1, files1, bytes1) = self._samples[0], self._samples[-1]
+        elapsed = t1 - t0
+        if elapsed <= 0:
+            return 0.0, 0.0
+        return (files1 - files0) / elapsed, (bytes1 - bytes0) / elapsed
+
+    def eta(self, files_found: int):
+        """Seconds left for the files found so far, or None without a rate yet."""
+        files_per_second, _ = self.rates()
+        if not files_per_second:
+            return None
+        return max(0, files_found - self.files) / files_per_second
+
+
+def format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+
+def run_processing(directory, max_depth, include_hidden, cpu_workers, detectors, events, stop):
+    """Scan in a background thread, sending events to the Tk main loop through `events`.
+
+    Tk widgets are not thread-safe, so this function never touches them:
+    it puts ("result", ScanResult), then ("done", stats) or ("error", message).
+    """
     try:
-        max_depth = int(max_depth)
-        max_depth = None if max_depth == -1 else max_depth
-    except ValueError:
-        messagebox.showerror("Invalid Input", "Max depth must be an integer.")
-        return
+        # === Module 1: Collect Files ===
+        # Files are processed as soon as they are discovered, while traversal continues.
+        input_handler = InputHandler(directory, max_depth=max_depth, include_hidden=include_hidden)
+        events.put(("started", input_handler))
+        files_with_mime = input_handler.collect_files()
 
-    # === Module 1: Collect Files ===
-    input_handler = InputHandler(directory, max_depth=max_depth, include_hidden=include_hidden)
-    files_with_mime = input_handler.collect_files()
-    if not files_with_mime:
-        log_widget.insert(tk.END, "No valid files detected.\n")
-        return
+        # === Modules 2, 3 & 5: Parallel Processing, Streaming Results to the Reports ===
+        pipeline = ScanPipeline(cpu_workers=cpu_workers, detectors=detectors)
+        with CsvResultSink("output/pii_results.csv") as csv_sink, JsonlResultSink("output/pii_results.jsonl") as jsonl_sink, \
+                QuarantineSink("output/pii_results.quarantine.jsonl") as quarantine_sink:
+            for result in pipeline.iter_results(files_with_mime, stop=stop):
+                csv_sink.write(result)
+                jsonl_sink.write(result)
+                quarantine_sink.write(result)
+                events.put(("result", result))
+        files_with_mime.close()  # Stops traversal if the scan was cancelled
+        events.put(("done", dict(input_handler.stats, **pipeline.dedup_stats)))
+    except Exception as e:
+        events.put(("error", str(e)))
+
+
+class ScanView:
+    """Connects one scan's event queue to the widgets; all methods run on the Tk main loop."""
+
+    def __init__(self, root, log_widget, status_var, start_button, cancel_button):
+        self.root = root
+        self.log_widget = log_widget
+        self.status_var = status_var
+        self.start_button = start_button
+        self.cancel_button = cancel_button
+        self.events = queue.Queue()
+        self.stop = threading.Event()
+        self.progress = ScanProgress()
+        self.input_handler = None  # Its live discovery stats are read (never written) here
+
+    def start(self, *scan_args):
+        self.log_widget.delete("1.0", tk.END)
+        self.log("Scanning for potential PII files. Processing in parallel...\nResults:\n")
+        self.start_button.config(state=tk.DISABLED)
+        self.cancel_button.config(state=tk.NORMAL)
+        threading.Thread(target=run_processing, args=(*scan_args, self.events, self.stop), daemon=True).start()
+        self.root.after(POLL_MS, self.poll)
 
-    log_widget.insert(tk.END, f"Found {len(files_with_mime)} potential PII files. Processing in parallel...\n")
-    log_widget.see(tk.END)
+    def cancel(self):
+        self.stop.set()
+        self.cancel_button.config(state=tk.DISABLED)
+        self.status_var.set("Cancelling: finishing the files already being scanned...")
 
-    # === Modules 2 & 3: Parallel Processing ===
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        results = list(executor.map(lambda f: process_file(*f), files_with_mime))
+    def poll(self):
+        """Drain queued events in one batch and update the log and progress once."""
+        lines = []
+        finished = None
+        for _ in range(MAX_EVENTS_PER_POLL):
+            try:
+                kind, payload = self.events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "result":
+                self.progress.add(payload)
+                if payload.quarantined:
+                    lines.append(f"File: {payload.file_path}\nQuarantined: {'; '.join(payload.limits.values())}\n\n")
+                elif payload.pii_data:
+                    lines.append(f"File: {payload.file_path}\nPII: {payload.pii_data}\n\n")
+                else:
+                    lines.append(f"File: {payload.file_path}\nNo PII detected.\n\n")
+            elif kind == "started":
+                self.input_handler = payload
+            else:
+                finished = (kind, payload)
+                break
 
-    log_widget.insert(tk.END, "Processing complete.\n\n")
-    log_widget.see(tk.END)
+        if lines:
+            self.log("".join(lines))
+        self.progress.sample()
+        self.show_progress()
+        if finished:
+            self.finish(*finished)
+        else:
+            self.root.after(POLL_MS, self.poll)
+
+    def show_progress(self):
+        progress = self.progress
+        files_per_second, bytes_per_second = progress.rates()
+        found = self.input_handler.stats["files_collected"] if self.input_handler else 0
+        eta = progress.eta(found)
+        status = (f"{progress.files}/{found} files ({progress.with_pii} with PII) | "
+                  f"{files_per_second:.1f} files/s | {bytes_per_second / 1e6:.2f} MB/s | "
+                  f"elapsed {format_duration(time.monotonic() - progress.started)}")
+        if eta is not None:
+            status += f" | ETA {format_duration(eta)} (for files found so far)"
+        if not self.stop.is_set():
+            self.status_var.set(status)
 
-    # === Displaying Results ===
-    log_widget.insert(tk.END, "Results:\n")
-    for file_path, pii_results in results:
-        if pii_results:
-            log_widget.insert(tk.END, f"File: {file_path}\nPII: {pii_results}\n\n")
+    def finish(self, kind, payload):
+        if kind == "error":
+            self.log(f"[ERROR] Scan failed: {payload}\n")
+        elif not payload["files_collected"]:
+            self.log("No valid files detected.\n")
         else:
-            log_widget.insert(tk.END, f"File: {file_path}\nNo PII detected.\n\n")
-    log_widget.see(tk.END)
+            cancelled = "Cancelled" if self.stop.is_set() else "Processing complete"
+            self.log(f"{cancelled}. {self.progress.files} of {payload['files_collected']} potential PII files "
+                     f"scanned in {payload['directories']} directories.\n")
+            if payload["duplicates"]:
+                self.log(f"{payload['duplicates']} duplicate files reused an earlier scan, saving "
+                         f"{payload['bytes_saved'] / 1e6:.1f} MB and about {payload['seconds_saved']:.1f}s.\n")
+        self.status_var.set(f"{self.progress.files} files scanned in "
+                            f"{format_duration(time.monotonic() - self.progress.started)}.")
+        self.start_button.config(state=tk.NORMAL)
+        self.cancel_button.config(state=tk.DISABLED)
 
-    # === Module 5: Save & Display Results (optional) ===
-    OutputHandler.display_summary(results)
-    OutputHandler.save_to_csv(results)
-    OutputHandler.save_to_json(results)
+    def log(self, text):
+        """Append to the log, keeping at most LOG_MAX_LINES lines so memory and redraws stay flat."""
+        self.log_widget.insert(tk.END, text)
+        excess = int(self.log_widget.index("end-1c").split(".")[0]) - LOG_MAX_LINES
+        if excess > 0:
+            self.log_widget.delete("1.0", f"{excess + 1}.0")
+        self.log_widget.see(tk.END)
 
 
-def start_processing(log_widget, directory_entry, depth_entry, hidden_var):
+def start_processing(views, root, log_widget, status_var, start_button, cancel_button,
+                     directory_entry, depth_entry, hidden_var, workers_entry, detectors_var):
     """Callback for the Start Processing button."""
     directory = directory_entry.get()
     if not directory:
         messagebox.showerror("Input Error", "Please select a directory.")
         return
 
-    max_depth = depth_entry.get()
-    include_hidden = bool(hidden_var.get())
+    try:
+        max_depth = int(depth_entry.get())
+        max_depth = None if max_depth == -1 else max_depth
+    except ValueError:
+        messagebox.showerror("Invalid Input", "Max depth must be an integer.")
+        return
+
+    workers = workers_entry.get()
+    try:
+        cpu_workers = int(workers) if workers.strip() else None
+    except ValueError:
+        messagebox.showerror("Invalid Input", "Workers must be an integer.")
+        return
 
     # Start processing in a separate thread to avoid blocking the GUI.
-    threading.Thread(
-        target=run_processing, 
-        args=(directory, max_depth, include_hidden, log_widget),
-        daemon=True
-    ).start()
+    view = ScanView(root, log_widget, status_var, start_button, cancel_button)
+    views["current"] = view
+    view.start(directory, max_depth, bool(hidden_var.get()), cpu_workers, detectors_var.get())
+
+
+def cancel_processing(views):
+    """Callback for the Cancel button: stop scheduling new files."""
+    if views.get("current"):
+        views["current"].cancel()
 
 
 def browse_directory(directory_entry):
@@ -93,8 +231,10 @@ def browse_directory(directory_entry):
 
 def create_gui():
     """Sets up the main GUI window."""
+    instrumentation.configure_logging()
     root = tk.Tk()
     root.title("PII File Scanner")
+    views = {}
 
     # Input frame for parameters.
     input_frame = tk.Frame(root)
@@ -115,15 +255,36 @@ def create_gui():
     hidden_var = tk.IntVar()
     tk.Checkbutton(input_frame, text="Include hidden files", variable=hidden_var).grid(row=2, column=1, sticky="w")
 
-    # Start button.
-    tk.Button(root, text="Start Processing", 
-              command=lambda: start_processing(log_widget, directory_entry, depth_entry, hidden_var)
-             ).pack(pady=5)
+    # Worker processes for extraction and detection.
+    tk.Label(input_frame, text="Worker processes (blank for one per CPU):").grid(row=3, column=0, sticky="e")
+    workers_entry = tk.Entry(input_frame, width=10)
+    workers_entry.grid(row=3, column=1, sticky="w", padx=5)
+
+    # Detectors: models are only loaded (in the workers) once a scan starts.
+    tk.Label(input_frame, text="Detectors:").grid(row=4, column=0, sticky="e")
+    detectors_var = tk.StringVar(value=DEFAULT_DETECTORS)
+    tk.OptionMenu(input_frame, detectors_var, *DETECTOR_MODELS).grid(row=4, column=1, sticky="w", padx=5)
+
+    # Start and cancel buttons.
+    button_frame = tk.Frame(root)
+    button_frame.pack(pady=5)
+    start_button = tk.Button(button_frame, text="Start Processing")
+    start_button.pack(side=tk.LEFT, padx=5)
+    cancel_button = tk.Button(button_frame, text="Cancel", state=tk.DISABLED, command=lambda: cancel_processing(views))
+    cancel_button.pack(side=tk.LEFT, padx=5)
+
+    # Progress: files/sec, bytes/sec and ETA.
+    status_var = tk.StringVar(value="Ready.")
+    tk.Label(root, textvariable=status_var, anchor="w").pack(fill=tk.X, padx=10)
 
     # Scrolled text area to display logs and results.
     log_widget = scrolledtext.ScrolledText(root, width=80, height=20)
     log_widget.pack(padx=10, pady=10)
 
+    start_button.config(command=lambda: start_processing(views, root, log_widget, status_var, start_button,
+                                                         cancel_button, directory_entry, depth_entry, hidden_var,
+                                                         workers_entry, detectors_var))
+
     root.mainloop()
 
 
@@ -1,15 +1,41 @@
 import os
+import queue
+import logging
 import ctypes
-from typing import List, Optional, Tuple
-import magic
+import hashlib
+import threading
+import collections
+from stat import S_ISREG
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+from mime_classifier import MimeClassifier
+
+_WALKER_DONE = object()  # Sentinel each walker puts on the result queue when it exits
+
+logger = logging.getLogger(__name__)
+
+
+def shard_of(path: str, shard_count: int) -> int:
+    """Stable shard number of a path, the same on every host and Python run."""
+    digest = hashlib.blake2b(path.replace(os.sep, "/").encode("utf-8", "surrogateescape"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % shard_count
 
 
 class InputHandler:
-    def __init__(self, base_path: str, max_depth: Optional[int] = None, include_hidden: bool = False):
+    def __init__(self, base_path: str, max_depth: Optional[int] = None, include_hidden: bool = False,
+                 walkers: int = 8, queue_size: int = 1000, include_globs: Optional[Iterable[str]] = None,
+                 exclude_globs: Optional[Iterable[str]] = None, max_file_size: Optional[int] = None,
+                 shard: Optional[Tuple[int, int]] = None):
         self.base_path = base_path
         self.max_depth = max_depth
         self.include_hidden = include_hidden
-        self.mime_detector = magic.Magic(mime=True)
+        self.walkers = max(1, walkers)
+        self.queue_size = queue_size
+        self.stats = {"directories": 0, "files_seen": 0, "files_collected": 0, "errors": 0}
+        self.classifier = MimeClassifier(include_globs, exclude_globs, max_file_size)  # Shared by all walkers
+        # (index, count): only keep files whose path relative to base_path hashes to this shard.
+        self.shard = shard
+        self._stats_lock = threading.Lock()
 
         # Windows hidden file attribute constant
         self.FILE_ATTRIBUTE_HIDDEN = 0x02  # Windows API constant for hidden files
@@ -25,35 +51,202 @@ class InputHandler:
             "image/tiff",
         ]
 
-    def collect_files(self) -> List[Tuple[str, str]]:
-        """Traverse the directory and collect (file_path, mime_type) tuples."""
-        return self._traverse(self.base_path, current_depth=0)
+    def collect_files(self, progress_callback: Optional[Callable[[dict], None]] = None,
+                      progress_every: int = 1000) -> Iterator[Tuple[str, str]]:
+        """Traverse the directory and yield (file_path, mime_type) tuples as they are found.
+
+        Directories are listed by a pool of walker threads working off a
+        shared queue instead of recursion, so depth is unbounded and slow
+        (network) directories don't hold up the rest of the tree. Files go
+        through a bounded queue: walkers pause when the consumer falls
+        behind, and processing can start while traversal is still running.
+        progress_callback receives a copy of self.stats every progress_every
+        collected files and once at the end.
+        """
+        self.stats = {"directories": 0, "files_seen": 0, "files_collected": 0, "errors": 0}
+        directories = collections.deque([(self.base_path, 0)])
+        condition = threading.Condition()
+        outstanding = [1]  # Directories queued or being listed
+        found = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+
+        def walker():
+            try:
+                while True:
+                    with condition:
+                        while not directories and outstanding[0] and not stop.is_set():
+                            condition.wait()
+                        if stop.is_set() or not directories:
+                            break
+                        path, depth = directories.popleft()
+
+                    subdirectories = []
+                    try:
+                        subdirectories = self._scan_directory(path, depth, found, stop)
+                    except Exception as e:
+                        # Lose this directory, not the walker - the others would wait for it forever.
+                        logger.error("Could not list %s: %s", path, e, extra={"directory": path})
+                        with self._stats_lock:
+                            self.stats["errors"] += 1
+                    finally:
+                        with condition:
+                            directories.extend(subdirectories)
+                            outstanding[0] += len(subdirectories) - 1
+                            condition.notify_all()
+            finally:
+                self._put(found, _WALKER_DONE, stop)  # The consumer counts these to know when to finish
+
+        threads = [threading.Thread(target=walker, daemon=True) for _ in range(self.walkers)]
+        for thread in threads:
+            thread.start()
+
+        try:
+            finished = yielded = 0
+            while finished < len(threads):
+                item = found.get()
+                if item is _WALKER_DONE:
+                    finished += 1
+                    continue
+                yield item
+                yielded += 1
+                if progress_callback and yielded % progress_every == 0:
+                    progress_callback(dict(self.stats))
+        finally:
+            # Also reached when the consumer stops early - release any blocked walkers.
+            stop.set()
+            with condition:
+                condition.notify_all()
 
-    def _traverse(self, path: str, current_depth: int) -> List[Tuple[str, str]]:
-        if self.max_depth is not None and current_depth > self.max_depth:
-            return []
+        if progress_callback:
+            progress_callback(dict(self.stats))
 
-        collected_files = []
+    def _scan_directory(self, path: str, depth: int, found: queue.Queue,
+                        stop: threading.Event) -> List[Tuple[str, int]]:
+        """List one directory, queue its valid files and return its subdirectories."""
+        subdirectories = []
+        files_seen = files_collected = errors = 0
 
         try:
             with os.scandir(path) as entries:
                 for entry in entries:
+                    if stop.is_set():
+                        break
+
                     # Skip hidden files/folders (Windows + Linux/macOS compatible)
                     if not self.include_hidden and self._is_hidden(entry):
                         continue
 
-                    if entry.is_dir(follow_symlinks=False):
-                        collected_files.extend(self._traverse(entry.path, current_depth + 1))
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if (self.max_depth is None or depth + 1 <= self.max_depth) \
+                                    and not self.classifier.is_excluded(entry.path):
+                                subdirectories.append((entry.path, depth + 1))
 
-                    elif entry.is_file():
-                        mime_type = self._get_mime_type(entry.path)
-                        if self._is_valid_pii_type(mime_type):
-                            collected_files.append((entry.path, mime_type))
+                        elif entry.is_file():
+                            files_seen += 1
+                            if not self._in_shard(entry.path):
+                                continue
+                            mime_type = self._get_mime_type(entry)
+                            if mime_type and self._is_valid_pii_type(mime_type):
+                                files_collected += 1
+                                with self._stats_lock:
+                                    self.stats["files_collected"] += 1
+                                if not self._put(found, (entry.path, mime_type), stop):
+                                    break
+                    except OSError:
+                        errors += 1  # Entry vanished or can't be inspected
 
         except PermissionError:
             pass  # Skip directories without access
+        except OSError:
+            errors += 1
+
+        with self._stats_lock:
+            self.stats["directories"] += 1
+            self.stats["files_seen"] += files_seen
+            self.stats["errors"] += errors
+
+        return subdirectories
+
+    def collect_paths(self, paths: Iterable[str]) -> Iterator[Tuple[str, str]]:
+        """Yield (file_path, mime_type) for an explicit list of files instead of walking base_path.
+
+        The same filters apply (hidden files, globs, size, shard, file type);
+        sharding hashes each path as listed.
+        """
+        self.stats = {"directories": 0, "files_seen": 0, "files_collected": 0, "errors": 0}
+        for path in paths:
+            name = os.path.basename(path)
+            if not self.include_hidden and name.startswith("."):
+                continue
+            if self.shard and shard_of(path, self.shard[1]) != self.shard[0]:
+                continue
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                self.stats["errors"] += 1
+                continue
+            self.stats["files_seen"] += 1
+            mime_type = self.classifier.classify(path, size)
+            if mime_type and self._is_valid_pii_type(mime_type):
+                self.stats["files_collected"] += 1
+                yield path, mime_type
+
+    def collect_changes(self, paths: Iterable[str]) -> Iterator[Tuple[str, str]]:
+        """Yield (file_path, mime_type) for changed paths under base_path that a walk would have collected.
+
+        Used by watch mode: depth, hidden names, excluded directories,
+        shard and file filters apply as in collect_files. Paths that are
+        gone or no longer regular files are dropped.
+        """
+        for path in paths:
+            relative = os.path.relpath(path, self.base_path)
+            parts = relative.split(os.sep)
+            if relative == os.curdir or parts[0] == os.pardir:
+                continue
+            directories = [os.path.join(self.base_path, *parts[:depth]) for depth in range(1, len(parts))]
+            if not all(self.wants_directory(directory, depth) for depth, directory in enumerate(directories, 1)):
+                continue
+            if not self.include_hidden and parts[-1].startswith("."):
+                continue
+            if not self._in_shard(path):
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if not S_ISREG(stat.st_mode):
+                continue
+            self.stats["files_seen"] += 1
+            mime_type = self.classifier.classify(path, stat.st_size)
+            if mime_type and self._is_valid_pii_type(mime_type):
+                self.stats["files_collected"] += 1
+                yield path, mime_type
+
+    def wants_directory(self, path: str, depth: int) -> bool:
+        """Whether a walk descends into the directory `path`, `depth` levels below base_path."""
+        if depth == 0:
+            return True
+        return (self.max_depth is None or depth <= self.max_depth) \
+            and (self.include_hidden or not os.path.basename(path).startswith(".")) \
+            and not self.classifier.is_excluded(path)
+
+    def _in_shard(self, path: str) -> bool:
+        if not self.shard:
+            return True
+        index, count = self.shard
+        return shard_of(os.path.relpath(path, self.base_path), count) == index
 
-        return collected_files
+    @staticmethod
+    def _put(found: queue.Queue, item, stop: threading.Event) -> bool:
+        """Put with backpressure, giving up once the scan is stopped."""
+        while not stop.is_set():
+            try:
+                found.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
 
     def _is_hidden(self, entry: os.DirEntry) -> bool:
         """Detect if a file is hidden (Works on Windows, Linux, macOS)."""
@@ -68,10 +261,11 @@ class InputHandler:
         except Exception:
             return False  # Default to not hidden if detection fails
 
-    def _get_mime_type(self, filepath: str) -> str:
-        """Detect file type using magic numbers."""
+    def _get_mime_type(self, entry: os.DirEntry) -> Optional[str]:
+        """Detect file type, or None if the file is filtered out (globs, size)."""
         try:
-            return self.mime_detector.from_file(filepath)
+            # scandir already has the size on Windows; elsewhere this is one stat.
+            return self.classifier.classify(entry.path, entry.stat().st_size)
         except Exception:
             return "unknown"
 
@@ -0,0 +1,295 @@
+import os
+import sys
+import json
+import math
+import time
+import heapq
+import hashlib
+import logging
+import cProfile
+import threading
+import contextlib
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+# Histogram buckets are powers of two: a duration d lands in the bucket whose
+# upper bound is the smallest 2**k >= d, from 2**-20 s (~1 us) upwards.
+MIN_BUCKET_EXPONENT = -20
+
+PROFILE_DIR = "output/profiles"
+
+_NULL_CONTEXT = contextlib.nullcontext()
+
+
+@dataclass
+class InstrumentationConfig:
+    """What is measured and logged. Passed to worker processes so they match the parent."""
+    enabled: bool = False           # Stage timings, per-MIME throughput and slowest files
+    slowest: int = 20               # How many of the slowest files to keep
+    profile_rate: float = 0.0       # Share of files run under cProfile (0 disables profiling)
+    profile_dir: str = PROFILE_DIR
+    log_level: str = "INFO"
+    log_json: bool = False          # One JSON object per log line instead of "[LEVEL] message"
+
+
+class JsonFormatter(logging.Formatter):
+    """Log records as JSON lines, including fields passed with extra={...}."""
+
+    _STANDARD = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {"time": round(record.created, 3), "level": record.levelname, "logger": record.name,
+                 "process": record.process, "message": record.getMessage()}
+        entry.update((key, value) for key, value in vars(record).items() if key not in self._STANDARD)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(level: str = "INFO", json_format: bool = False):
+    """Log as "[LEVEL] message" or JSON lines: info and debug to stdout, warnings and errors to stderr."""
+    formatter = JsonFormatter() if json_format else logging.Formatter("[%(levelname)s] %(message)s")
+    progress = logging.StreamHandler(sys.stdout)
+    progress.addFilter(lambda record: record.levelno < logging.WARNING)
+    problems = logging.StreamHandler(sys.stderr)  # Warnings and errors stay out of the per-file report
+    problems.setLevel(logging.WARNING)
+    for handler in (progress, problems):
+        handler.setFormatter(formatter)
+    root = logging.getLogger()
+    root.handlers[:] = [progress, problems]
+    root.setLevel(level.upper())
+
+
+class Histogram:
+    """Count, total, min, max and power-of-two buckets of durations; cheap to update and merge."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+        self.buckets: Dict[int, int] = {}
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+        exponent = _exponent(seconds)
+        self.buckets[exponent] = self.buckets.get(exponent, 0) + 1
+
+    def merge(self, other: dict):
+        self.count += other["count"]
+        self.total += other["total"]
+        self.min = min(self.min, other["min"])
+        self.max = max(self.max, other["max"])
+        for exponent, count in other["buckets"].items():
+            self.buckets[int(exponent)] = self.buckets.get(int(exponent), 0) + count
+
+    def percentile(self, fraction: float) -> float:
+        """Upper bound of the bucket holding the given fraction of samples (capped at max)."""
+        target = fraction * self.count
+        seen = 0
+        for exponent in sorted(self.buckets):
+            seen += self.buckets[exponent]
+            if seen >= target:
+                return min(2.0 ** exponent, self.max)
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {"count": self.count, "total": self.total, "min": self.min, "max": self.max, "buckets": self.buckets}
+
+    def summary(self) -> dict:
+        if not self.count:
+            return {"count": 0}
+        return {"count": self.count, "total_s": round(self.total, 6), "mean_s": self.total / self.count,
+                "min_s": self.min, "p50_s": self.percentile(0.5), "p90_s": self.percentile(0.9),
+                "p99_s": self.percentile(0.99), "max_s": self.max,
+                "buckets": {f"<={2.0 ** e:g}s": n for e, n in sorted(self.buckets.items())}}
+
+
+def _exponent(seconds: float) -> int:
+    """Smallest k >= MIN_BUCKET_EXPONENT with seconds <= 2**k."""
+    if seconds <= 0:
+        return MIN_BUCKET_EXPONENT
+    mantissa, exponent = math.frexp(seconds)  # seconds = mantissa * 2**exponent, 0.5 <= mantissa < 1
+    return max(MIN_BUCKET_EXPONENT, exponent - 1 if mantissa == 0.5 else exponent)
+
+
+class Recorder:
+    """Per-process measurements. Thread-safe; workers ship snapshots to the parent to merge."""
+
+    def __init__(self, slowest: int = 20):
+        self.slowest_limit = slowest
+        self._lock = threading.Lock()
+        self._clear()
+
+    def _clear(self):
+        self.stages: Dict[str, Histogram] = {}
+        self.mime_types: Dict[str, Dict[str, float]] = {}
+        self.counters: Dict[str, int] = {}  # Things counted rather than timed, e.g. PDF pages by kind
+        self._slowest: List[tuple] = []  # Min-heap of (seconds, path, mime_type, size)
+
+    def add(self, stage: str, seconds: float):
+        with self._lock:
+            histogram = self.stages.get(stage)
+            if histogram is None:
+                histogram = self.stages[stage] = Histogram()
+            histogram.add(seconds)
+
+    def count(self, name: str, amount: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def file_done(self, file_path: str, mime_type: Optional[str], size: Optional[int], seconds: float):
+        mime_type = mime_type or "unknown"
+        with self._lock:
+            totals = self.mime_types.setdefault(mime_type, {"files": 0, "bytes": 0, "seconds": 0.0})
+            totals["files"] += 1
+            totals["bytes"] += size or 0
+            totals["seconds"] += seconds
+            self._push_slowest((seconds, file_path, mime_type, size))
+
+    def _push_slowest(self, entry: tuple):
+        if len(self._slowest) < self.slowest_limit:
+            heapq.heappush(self._slowest, entry)
+        elif entry > self._slowest[0]:
+            heapq.heapreplace(self._slowest, entry)
+
+    def snapshot(self, reset: bool = False) -> dict:
+        with self._lock:
+            data = {"stages": {name: h.to_dict() for name, h in self.stages.items()},
+                    "mime_types": {mime: dict(totals) for mime, totals in self.mime_types.items()},
+                    "counters": dict(self.counters),
+                    "slowest": list(self._slowest)}
+            if reset:
+                self._clear()
+        return data
+
+    def merge(self, data: dict):
+        with self._lock:
+            for name, histogram in data["stages"].items():
+                self.stages.setdefault(name, Histogram()).merge(histogram)
+            for mime_type, other in data["mime_types"].items():
+                totals = self.mime_types.setdefault(mime_type, {"files": 0, "bytes": 0, "seconds": 0.0})
+                for key in totals:
+                    totals[key] += other[key]
+            for name, amount in data["counters"].items():
+                self.counters[name] = self.counters.get(name, 0) + amount
+            for entry in data["slowest"]:
+                self._push_slowest(tuple(entry))
+
+    def report(self) -> dict:
+        """Summaries for the metrics file."""
+        with self._lock:
+            mime_types = {}
+            for mime_type, totals in sorted(self.mime_types.items()):
+                seconds = totals["seconds"]
+                mime_types[mime_type] = dict(totals, files_per_s=totals["files"] / seconds if seconds else None,
+                                             mb_per_s=totals["bytes"] / 1e6 / seconds if seconds else None)
+            return {"stages": {name: h.summary() for name, h in sorted(self.stages.items())},
+                    "mime_types": mime_types,
+                    "counters": dict(sorted(self.counters.items())),
+                    "slowest_files": [{"file_path": path, "mime_type": mime, "size": size, "seconds": seconds}
+                                      for seconds, path, mime, size in sorted(self._slowest, reverse=True)]}
+
+
+_config = InstrumentationConfig()
+enabled = False  # Module-level copy of _config.enabled, checked on every stage() call
+recorder = Recorder()
+_started = time.time()
+
+
+def configure(config: InstrumentationConfig):
+    """Apply `config` to this process: logging, and whether measurements are taken."""
+    global _config, enabled, recorder, _started
+    _config = config
+    enabled = config.enabled
+    recorder = Recorder(config.slowest)
+    _started = time.time()
+    configure_logging(config.log_level, config.log_json)
+
+
+def get_config() -> InstrumentationConfig:
+    return _config
+
+
+def stage(name: str):
+    """Context manager timing one run of a pipeline stage; a shared no-op when disabled."""
+    if not enabled:
+        return _NULL_CONTEXT
+    return _timed(name)
+
+
+@contextlib.contextmanager
+def _timed(name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        recorder.add(name, time.perf_counter() - started)
+
+
+def record(name: str, seconds: float):
+    if enabled:
+        recorder.add(name, seconds)
+
+
+def count(name: str, amount: int = 1):
+    if enabled:
+        recorder.count(name, amount)
+
+
+def file_done(file_path: str, mime_type: Optional[str], size: Optional[int], seconds: float):
+    if enabled:
+        recorder.file_done(file_path, mime_type, size, seconds)
+
+
+def drain() -> Optional[dict]:
+    """Measurements taken since the last drain (None when disabled), for a worker to return."""
+    return recorder.snapshot(reset=True) if enabled else None
+
+
+def merge(snapshot: Optional[dict]):
+    if snapshot:
+        recorder.merge(snapshot)
+
+
+def should_profile(file_path: str) -> bool:
+    """Deterministic sample of profile_rate of the files, so reruns profile the same ones."""
+    if _config.profile_rate <= 0:
+        return False
+    digest = hashlib.blake2b(file_path.encode("utf-8", errors="surrogatepass"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") < _config.profile_rate * 2 ** 64
+
+
+@contextlib.contextmanager
+def profile(file_path: str):
+    """Run the block under cProfile and dump the stats to profile_dir (open with pstats or snakeviz)."""
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        os.makedirs(_config.profile_dir, exist_ok=True)
+        digest = hashlib.blake2b(file_path.encode("utf-8", errors="surrogatepass"), digest_size=4).hexdigest()
+        output_file = os.path.join(_config.profile_dir, f"{os.path.basename(file_path)}-{digest}.prof")
+        profiler.dump_stats(output_file)
+        logging.getLogger(__name__).info("Profile of %s saved to %s", file_path, output_file,
+                                         extra={"file": file_path, "profile": output_file})
+
+
+def export(output_file: str, extra: Optional[dict] = None):
+    """Write the merged measurements of this run as JSON.
+
+    Stage totals add up time across threads and worker processes, so they
+    can exceed the wall-clock time.
+    """
+    data = {"wall_seconds": time.time() - _started, **(extra or {}), **recorder.report()}
+    directory = os.path.dirname(output_file)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(output_file, "w", encoding="utf-8") as file:
+        json.dump(data, file, indent=2)
+    logging.getLogger(__name__).info("Metrics saved to %s", output_file)
@@ -0,0 +1,193 @@
+import os
+import math
+import time
+import signal
+import logging
+import contextlib
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+KILL_GRACE_SECONDS = 30.0  # The watchdog kills a worker this long after a file's time budget ran out
+ANALYSIS = -1              # File index in a worker slot while a batch's texts are analyzed together
+SLOT_FIELDS = 4            # Per worker: pid, batch id, file index, deadline (0 while idle)
+
+
+@dataclass
+class ResourceLimits:
+    """Per-file budgets. Workers stop a file that runs out of time or is too large to read whole;
+    the pipeline's watchdog kills workers that overrun anyway or use too much memory. 0 disables a limit."""
+    file_timeout: float = 300.0   # Seconds to extract one file, and again to analyze it
+    worker_memory_mb: int = 4096  # Resident memory of a worker process (checked where /proc exists)
+    catdoc_timeout: float = 60.0  # Seconds for catdoc to convert a .doc
+    max_pixels: int = 40_000_000  # Images and rendered PDF pages are downscaled to at most this many pixels
+    max_pages: int = 2000         # PDF pages read; later pages are skipped
+
+
+class FileTimeout(BaseException):
+    """Raised in a worker when a file runs out of time.
+
+    Not an Exception, so the readers' error handling lets it through to the
+    per-file budget that raised it.
+    """
+
+
+_limits = ResourceLimits()
+_hits: Dict[str, str] = {}  # Limits the current file ran into: limit -> what happened
+_slots = None               # This worker's shared slot array (see WorkerMonitor), if watched
+_slot = None                # ... and the index of its slot
+
+
+def configure(limits: ResourceLimits):
+    global _limits
+    _limits = limits
+
+
+def get_limits() -> ResourceLimits:
+    return _limits
+
+
+def hit(file_path: str, limit: str, detail: str):
+    """Record that the current file ran into a limit, so it is reported as incomplete."""
+    if limit not in _hits:
+        logger.warning("%s: %s limit reached, %s", file_path, limit, detail,
+                       extra={"file": file_path, "limit": limit})
+    _hits[limit] = detail
+
+
+def drain_hits() -> Dict[str, str]:
+    """Limits hit since the last drain (by the file just finished)."""
+    hits = dict(_hits)
+    _hits.clear()
+    return hits
+
+
+def fit_pixels(image, file_path: str):
+    """Downscale an image with more than max_pixels pixels, keeping its aspect ratio."""
+    if image is None or not _limits.max_pixels:
+        return image
+    height, width = image.shape[:2]
+    if height * width <= _limits.max_pixels:
+        return image
+    import cv2
+    scale = math.sqrt(_limits.max_pixels / (height * width))
+    size = (max(1, int(width * scale)), max(1, int(height * scale)))
+    hit(file_path, "max_pixels", f"{width}x{height} image downscaled to {size[0]}x{size[1]}")
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+
+
+def render_dpi(width_points: float, height_points: float, dpi: int, file_path: str) -> float:
+    """The highest DPI up to `dpi` at which a page region stays within max_pixels."""
+    pixels = (width_points * dpi / 72) * (height_points * dpi / 72)
+    if not _limits.max_pixels or pixels <= _limits.max_pixels:
+        return dpi
+    reduced = dpi * math.sqrt(_limits.max_pixels / pixels)
+    hit(file_path, "max_pixels", f"pages rendered at {reduced:.0f} DPI instead of {dpi}")
+    return reduced
+
+
+# === Worker side ===
+
+def attach_worker(slots, slot_counter):
+    """Claim this worker process's slot in the monitor's shared array."""
+    global _slots, _slot
+    with slot_counter.get_lock():
+        _slot = slot_counter.value
+        slot_counter.value += 1
+    _slots = slots
+    _slots[_slot * SLOT_FIELDS] = os.getpid()
+
+
+def _on_alarm(signum, frame):
+    raise FileTimeout()
+
+
+@contextlib.contextmanager
+def budget(batch_id: int, index: int, file_path: Optional[str] = None, seconds: Optional[float] = None):
+    """Mark the worker busy with one file of a batch (or ANALYSIS) for the watchdog.
+
+    The block is also interrupted with FileTimeout once its time runs out
+    (where SIGALRM exists). For a file the limit is recorded and the file
+    keeps whatever was extracted; for ANALYSIS the FileTimeout propagates to
+    the caller. Native code can't be interrupted that way, which is what the
+    watchdog's kill is for.
+    """
+    seconds = _limits.file_timeout if seconds is None else seconds
+    alarm = bool(seconds and hasattr(signal, "setitimer"))
+    if _slots is not None:
+        base = _slot * SLOT_FIELDS
+        _slots[base + 1] = batch_id
+        _slots[base + 2] = index
+        _slots[base + 3] = time.monotonic() + seconds + KILL_GRACE_SECONDS if seconds else float("inf")
+    if alarm:
+        previous = signal.signal(signal.SIGALRM, _on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    except FileTimeout:
+        if not file_path:
+            raise
+        hit(file_path, "file_timeout", f"stopped after {seconds:g}s")
+    finally:
+        if alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+        if _slots is not None:
+            _slots[_slot * SLOT_FIELDS + 3] = 0.0
+
+
+# === Parent side ===
+
+class WorkerMonitor:
+    """Shared slots the workers of one pool fill in, checked by the pipeline for overruns.
+
+    A worker that is past its deadline, or over worker_memory_mb while
+    busy, is reported with the batch and file it was working on.
+    """
+
+    def __init__(self, context, workers: int, limits: ResourceLimits):
+        self.limits = limits
+        self.slots = context.Array("d", workers * SLOT_FIELDS, lock=False)
+        self.slot_counter = context.Value("i", 0)
+
+    def busy(self) -> List[Tuple[int, int, int, float]]:
+        """(pid, batch id, file index, deadline) of every worker in the middle of something."""
+        values = self.slots[:]
+        entries = []
+        for base in range(0, len(values), SLOT_FIELDS):
+            pid, batch_id, index, deadline = values[base:base + SLOT_FIELDS]
+            if pid and deadline:
+                entries.append((int(pid), int(batch_id), int(index), deadline))
+        return entries
+
+    def overruns(self) -> List[Tuple[int, int, int, str, str]]:
+        """(pid, batch id, file index, limit, detail) of the workers to kill."""
+        now = time.monotonic()
+        found = []
+        for pid, batch_id, index, deadline in self.busy():
+            if now > deadline:
+                found.append((pid, batch_id, index, "file_timeout",
+                              f"worker killed after {self.limits.file_timeout + KILL_GRACE_SECONDS:g}s"))
+                continue
+            rss = _resident_mb(pid) if self.limits.worker_memory_mb else None
+            if rss is not None and rss > self.limits.worker_memory_mb:
+                found.append((pid, batch_id, index, "worker_memory",
+                              f"worker killed at {rss:.0f} MB (limit {self.limits.worker_memory_mb} MB)"))
+        return found
+
+    @staticmethod
+    def kill(pid: int):
+        try:
+            os.kill(pid, getattr(signal, "SIGKILL", signal.SIGTERM))
+        except OSError:
+            pass  # Already gone
+
+
+def _resident_mb(pid: int) -> Optional[float]:
+    """Resident set size of a process in MB, or None where /proc isn't available."""
+    try:
+        with open(f"/proc/{pid}/statm", "rb") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
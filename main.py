@@ -1,63 +1,449 @@
-import concurrent.futures
+import os
+import sys
+import json
+import signal
+import logging
+import argparse
+import itertools
+from typing import List, Optional
+
 from input_handler import InputHandler  # Module 1
-from filereader import FileReader      # Module 2
-from pii_analyzer import PIIAnalyzer    # Module 3
-from output_handler import OutputHandler  # Module 5
+from output_handler import OutputHandler, CsvResultSink, JsonlResultSink, QuarantineSink  # Module 5
+from pipeline import ScanPipeline, DEFAULT_DETECTORS  # Modules 2 & 3
+from ner_detector import DETECTOR_MODELS
+from regex_detector import RegexDetector
+from scan_cache import ScanCache
+import instrumentation
+import watcher
+from instrumentation import InstrumentationConfig
+from limits import ResourceLimits
+from ocr_backend import OcrConfig, OCR_BACKENDS
+
+CACHE_MAX_AGE_DAYS = 90
+CSV_OUTPUT = "output/pii_results.csv"
+JSONL_OUTPUT = "output/pii_results.jsonl"
+QUARANTINE_OUTPUT = "output/pii_results.quarantine.jsonl"
+DEFAULT_OUTPUT_PREFIX = "output/pii_results"
+DEFAULT_CACHE = "output/scan_cache.db"
+
+# Exit codes of the command-line interface
+EXIT_NO_PII = 0
+EXIT_PII_FOUND = 1
+EXIT_USAGE = 2   # Also what argparse uses for bad arguments
+EXIT_ERROR = 3
+EXIT_INCOMPLETE = 4  # Files were quarantined unscanned, so "no PII" can't be claimed for the scope
+
+OUTPUT_FORMATS = ("csv", "jsonl", "json")
+
+logger = logging.getLogger(__name__)
+
+
+def report_progress(stats: dict):
+    logger.info("Discovered %d potential PII files (%d files in %d directories scanned)",
+                stats["files_collected"], stats["files_seen"], stats["directories"], extra=stats)
+
+
+def report_dedup(stats: dict):
+    if stats["duplicates"]:
+        logger.info("Deduplication: %d files had the same content as a file already scanned, saving %.1f MB of "
+                    "extraction and about %.1fs of processing.", stats["duplicates"], stats["bytes_saved"] / 1e6,
+                    stats["seconds_saved"], extra={"dedup": stats})
+
+
+def report_limits(quarantined: int, limited: int, restarts: int, output_file: str):
+    if quarantined or limited:
+        logger.warning("%d files quarantined and %d scanned only partly because of resource limits "
+                       "(%d worker pool restarts); see %s.", quarantined, limited, restarts, output_file,
+                       extra={"quarantined": quarantined, "limited": limited, "restarts": restarts})
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Scan directories (or a list of files) for PII and write CSV/JSON Lines/JSON reports.",
+        epilog=f"Exit codes: {EXIT_NO_PII} no PII found, {EXIT_PII_FOUND} PII found, "
+               f"{EXIT_USAGE} invalid arguments or config, {EXIT_ERROR} scan could not run, "
+               f"{EXIT_INCOMPLETE} scan finished but files were quarantined without being scanned "
+               "(whether or not PII was found in the others). "
+               "Run without arguments from a terminal for the interactive prompts.")
+    parser.add_argument("roots", nargs="*", help="directories to scan")
+    parser.add_argument("--config", help="JSON file with option defaults, keyed by long option name "
+                                         "(e.g. {\"max_depth\": 3, \"formats\": [\"csv\"]}); command-line options win")
+    parser.add_argument("--file-list", help="scan the files listed in this file (one per line, - for stdin) "
+                                            "instead of walking roots")
+
+    walk = parser.add_argument_group("file discovery")
+    walk.add_argument("--max-depth", type=int, default=-1, help="0 for the root only, -1 (default) for unlimited")
+    walk.add_argument("--include-hidden", action="store_true", help="include hidden files and directories")
+    walk.add_argument("--include", action="append", default=[], metavar="GLOB", help="only scan matching files")
+    walk.add_argument("--exclude", action="append", default=[], metavar="GLOB", help="skip matching files and directories")
+    walk.add_argument("--max-file-size", type=int, help="skip files larger than this many bytes")
+    walk.add_argument("--walkers", type=int, default=8, help="directory listing threads per root")
+    walk.add_argument("--shard", metavar="INDEX/COUNT",
+                      help="only scan files whose path hashes to shard INDEX (0-based) of COUNT, "
+                           "e.g. 3/16 for one task of a 16-node job array")
+
+    detect = parser.add_argument_group("detection")
+    detect.add_argument("--detectors", choices=list(DETECTOR_MODELS), default=DEFAULT_DETECTORS,
+                        help="regex only, or regex plus the small or transformer NER model")
+    detect.add_argument("--tiered", action="store_true",
+                        help="only send text flagged by regex/small model triage to the transformer")
+    detect.add_argument("--workers", type=int, help="worker processes (default: one per CPU)")
+    detect.add_argument("--io-workers", type=int, help="threads for hashing and cache lookups")
+
+    output = parser.add_argument_group("output")
+    output.add_argument("--output-prefix", default=DEFAULT_OUTPUT_PREFIX,
+                        help="report path without extension; a shard suffix is added when sharding")
+    output.add_argument("--formats", nargs="+", choices=OUTPUT_FORMATS, default=["csv", "jsonl"])
+    output.add_argument("--resume", action="store_true", help="continue an interrupted scan from existing reports")
+    output.add_argument("--quiet", action="store_true", help="don't print a line per scanned file")
+
+    watch = parser.add_argument_group("watch mode")
+    watch.add_argument("--watch", action="store_true",
+                       help="after the scan, keep running and scan files under the roots as they are created or "
+                            "modified, appending those whose content changed to the reports (Ctrl+C to stop)")
+    watch.add_argument("--watch-backend", choices=["auto", "inotify", "poll"], default="auto",
+                       help="where change events come from; auto uses inotify where available")
+    watch.add_argument("--debounce", type=float, default=watcher.DEBOUNCE_SECONDS, metavar="SECONDS",
+                       help="scan a changed file once it has been quiet this long")
+    watch.add_argument("--max-delay", type=float, default=watcher.MAX_DELAY_SECONDS, metavar="SECONDS",
+                       help="scan a file that keeps changing at the latest this long after its first change")
+    watch.add_argument("--poll-interval", type=float, default=watcher.POLL_INTERVAL_SECONDS, metavar="SECONDS",
+                       help="time between snapshots when polling")
+
+    budgets = parser.add_argument_group("resource limits", "0 disables a limit")
+    defaults = ResourceLimits()
+    budgets.add_argument("--file-timeout", type=float, default=defaults.file_timeout, metavar="SECONDS",
+                         help="stop extracting, and separately analyzing, a file after this long; "
+                              "its worker is killed if it doesn't stop")
+    budgets.add_argument("--worker-memory-mb", type=int, default=defaults.worker_memory_mb, metavar="MB",
+                         help="kill a worker using more memory than this (Linux)")
+    budgets.add_argument("--catdoc-timeout", type=float, default=defaults.catdoc_timeout, metavar="SECONDS",
+                         help="time allowed to convert a .doc file")
+    budgets.add_argument("--max-pixels", type=int, default=defaults.max_pixels,
+                         help="downscale images and rendered PDF pages to at most this many pixels before OCR")
+    budgets.add_argument("--max-pages", type=int, default=defaults.max_pages, help="PDF pages read per file")
+
+    ocr = parser.add_argument_group("OCR", "defaults come from the PII_OCR_* and TESSERACT_CMD environment variables")
+    ocr_defaults = OcrConfig.from_env()
+    ocr.add_argument("--ocr-backend", choices=OCR_BACKENDS, default=ocr_defaults.backend,
+                     help="tesserocr, the tesseract binary, or auto (tesserocr when installed)")
+    ocr.add_argument("--tesseract-cmd", default=ocr_defaults.tesseract_cmd, metavar="PATH",
+                     help="tesseract binary used by the cli backend")
+    ocr.add_argument("--tessdata-dir", default=ocr_defaults.tessdata_dir, metavar="DIR",
+                     help="Tesseract language data directory")
+    ocr.add_argument("--ocr-lang", default=ocr_defaults.lang, help="Tesseract language(s), e.g. eng+hin")
+    ocr.add_argument("--ocr-psm", type=int, default=ocr_defaults.psm, help="Tesseract page segmentation mode")
+    ocr.add_argument("--ocr-timeout", type=float, default=ocr_defaults.timeout, metavar="SECONDS",
+                     help="time allowed per image, 0 for no limit")
+    ocr.add_argument("--ocr-workers", type=int, default=ocr_defaults.workers,
+                     help="concurrent OCR calls per worker process")
+
+    cache = parser.add_argument_group("cache")
+    cache.add_argument("--cache", help=f"scan cache database (default {DEFAULT_CACHE}, with the shard suffix)")
+    cache.add_argument("--no-cache", action="store_true", help="scan every file and keep no cache")
+    cache.add_argument("--fast-fingerprint", action="store_true",
+                       help="identify unchanged files by a fast hash instead of SHA-256")
+    cache.add_argument("--cache-max-age-days", type=float, default=CACHE_MAX_AGE_DAYS)
 
+    diagnostics = parser.add_argument_group("diagnostics")
+    diagnostics.add_argument("--metrics", metavar="FILE",
+                             help="time every stage and write histograms, per-MIME throughput and the "
+                                  "slowest files to this JSON file")
+    diagnostics.add_argument("--slowest", type=int, default=20, help="slowest files kept in the metrics")
+    diagnostics.add_argument("--profile-sample", type=float, default=0.0, metavar="RATE",
+                             help="run this share of files (e.g. 0.01) under cProfile")
+    diagnostics.add_argument("--profile-dir", default=instrumentation.PROFILE_DIR)
+    diagnostics.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"])
+    diagnostics.add_argument("--log-json", action="store_true", help="log one JSON object per line")
+    return parser
 
-def process_file(file_path, mime_type, previous_hashes):
-    """Process a single file - Extract text & Detect PII, skipping already scanned files."""
-    file_hash = OutputHandler.compute_file_hash(file_path)
 
-    if file_hash in previous_hashes:
-        print(f"[SKIPPED] {file_path} (Already Scanned)")
-        return None  # Skip this file
+def _check_config_value(parser: argparse.ArgumentParser, action: argparse.Action, value, config_file: str):
+    """Hold a --config value to the choices the option has on the command line (defaults skip that check)."""
+    if action.nargs in ("+", "*"):
+        if not isinstance(value, list):
+            parser.error(f"{action.dest} in {config_file} must be a list")
+        values = value
+    else:
+        values = [value]
+    if action.choices is not None:
+        for item in values:
+            if item not in action.choices:
+                choices = ", ".join(map(repr, action.choices))
+                parser.error(f"invalid choice for {action.dest} in {config_file}: {item!r} (choose from {choices})")
 
-    reader = FileReader()
-    extracted_text = reader.extract_text(file_path, mime_type)
 
-    if not extracted_text.strip():
-        return (file_path, {})
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    """Parse arguments, taking defaults from --config if given."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.config:
+        try:
+            with open(args.config, "r", encoding="utf-8") as file:
+                config = json.load(file)
+        except (OSError, ValueError) as e:
+            parser.error(f"could not read config file {args.config}: {e}")
+        if not isinstance(config, dict):
+            parser.error(f"config file {args.config} must hold a JSON object")
+        known = {action.dest for action in parser._actions}
+        unknown = sorted(set(config) - known - {"config"})
+        if unknown:
+            parser.error(f"unknown option(s) in {args.config}: {', '.join(unknown)}")
+        for action in parser._actions:
+            if action.dest in config:
+                _check_config_value(parser, action, config[action.dest], args.config)
+        parser.set_defaults(**config)
+        args = parser.parse_args(argv)
 
-    pii_results = PIIAnalyzer.analyze(extracted_text)
+    if not args.roots and not args.file_list:
+        parser.error("give at least one directory to scan, or --file-list")
+    if args.roots and args.file_list:
+        parser.error("--file-list replaces the directories to scan, give one or the other")
+    if args.watch and args.file_list:
+        parser.error("--watch watches the roots, it can't be combined with --file-list")
+    if args.watch and "json" in args.formats:
+        parser.error("--watch only writes streaming reports, choose --formats csv and/or jsonl")
+    if args.watch and args.no_cache:
+        parser.error("--watch needs the scan cache to tell changed files from unchanged ones")
+    if args.shard:
+        try:
+            index, count = (int(part) for part in args.shard.split("/"))
+        except ValueError:
+            parser.error("--shard must look like INDEX/COUNT, e.g. 0/4")
+        if count < 1 or not 0 <= index < count:
+            parser.error("--shard INDEX must be between 0 and COUNT-1")
+        args.shard = (index, count)
+    return args
 
-    return (file_path, pii_results)
 
+def run(args: argparse.Namespace) -> int:
+    """Run a scan from parsed arguments and return the exit code."""
+    instrumentation.configure(InstrumentationConfig(
+        enabled=bool(args.metrics), slowest=args.slowest, profile_rate=args.profile_sample,
+        profile_dir=args.profile_dir, log_level=args.log_level, log_json=args.log_json))
+    RegexDetector.ensure_loaded()
+    if not RegexDetector.PATTERNS:
+        logger.error("No regex patterns loaded; refusing to report files as free of PII.")
+        return EXIT_ERROR
+    for root in args.roots:
+        if not os.path.isdir(root):
+            logger.error("Not a directory: %s", root)
+            return EXIT_ERROR
 
-def main():
-    # === Load Previously Scanned Files ===
-    previous_results_file = input("Enter previous results file (CSV/JSON) or press Enter to skip: ").strip()
-    previous_hashes = OutputHandler.load_previous_hashes(previous_results_file) if previous_results_file else {}
+    suffix = f".shard-{args.shard[0]}-of-{args.shard[1]}" if args.shard else ""
+    max_depth = None if args.max_depth == -1 else args.max_depth
+    handler_options = dict(max_depth=max_depth, include_hidden=args.include_hidden, walkers=args.walkers,
+                           include_globs=args.include, exclude_globs=args.exclude,
+                           max_file_size=args.max_file_size, shard=args.shard)
+
+    # === Module 1: Collect Files ===
+    handlers = []
+    list_file = None
+    if args.file_list:
+        try:
+            list_file = sys.stdin if args.file_list == "-" else open(args.file_list, "r", encoding="utf-8")
+        except OSError as e:
+            logger.error("Could not read file list: %s", e)
+            return EXIT_ERROR
+        handler = InputHandler(".", **handler_options)
+        handlers.append(handler)
+        sources = [handler.collect_paths(line.rstrip("\r\n") for line in list_file if line.strip())]
+    else:
+        handlers = [InputHandler(root, **handler_options) for root in args.roots]
+        callback = None if args.quiet else report_progress
+        sources = [handler.collect_files(progress_callback=callback) for handler in handlers]
+    files_with_mime = itertools.chain.from_iterable(sources)
+
+    # Watching starts before the baseline scan, so changes made during it are picked up afterwards.
+    watch_source = None
+    if args.watch:
+        try:
+            watch_source = watcher.open_watcher(handlers, args.watch_backend, args.poll_interval)
+        except OSError as e:
+            logger.error("Could not watch for changes: %s", e)
+            return EXIT_ERROR
+
+    cache = None if args.no_cache else ScanCache(args.cache or DEFAULT_CACHE.replace(".db", f"{suffix}.db"))
+    # Cached files are reported too, so the reports and the exit code cover every file in scope.
+    pipeline = ScanPipeline(cpu_workers=args.workers, io_workers=args.io_workers, cache=cache, include_cached=True,
+                            fast_fingerprint=args.fast_fingerprint, tiered=args.tiered, detectors=args.detectors,
+                            ocr_config=OcrConfig(args.ocr_backend, args.tesseract_cmd, args.tessdata_dir, args.ocr_lang,
+                                                 args.ocr_psm, args.ocr_timeout, args.ocr_workers),
+                            resource_limits=ResourceLimits(args.file_timeout, args.worker_memory_mb,
+                                                           args.catdoc_timeout, args.max_pixels, args.max_pages))
+
+    # === Module 2, 3 & 5: Parallel Processing, Streaming Results to the Reports ===
+    prefix = args.output_prefix + suffix
+    sink_types = {"csv": CsvResultSink, "jsonl": JsonlResultSink}
+    sinks = [sink_types[fmt](f"{prefix}.{fmt}", resume=args.resume) for fmt in args.formats if fmt in sink_types]
+    quarantine_sink = QuarantineSink(f"{prefix}.quarantine.jsonl", resume=args.resume)
+    collected = [] if "json" in args.formats else None
+    pii_found = False
+    seconds_saved = 0.0
+    quarantined = limited = 0
+
+    def write(result):
+        nonlocal pii_found, seconds_saved, quarantined, limited
+        for sink in sinks + [quarantine_sink]:
+            sink.write(result)
+        if collected is not None:
+            collected.append(result)
+        if not args.quiet:
+            OutputHandler.display_result(result)
+        pii_found = pii_found or bool(result.pii_data)
+        seconds_saved += result.seconds_saved
+        quarantined += result.quarantined
+        limited += bool(result.limits) and not result.quarantined
+
+    try:
+        if watch_source:
+            pipeline.open()  # Keep the workers and their models for the incremental scans
+        # A file counts as done only once it reached every streamed report.
+        completed = set.intersection(*(sink.completed_paths for sink in sinks)) if sinks else set()
+        if completed:
+            logger.info("Resuming: %d files already in the reports.", len(completed))
+            # The exit code covers the whole report, not just the files scanned this time.
+            pii_found = any(completed & sink.completed_pii_paths for sink in sinks)
+
+        for result in pipeline.iter_results(files_with_mime, skip_paths=completed):
+            write(result)
+        if watch_source:
+            watch_changes(args, handlers, watch_source, pipeline, sinks + [quarantine_sink], write)
+    finally:
+        if list_file is not None and list_file is not sys.stdin:
+            list_file.close()
+        for sink in sinks + [quarantine_sink]:
+            sink.close()
+        pipeline.close()
+        if watch_source:
+            watch_source.close()
+        if cache:
+            cache.evict(max_age_days=args.cache_max_age_days)
+            cache.close()
+
+    if collected is not None:
+        OutputHandler.save_to_json(collected, f"{prefix}.json")
+    if args.tiered:
+        logger.info("Tiered analysis saved an estimated %.1fs of transformer NER.", seconds_saved)
+    report_dedup(pipeline.dedup_stats)
+    report_limits(quarantined, limited, pipeline.restarts, quarantine_sink.output_file)
+    files = sum(handler.stats["files_collected"] for handler in handlers)
+    if args.metrics:
+        instrumentation.export(args.metrics, {"files": files, "detectors": args.detectors, "tiered": args.tiered,
+                                              "dedup": pipeline.dedup_stats, "quarantined": quarantined,
+                                              "limited": limited, "restarts": pipeline.restarts})
+    logger.info("Scan complete: %d files, PII %s.", files, "found" if pii_found else "not found",
+                extra={"files": files, "pii_found": pii_found})
+    if quarantined:
+        return EXIT_INCOMPLETE
+    return EXIT_PII_FOUND if pii_found else EXIT_NO_PII
+
+
+def watch_changes(args: argparse.Namespace, handlers: List[InputHandler], watch_source, pipeline: ScanPipeline,
+                  sinks: list, write):
+    """Scan files under the roots as they change, until Ctrl+C or SIGTERM.
+
+    Only new and modified files are read, and only paths that are new or
+    whose content differs from what was last cached for that path are
+    appended to the reports - a copied or reverted file is reported even
+    if its content is cached, while a touched file or a rescan after lost
+    events adds no rows. Deleted files are logged.
+    """
+    logger.info("Watching %s for changes (Ctrl+C to stop).", ", ".join(args.roots))
+    pipeline.changed_only = True  # The baseline scan already reported every path as it was
+    previous = signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        for batch in watcher.iter_batches(watch_source, debounce=args.debounce, max_delay=args.max_delay):
+            if batch.rescan:
+                logger.warning("Change events were lost (event queue overflow); rescanning the roots.")
+                sources = [handler.collect_files() for handler in handlers]
+            else:
+                sources = [handler.collect_changes(batch.changed) for handler in handlers]
+            for result in pipeline.iter_results(itertools.chain.from_iterable(sources)):
+                write(result)
+            for path in batch.deleted:
+                logger.info("Removed: %s", path, extra={"file": path, "event": "deleted"})
+            for sink in sinks:
+                sink.flush()  # Results of a quiet period shouldn't wait for the next batch
+    except KeyboardInterrupt:
+        logger.info("Stopped watching.")
+    finally:
+        signal.signal(signal.SIGTERM, previous)
+
+
+def interactive():
+    # === Open the Cache of Previously Scanned Files ===
+    cache_file = input("Enter scan cache file (press Enter for output/scan_cache.db): ").strip()
+    cache = ScanCache(cache_file or DEFAULT_CACHE)
+    fast_fingerprint = input("Use fast fingerprint instead of SHA-256 for skip checks? (y/n): ").strip().lower() == 'y'
 
     # === Module 1: Collect Files ===
     base_path = input("Enter directory path to scan: ")
     max_depth = int(input("Enter max depth (0 for current dir only, -1 for unlimited): "))
     include_hidden = input("Include hidden files? (y/n): ").strip().lower() == 'y'
+    workers = input("Enter number of worker processes (press Enter for one per CPU): ").strip()
+    resume = input("Resume an interrupted scan from the existing reports? (y/n): ").strip().lower() == 'y'
+    detectors = input("Detectors - regex, small or transformer (press Enter for transformer): ").strip() or "transformer"
+    tiered = input("Tiered analysis (only text flagged by regex/small model goes to transformer NER)? (y/n): ").strip().lower() == 'y'
 
     max_depth = None if max_depth == -1 else max_depth
+    cpu_workers = int(workers) if workers else None
 
+    # Files are processed as soon as they are discovered, while traversal continues.
     input_handler = InputHandler(base_path, max_depth=max_depth, include_hidden=include_hidden)
-    files_with_mime = input_handler.collect_files()
+    files_with_mime = input_handler.collect_files(progress_callback=report_progress)
 
-    if not files_with_mime:
-        print("No valid files detected.")
-        return
+    # === Module 2, 3 & 5: Parallel Processing, Streaming Results to the Reports ===
+    # The cache is committed before the reports are flushed, so when resuming, files answered from
+    # the cache must be reported too - otherwise those scanned just before the interruption are lost.
+    pipeline = ScanPipeline(cpu_workers=cpu_workers, cache=cache, include_cached=resume,
+                            fast_fingerprint=fast_fingerprint, tiered=tiered, detectors=detectors)
+    seconds_saved = 0.0
+    quarantined = limited = 0
+    with CsvResultSink(CSV_OUTPUT, resume=resume) as csv_sink, JsonlResultSink(JSONL_OUTPUT, resume=resume) as jsonl_sink, \
+            QuarantineSink(QUARANTINE_OUTPUT, resume=resume) as quarantine_sink:
+        # A file counts as done only once it reached both reports.
+        completed = csv_sink.completed_paths & jsonl_sink.completed_paths
+        if completed:
+            logger.info("Resuming: %d files already in the reports.", len(completed))
+
+        print("\n=== PII Detection Summary ===")
+        for result in pipeline.iter_results(files_with_mime, skip_paths=completed):
+            csv_sink.write(result)
+            jsonl_sink.write(result)
+            quarantine_sink.write(result)
+            OutputHandler.display_result(result)
+            seconds_saved += result.seconds_saved
+            quarantined += result.quarantined
+            limited += bool(result.limits) and not result.quarantined
 
-    print(f"Found {len(files_with_mime)} potential PII files. Processing in parallel...")
+    cache.evict(max_age_days=CACHE_MAX_AGE_DAYS)
+    cache.close()
 
-    # === Module 2 & 3: Parallel Processing with Hash Skipping ===
-    results = []
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        processed_files = list(executor.map(lambda f: process_file(*f, previous_hashes), files_with_mime))
+    if not input_handler.stats["files_collected"]:
+        print("No valid files detected.")
+        return
+    if tiered:
+        logger.info("Tiered analysis saved an estimated %.1fs of transformer NER.", seconds_saved)
+    report_dedup(pipeline.dedup_stats)
+    report_limits(quarantined, limited, pipeline.restarts, QUARANTINE_OUTPUT)
+    logger.info("Scan complete. Check CSV/JSONL reports for details.")
 
-    # Filter out skipped files (None results)
-    results = [res for res in processed_files if res is not None]
 
-    # === Module 5: Save & Display Results ===
-    OutputHandler.display_summary(results)
-    OutputHandler.save_to_csv(results)
-    OutputHandler.save_to_json(results)
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv and sys.stdin.isatty():
+        instrumentation.configure_logging()
+        interactive()
+        return EXIT_NO_PII
+    args = parse_args(argv)
+    try:
+        return run(args)
+    except Exception as e:
+        # Uncaught, Python would exit with 1 - the same as EXIT_PII_FOUND.
+        logger.exception("Scan failed: %s", e)
+        return EXIT_ERROR
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,167 @@
+import os
+import fnmatch
+import threading
+from typing import Iterable, Optional
+
+import instrumentation
+
+HEADER_SIZE = 2048  # Enough for every signature below and a fair text/binary guess
+
+# Extensions that never hold extractable text for the scanner - skipped without opening the file.
+SKIPPED_EXTENSIONS = {
+    ".exe", ".dll", ".so", ".dylib", ".sys", ".msi", ".bin", ".iso", ".img", ".dmg",
+    ".zip", ".gz", ".tgz", ".bz2", ".xz", ".7z", ".rar", ".tar", ".jar", ".war", ".apk", ".cab",
+    ".mp3", ".wav", ".flac", ".aac", ".ogg", ".m4a", ".wma",
+    ".mp4", ".avi", ".mkv", ".mov", ".wmv", ".flv", ".webm", ".m4v", ".mpg", ".mpeg",
+    ".gif", ".bmp", ".ico", ".svg", ".psd", ".webp", ".heic",
+    ".ttf", ".otf", ".woff", ".woff2", ".eot",
+    ".class", ".pyc", ".pyo", ".o", ".obj", ".a", ".lib", ".pdb",
+    ".sqlite", ".sqlite3", ".db", ".mdb", ".accdb", ".pst", ".ost", ".vmdk", ".vhd", ".vhdx",
+    ".json",  # libmagic reports application/json, which the scanner never accepted
+}
+
+OOXML_EXTENSIONS = {
+    ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    ".docm": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    ".dotx": "application/vnd.openxmlformats-officedocument.wordprocessingml.template",
+    ".xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    ".xlsm": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    ".pptx": "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+    ".pptm": "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+}
+
+# (offset, magic bytes, mime type). None means "known, but not something we scan".
+SIGNATURES = [
+    (0, b"%PDF-", "application/pdf"),
+    (0, b"\x89PNG\r\n\x1a\n", "image/png"),
+    (0, b"\xff\xd8\xff", "image/jpeg"),
+    (0, b"II*\x00", "image/tiff"),
+    (0, b"MM\x00*", "image/tiff"),
+    (0, b"%!PS", None),
+    (0, b"\x7fELF", None),
+    (0, b"MZ", None),
+    (0, b"GIF87a", None),
+    (0, b"GIF89a", None),
+    (0, b"\x1f\x8b", None),
+    (0, b"BZh", None),
+    (0, b"\xfd7zXZ\x00", None),
+    (0, b"7z\xbc\xaf\x27\x1c", None),
+    (0, b"Rar!\x1a\x07", None),
+    (0, b"OggS", None),
+    (0, b"ID3", None),
+    (0, b"RIFF", None),
+    (0, b"SQLite format 3\x00", None),
+    (4, b"ftyp", None),
+]
+
+ZIP_SIGNATURE = b"PK\x03\x04"
+OLE_SIGNATURE = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+
+
+class MimeClassifier:
+    """Tiered file type detection that only falls back to libmagic when it must.
+
+    1. Globs, size limits and well-known binary extensions decide without
+       opening the file.
+    2. A small header read is matched against built-in signatures
+       (PDF/PNG/JPEG/TIFF/OOXML/OLE and common binaries) and a text check.
+    3. Anything still ambiguous goes to libmagic.
+
+    One instance can be shared by concurrent walkers: the only mutable
+    state is a per-thread libmagic handle and lock-protected counters.
+    """
+
+    def __init__(self, include_globs: Optional[Iterable[str]] = None, exclude_globs: Optional[Iterable[str]] = None,
+                 max_file_size: Optional[int] = None):
+        self.include_globs = list(include_globs or [])
+        self.exclude_globs = list(exclude_globs or [])
+        self.max_file_size = max_file_size
+        self.stats = {"excluded": 0, "extension": 0, "signature": 0, "libmagic": 0}
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+
+    def is_excluded(self, path: str) -> bool:
+        """True if the path (file or directory) matches an exclude glob."""
+        name = os.path.basename(path)
+        return any(fnmatch.fnmatch(name, g) or fnmatch.fnmatch(path, g) for g in self.exclude_globs)
+
+    def is_included(self, path: str) -> bool:
+        if not self.include_globs:
+            return True
+        name = os.path.basename(path)
+        return any(fnmatch.fnmatch(name, g) or fnmatch.fnmatch(path, g) for g in self.include_globs)
+
+    def classify(self, path: str, size: Optional[int] = None) -> Optional[str]:
+        """Return the MIME type of a file, or None if it is filtered out before detection."""
+        with instrumentation.stage("mime"):
+            return self._classify(path, size)
+
+    def _classify(self, path: str, size: Optional[int]) -> Optional[str]:
+        if self.is_excluded(path) or not self.is_included(path):
+            return self._count("excluded", None)
+
+        if size is None:
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                return self._count("excluded", None)
+        if size == 0:
+            return self._count("extension", "inode/x-empty")
+        if self.max_file_size is not None and size > self.max_file_size:
+            return self._count("excluded", None)
+
+        extension = os.path.splitext(path)[1].lower()
+        if extension in SKIPPED_EXTENSIONS:
+            return self._count("extension", "application/octet-stream")
+
+        try:
+            with open(path, "rb") as file:
+                header = file.read(HEADER_SIZE)
+        except OSError:
+            return "unknown"
+
+        mime_type = self._match_header(header, extension)
+        if mime_type is not None:
+            return self._count("signature", mime_type)
+        return self._count("libmagic", self._libmagic(path))
+
+    @staticmethod
+    def _match_header(header: bytes, extension: str) -> Optional[str]:
+        """Classify from the header alone; None means ambiguous."""
+        for offset, signature, mime_type in SIGNATURES:
+            if header.startswith(signature, offset):
+                return mime_type or "application/octet-stream"
+
+        if header.startswith(ZIP_SIGNATURE):
+            # OOXML packages are zips; the extension tells which kind. Anything else is ambiguous.
+            return OOXML_EXTENSIONS.get(extension)
+        if header.startswith(OLE_SIGNATURE):
+            return "application/msword" if extension in (".doc", ".dot") else None
+
+        if header.startswith((b"\xff\xfe", b"\xfe\xff", b"\xef\xbb\xbf")):
+            return "text/plain"
+        if b"\x00" in header:
+            return None  # Binary we don't recognise
+        try:
+            header.decode("utf-8")
+        except UnicodeDecodeError as e:
+            # A multi-byte character cut off by the header size is still text.
+            if e.start < len(header) - 3:
+                return None
+        return "text/plain"
+
+    def _libmagic(self, path: str) -> str:
+        try:
+            detector = getattr(self._local, "mime_detector", None)
+            if detector is None:
+                import magic  # Only needed for files the cheaper tiers can't classify
+                # libmagic handles are not thread-safe, so each walker gets its own.
+                detector = self._local.mime_detector = magic.Magic(mime=True)
+            return detector.from_file(path)
+        except Exception:
+            return "unknown"
+
+    def _count(self, tier: str, mime_type: Optional[str]) -> Optional[str]:
+        with self._stats_lock:
+            self.stats[tier] += 1
+        return mime_type
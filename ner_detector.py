@@ -1,14 +1,131 @@
-import spacy
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+# spaCy labels we report, mapped to the keys used in the results dict.
+ENTITY_KEYS = {
+    'PERSON': 'names',
+    'DATE': 'dates',
+    'ORG': 'orgs',
+}
+
+# Pipeline components NER doesn't need - skipping them saves most of the non-transformer work.
+UNUSED_COMPONENTS = ["tagger", "parser", "attribute_ruler", "lemmatizer", "senter"]
+
+MAX_CHUNK_CHARS = 2000  # Keeps transformer inputs (and memory) bounded on long documents
+BATCH_SIZE = 32
+
+TRANSFORMER_MODEL = "en_core_web_trf"
+SMALL_MODEL = "en_core_web_sm"  # Statistical model used to triage text in tiered analysis
+
+# Detector selections: the NER model each one runs (None = regex only).
+DETECTOR_MODELS = {
+    "regex": None,
+    "small": SMALL_MODEL,
+    "transformer": TRANSFORMER_MODEL,
+}
+
+_models = {}
+
+
+def _load_model(name: str):
+    """Load a spaCy pipeline once per process, on first use."""
+    if name not in _models:
+        import spacy  # Importing spaCy alone takes seconds, so only NER runs pay for it
+        nlp = spacy.load(name)
+        unused = [pipe for pipe in UNUSED_COMPONENTS if pipe in nlp.pipe_names]
+        if unused:
+            nlp.select_pipes(disable=unused)
+        _models[name] = nlp
+    return _models[name]
+
 
 class NERDetector:
-    nlp = spacy.load("en_core_web_trf")
+    model_name: Optional[str] = TRANSFORMER_MODEL  # None disables NER
+
+    @staticmethod
+    def configure(detectors: str):
+        """Select the detectors: "regex" (no NER), "small" or "transformer"."""
+        if detectors not in DETECTOR_MODELS:
+            raise ValueError(f"Unknown detectors {detectors!r}, expected one of {', '.join(DETECTOR_MODELS)}")
+        NERDetector.model_name = DETECTOR_MODELS[detectors]
+
+    @staticmethod
+    def model():
+        return _load_model(NERDetector.model_name)
+
+    @staticmethod
+    def small_model():
+        return _load_model(SMALL_MODEL)
 
     @staticmethod
     def detect(text: str) -> dict:
-        doc = NERDetector.nlp(text)
-        entities = {
-            'names': [ent.text for ent in doc.ents if ent.label_ == 'PERSON'],
-            'dates': [ent.text for ent in doc.ents if ent.label_ == 'DATE'],
-            'orgs': [ent.text for ent in doc.ents if ent.label_ == 'ORG'],
-        }
-        return {k: v for k, v in entities.items() if v}
+        return NERDetector.detect_batch([text])[0]
+
+    @staticmethod
+    def detect_batch(texts: List[str], batch_size: int = BATCH_SIZE, n_process: int = 1,
+                     max_chars: int = MAX_CHUNK_CHARS) -> List[dict]:
+        """Detect entities in many documents at once, returning one dict per document."""
+        results = [{key: [] for key in ENTITY_KEYS.values()} for _ in texts]
+        for index, label, _start, _end, value in NERDetector.iter_entities(texts, batch_size, n_process, max_chars):
+            results[index][ENTITY_KEYS[label]].append(value)
+        return [{k: v for k, v in entities.items() if v} for entities in results]
+
+    @staticmethod
+    def iter_entities(texts: List[str], batch_size: int = BATCH_SIZE, n_process: int = 1,
+                      max_chars: int = MAX_CHUNK_CHARS) -> Iterator[Tuple[int, str, int, int, str]]:
+        """Yield (text_index, label, start, end, text) with offsets into the original text.
+
+        Every document is split into bounded chunks and the chunks of all
+        documents are streamed through `nlp.pipe`, so the transformer sees
+        full batches regardless of how many files or how long they are.
+        """
+        if NERDetector.model_name is None:
+            return
+
+        def chunks():
+            for index, text in enumerate(texts):
+                for offset, chunk in NERDetector.chunk_text(text, max_chars):
+                    yield chunk, (index, offset)
+
+        docs = NERDetector.model().pipe(chunks(), as_tuples=True, batch_size=batch_size, n_process=n_process)
+        for doc, (index, offset) in docs:
+            for ent in doc.ents:
+                if ent.label_ in ENTITY_KEYS:
+                    yield index, ent.label_, offset + ent.start_char, offset + ent.end_char, ent.text
+
+    @staticmethod
+    def chunk_entities(chunks: Iterable[str], nlp=None, batch_size: int = BATCH_SIZE,
+                       n_process: int = 1) -> Iterator[List[Tuple[str, str]]]:
+        """Yield the reported (label, text) entities of every chunk, in order.
+
+        Chunks should already be at most MAX_CHUNK_CHARS long (see chunk_text).
+        nlp defaults to the configured model.
+        """
+        if nlp is None and NERDetector.model_name is None:
+            yield from ([] for _chunk in chunks)
+            return
+        docs = (nlp or NERDetector.model()).pipe(chunks, batch_size=batch_size, n_process=n_process)
+        for doc in docs:
+            yield [(ent.label_, ent.text) for ent in doc.ents if ent.label_ in ENTITY_KEYS]
+
+    @staticmethod
+    def chunk_text(text: str, max_chars: int = MAX_CHUNK_CHARS) -> List[Tuple[int, str]]:
+        """Split text into (offset, chunk) pieces of at most max_chars.
+
+        Cuts prefer paragraph, line, sentence and finally word boundaries so
+        that entities are rarely split between two chunks.
+        """
+        chunks = []
+        start = 0
+        length = len(text)
+        while start < length:
+            end = min(start + max_chars, length)
+            if end < length:
+                for separator in ("\n\n", "\n", ". ", " "):
+                    cut = text.rfind(separator, start + max_chars // 2, end)
+                    if cut != -1:
+                        end = cut + len(separator)
+                        break
+            if text[start:end].strip():
+                chunks.append((start, text[start:end]))
+            start = end
+        return chunks
@@ -0,0 +1,205 @@
+import os
+import queue
+import logging
+import shutil
+import threading
+import subprocess
+import importlib.util
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+# tesserocr and OpenCV are imported by the backend that uses them.
+HAVE_TESSEROCR = importlib.util.find_spec("tesserocr") is not None
+
+logger = logging.getLogger(__name__)
+
+OCR_BACKENDS = ("auto", "tesserocr", "cli")
+ENGINE_WAIT_SECONDS = 1.0  # How long a thread waits for a busy engine before checking for a free slot again
+
+
+@dataclass
+class OcrConfig:
+    """How OCR is run. Defaults can be overridden with PII_OCR_* / TESSERACT_CMD environment variables,
+    and those with the command line's OCR options."""
+    backend: str = "auto"                # "tesserocr", "cli", or "auto" (tesserocr when installed)
+    tesseract_cmd: str = "tesseract"     # Binary used by the cli backend (name on PATH or full path)
+    tessdata_dir: Optional[str] = None   # Language data directory, if not Tesseract's default
+    lang: str = "eng"
+    psm: int = 3                         # Page segmentation mode (3 = fully automatic)
+    timeout: float = 60.0                # Seconds per image; 0 disables the limit
+    workers: int = max(1, min(4, os.cpu_count() or 1))  # Concurrent OCR calls (and tesserocr engines)
+
+    @classmethod
+    def from_env(cls) -> "OcrConfig":
+        env = os.environ
+        config = cls()
+        config.backend = env.get("PII_OCR_BACKEND", config.backend)
+        config.tesseract_cmd = env.get("TESSERACT_CMD", config.tesseract_cmd)
+        config.tessdata_dir = env.get("PII_OCR_TESSDATA_DIR", config.tessdata_dir)
+        config.lang = env.get("PII_OCR_LANG", config.lang)
+        config.psm = int(env.get("PII_OCR_PSM", config.psm))
+        config.timeout = float(env.get("PII_OCR_TIMEOUT", config.timeout))
+        config.workers = int(env.get("PII_OCR_WORKERS", config.workers))
+        return config
+
+
+class OcrBackend(ABC):
+    """Turns an in-memory image (grayscale or BGR numpy array) into text."""
+
+    def __init__(self, config: OcrConfig):
+        self.config = config
+
+    @abstractmethod
+    def image_to_string(self, image: np.ndarray) -> str:
+        """Recognise the text of one image; "" if it can't be read."""
+
+    def close(self):
+        pass
+
+
+class TesserocrBackend(OcrBackend):
+    """Long-lived Tesseract engines driven through the C API (tesserocr).
+
+    Language data is loaded once per engine rather than once per image, and
+    images are handed over as raw pixel buffers. Engines are created on
+    demand up to config.workers and shared by the calling threads; tesserocr
+    releases the GIL while recognising.
+    """
+
+    def __init__(self, config: OcrConfig):
+        super().__init__(config)
+        self._idle = queue.LifoQueue()  # Most recently used engine first, its caches are warm
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def image_to_string(self, image: np.ndarray) -> str:
+        api = self._acquire()
+        try:
+            if image.ndim == 3:
+                image = image[..., ::-1]  # Tesseract expects RGB
+            image = np.ascontiguousarray(image)  # Crops are views with a larger stride
+            height, width = image.shape[:2]
+            channels = 1 if image.ndim == 2 else image.shape[2]
+            api.SetImageBytes(image.tobytes(), width, height, channels, width * channels)
+            if not api.Recognize(timeout=int(self.config.timeout * 1000)):
+                logger.warning("OCR timed out after %ss, image skipped.", self.config.timeout)
+                return ""
+            return api.GetUTF8Text()
+        finally:
+            api.Clear()
+            self._idle.put(api)
+
+    def _acquire(self):
+        while True:
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+            with self._lock:
+                create = self._created < self.config.workers
+                if create:
+                    self._created += 1
+            if create:
+                break
+            try:
+                # Wait for another thread to finish with its engine; check again in case creating one failed.
+                return self._idle.get(timeout=ENGINE_WAIT_SECONDS)
+            except queue.Empty:
+                continue
+        try:
+            import tesserocr
+            kwargs = {"path": self.config.tessdata_dir} if self.config.tessdata_dir else {}
+            return tesserocr.PyTessBaseAPI(lang=self.config.lang, psm=self.config.psm, **kwargs)
+        except BaseException:
+            # Give the slot back, or threads would wait forever for an engine that was never made.
+            with self._lock:
+                self._created -= 1
+            raise
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().End()
+            except queue.Empty:
+                break
+
+
+class TesseractCliBackend(OcrBackend):
+    """Runs the tesseract binary, piping the image through stdin/stdout.
+
+    Fallback for when tesserocr (a requirement) can't be installed, e.g.
+    without the Tesseract development libraries. Every image starts a
+    process, but no temp files are written and the timeout kills a stuck
+    process.
+    """
+
+    def __init__(self, config: OcrConfig):
+        super().__init__(config)
+        if shutil.which(config.tesseract_cmd) is None:
+            logger.warning("Tesseract binary not found: %s (set --tesseract-cmd or TESSERACT_CMD)",
+                           config.tesseract_cmd)
+        self._command = [config.tesseract_cmd, "stdin", "stdout", "-l", config.lang, "--psm", str(config.psm)]
+        if config.tessdata_dir:
+            self._command += ["--tessdata-dir", config.tessdata_dir]
+
+    def image_to_string(self, image: np.ndarray) -> str:
+        import cv2
+        # PNM is uncompressed, so encoding costs next to nothing compared to PNG.
+        ok, encoded = cv2.imencode(".pgm" if image.ndim == 2 else ".ppm", image)
+        if not ok:
+            logger.error("Could not encode image for OCR.")
+            return ""
+        try:
+            result = subprocess.run(self._command, input=encoded.tobytes(), stdout=subprocess.PIPE,
+                                    stderr=subprocess.PIPE, timeout=self.config.timeout or None)
+        except subprocess.TimeoutExpired:
+            logger.warning("OCR timed out after %ss, image skipped.", self.config.timeout)
+            return ""
+        if result.returncode != 0:
+            logger.error("Tesseract failed: %s", result.stderr.decode("utf-8", errors="ignore").strip())
+            return ""
+        return result.stdout.decode("utf-8", errors="ignore")
+
+
+_config: Optional[OcrConfig] = None
+_backend: Optional[OcrBackend] = None
+_backend_lock = threading.Lock()
+
+
+def configure(config: OcrConfig):
+    """Use `config` for OCR in this process, replacing any backend already created."""
+    global _config, _backend
+    with _backend_lock:
+        if _backend is not None:
+            _backend.close()
+        _config, _backend = config, None
+
+
+def get_config() -> OcrConfig:
+    global _config
+    with _backend_lock:
+        if _config is None:
+            _config = OcrConfig.from_env()
+        return _config
+
+
+def get_backend() -> OcrBackend:
+    """The process-wide OCR backend, created on first use."""
+    global _backend
+    config = get_config()
+    with _backend_lock:
+        if _backend is None:
+            use_tesserocr = config.backend in ("tesserocr", "auto")
+            if use_tesserocr and not HAVE_TESSEROCR:
+                logger.warning("tesserocr is not installed, falling back to the tesseract binary "
+                               "(one process per image; pip install -r requirements.txt to fix).")
+                use_tesserocr = False
+            _backend = TesserocrBackend(config) if use_tesserocr else TesseractCliBackend(config)
+        return _backend
+
+
+def image_to_string(image: np.ndarray) -> str:
+    return get_backend().image_to_string(image)
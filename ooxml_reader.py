@@ -0,0 +1,223 @@
+import re
+import zipfile
+from typing import Dict, Iterator, List, Optional
+from xml.parsers import expat
+
+# Office Open XML (DOCX, XLSX, PPTX) text extraction straight from the zip:
+# each XML part is decompressed and fed block by block to expat, and text is
+# collected from the parser's callbacks without building any element tree,
+# so memory stays flat however large the document is.
+
+READ_BLOCK_BYTES = 64 * 1024
+
+# Namespaces in transitional (what Office writes) and strict OOXML.
+WORDPROCESSING_NS = ("http://schemas.openxmlformats.org/wordprocessingml/2006/main",
+                     "http://purl.oclc.org/ooxml/wordprocessingml/main")
+SPREADSHEET_NS = ("http://schemas.openxmlformats.org/spreadsheetml/2006/main",
+                  "http://purl.oclc.org/ooxml/spreadsheetml/main")
+DRAWING_NS = ("http://schemas.openxmlformats.org/drawingml/2006/main",
+              "http://purl.oclc.org/ooxml/drawingml/main")
+PRESENTATION_NS = ("http://schemas.openxmlformats.org/presentationml/2006/main",
+                   "http://purl.oclc.org/ooxml/presentationml/main")
+MARKUP_COMPATIBILITY_NS = ("http://schemas.openxmlformats.org/markup-compatibility/2006",)
+
+# Larger shared string tables aren't loaded to resolve cell references;
+# their strings are emitted as a list and the sheets contribute the other cells.
+SHARED_STRINGS_MAX_BYTES = 32 * 1024 * 1024
+
+# What an element contributes to the text.
+TEXT, TAB, BREAK, PARAGRAPH, SKIP = range(5)
+
+
+def _actions(namespaces, **local_names) -> Dict[str, int]:
+    # Element names as expat reports them with namespace_separator="}": "namespace}local"
+    return {f"{ns}}}{name}": action for ns in namespaces for name, action in local_names.items()}
+
+
+DOCX_ACTIONS = {
+    # w:tabs holds tab stop definitions, not tab characters. mc:Fallback repeats text boxes as VML.
+    **_actions(WORDPROCESSING_NS, t=TEXT, tab=TAB, ptab=TAB, br=BREAK, cr=BREAK, p=PARAGRAPH, tabs=SKIP),
+    **_actions(DRAWING_NS, t=TEXT, br=BREAK, p=PARAGRAPH),
+    **_actions(MARKUP_COMPATIBILITY_NS, Fallback=SKIP),
+}
+PPTX_ACTIONS = {
+    **_actions(DRAWING_NS, t=TEXT, br=BREAK, p=PARAGRAPH),
+    # Legacy comments hold plain text in <p:cm><p:text>; modern ones DrawingML paragraphs, as above.
+    **_actions(PRESENTATION_NS, text=TEXT, cm=PARAGRAPH),
+    **_actions(MARKUP_COMPATIBILITY_NS, Fallback=SKIP),
+}
+# Shared strings (one <si> each) and comments; rPh is a phonetic reading of the text before it.
+SHARED_STRING_ACTIONS = _actions(SPREADSHEET_NS, t=TEXT, si=PARAGRAPH, rPh=SKIP)
+XLSX_COMMENT_ACTIONS = _actions(SPREADSHEET_NS, t=TEXT, comment=PARAGRAPH, rPh=SKIP)
+
+# Parts read from each kind of package, in this order; numbered parts in numeric order.
+DOCX_PARTS = [r"word/document\d*\.xml", r"word/header\d*\.xml", r"word/footer\d*\.xml",
+              r"word/footnotes\.xml", r"word/endnotes\.xml", r"word/comments\.xml"]
+XLSX_SHARED_STRINGS = "xl/sharedStrings.xml"
+XLSX_SHEETS = r"xl/worksheets/sheet\d*\.xml"
+XLSX_COMMENTS = r"xl/comments\d*\.xml"
+PPTX_PARTS = [r"ppt/slides/slide\d*\.xml", r"ppt/notesSlides/notesSlide\d*\.xml", r"ppt/comments/comment\d*\.xml",
+              r"ppt/comments/modernComment[\w-]*\.xml"]
+
+
+def iter_text(file_path: str, mime_type: str) -> Iterator[str]:
+    """Text of a DOCX, XLSX or PPTX file (by the MIME subtype) as consecutive pieces."""
+    with zipfile.ZipFile(file_path) as archive:
+        if "wordprocessingml" in mime_type:
+            for name in _part_names(archive, DOCX_PARTS):
+                yield from _parse(archive, name, MarkupText(DOCX_ACTIONS))
+        elif "spreadsheetml" in mime_type:
+            yield from _iter_workbook(archive)
+        elif "presentationml" in mime_type:
+            for name in _part_names(archive, PPTX_PARTS):
+                yield from _parse(archive, name, MarkupText(PPTX_ACTIONS))
+
+
+def _part_names(archive: zipfile.ZipFile, patterns: List[str]) -> List[str]:
+    names = archive.namelist()
+    ordered = []
+    for pattern in patterns:
+        matches = [name for name in names if re.fullmatch(pattern, name)]
+        ordered += sorted(matches, key=lambda name: [int(d) if d.isdigit() else d for d in re.split(r"(\d+)", name)])
+    return ordered
+
+
+def _reject_doctype(*args):
+    raise ValueError("DTDs are not allowed in OOXML parts")  # Rules out entity expansion bombs
+
+
+def _parse(archive: zipfile.ZipFile, name: str, handler) -> Iterator[str]:
+    """Feed one part to expat a block at a time, yielding the pieces `handler` completes after each block."""
+    parser = expat.ParserCreate(namespace_separator="}")
+    parser.buffer_text = True  # One character data callback per text run, not per line or entity
+    parser.StartDoctypeDeclHandler = _reject_doctype
+    parser.StartElementHandler = handler.start
+    parser.EndElementHandler = handler.end
+    parser.CharacterDataHandler = handler.characters
+    pieces = handler.pieces
+    with archive.open(name) as stream:
+        while True:
+            block = stream.read(READ_BLOCK_BYTES)
+            parser.Parse(block, not block)
+            if pieces:
+                yield from pieces
+                pieces.clear()
+            if not block:
+                break
+    if handler.buffer:
+        yield "".join(handler.buffer)
+
+
+class MarkupText:
+    """Expat callbacks turning a part into text, one piece per paragraph (ending in a newline)."""
+
+    def __init__(self, actions: Dict[str, int]):
+        self.actions = actions
+        self.pieces: List[str] = []
+        self.buffer: List[str] = []
+        self.skipping = 0
+        self.in_text = False
+
+    def start(self, name, attributes):
+        action = self.actions.get(name)
+        if action == TEXT:
+            self.in_text = not self.skipping
+        elif action == SKIP:
+            self.skipping += 1
+
+    def end(self, name):
+        action = self.actions.get(name)
+        if action is None or (self.skipping and action != SKIP):
+            return
+        if action == TEXT:
+            self.in_text = False
+        elif action == TAB:
+            self.buffer.append("\t")
+        elif action == BREAK:
+            self.buffer.append("\n")
+        elif action == PARAGRAPH:  # A text box's paragraphs end inside the paragraph anchoring it
+            self.buffer.append("\n")
+            self.pieces.append("".join(self.buffer))
+            self.buffer.clear()
+        else:
+            self.skipping -= 1
+
+    def characters(self, data):
+        if self.in_text:
+            self.buffer.append(data)
+
+
+def _iter_workbook(archive: zipfile.ZipFile) -> Iterator[str]:
+    """Every sheet as tab-separated rows, then the cell comments."""
+    shared_strings = None
+    if XLSX_SHARED_STRINGS in archive.namelist():
+        strings = _parse(archive, XLSX_SHARED_STRINGS, MarkupText(SHARED_STRING_ACTIONS))
+        if archive.getinfo(XLSX_SHARED_STRINGS).file_size <= SHARED_STRINGS_MAX_BYTES:
+            shared_strings = [piece[:-1] for piece in strings]
+        else:
+            yield from strings
+    for name in _part_names(archive, [XLSX_SHEETS]):
+        yield from _parse(archive, name, SheetText(shared_strings))
+    for name in _part_names(archive, [XLSX_COMMENTS]):
+        yield from _parse(archive, name, MarkupText(XLSX_COMMENT_ACTIONS))
+
+
+class SheetText:
+    """Expat callbacks turning a worksheet into one piece per non-empty row, cell values joined by tabs.
+
+    Without shared_strings, shared string cells are left out (their text
+    was emitted separately). Booleans and error values are skipped;
+    numbers are kept as stored, which is where IDs and phone numbers
+    entered as numbers end up.
+    """
+
+    def __init__(self, shared_strings: Optional[List[str]]):
+        self.shared_strings = shared_strings
+        self.pieces: List[str] = []
+        self.buffer: List[str] = []  # Always empty between rows; _parse flushes leftovers
+        self.row: List[str] = []
+        self.cell_type = None
+        self.value: List[str] = []
+        self.capture = False
+        self.phonetic = 0
+
+    def start(self, name, attributes):
+        local = name.rpartition("}")[2]
+        if local == "c":
+            self.cell_type = attributes.get("t")
+            self.value.clear()
+        elif local in ("v", "t"):
+            self.capture = not self.phonetic
+        elif local == "rPh":
+            self.phonetic += 1
+
+    def end(self, name):
+        local = name.rpartition("}")[2]
+        if local in ("v", "t"):
+            self.capture = False
+        elif local == "c":
+            text = "".join(self.value)
+            if self.cell_type == "s":
+                text = self._shared_string(text)
+            elif self.cell_type in ("b", "e"):
+                text = None
+            if text:
+                self.row.append(text)
+        elif local == "row":
+            if self.row:
+                self.pieces.append("\t".join(self.row) + "\n")
+                self.row.clear()
+        elif local == "rPh":
+            self.phonetic -= 1
+
+    def characters(self, data):
+        if self.capture:
+            self.value.append(data)
+
+    def _shared_string(self, index: str) -> Optional[str]:
+        if self.shared_strings is None:
+            return None
+        try:
+            return self.shared_strings[int(index)]
+        except (ValueError, IndexError):
+            return None
@@ -1,62 +1,127 @@
+import io
+import os
 import csv
 import json
+import time
 import hashlib
-from typing import List, Dict, Tuple
+import logging
+from abc import ABC, abstractmethod
+from typing import List, Dict, Optional, Tuple
+
+import instrumentation
+from scan_result import ScanResult
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+HASH_BUFFER_SIZE = 1024 * 1024  # Large reads keep hashing disk-bound rather than syscall-bound
+TRUNCATE_BLOCK_BYTES = 64 * 1024  # Resuming reads a report backwards in blocks this size to find its last record
+CSV_HEADER = ["File Path", "SHA256 Hash", "PII Type", "Detected Values", "Detection Tier"]
+
+logger = logging.getLogger(__name__)
 
 
 class OutputHandler:
     @staticmethod
-    def compute_file_hash(file_path: str) -> str:
-        """Compute SHA-256 hash of a file."""
-        hasher = hashlib.sha256()
+    def compute_file_hash(file_path: str, algorithm: str = "sha256") -> Optional[str]:
+        """Compute SHA-256 (or another hashlib algorithm) hash of a file."""
+        digests = OutputHandler._hash_file(file_path, hashlib.new(algorithm))
+        return digests[0] if digests else None
+
+    @staticmethod
+    def compute_fingerprint(file_path: str) -> Optional[str]:
+        """Fast non-cryptographic content fingerprint for skip checks (not for reports).
+
+        Uses xxHash when installed and BLAKE2b otherwise; the algorithm is part
+        of the returned key so fingerprints never collide with SHA-256 hashes.
+        """
+        name, hasher = OutputHandler._fingerprint_hasher()
+        digests = OutputHandler._hash_file(file_path, hasher)
+        return f"{name}:{digests[0]}" if digests else None
+
+    @staticmethod
+    def compute_fingerprint_and_hash(file_path: str) -> Tuple[Optional[str], Optional[str]]:
+        """compute_fingerprint and compute_file_hash from a single read of the file."""
+        name, hasher = OutputHandler._fingerprint_hasher()
+        digests = OutputHandler._hash_file(file_path, hasher, hashlib.sha256())
+        return (f"{name}:{digests[0]}", digests[1]) if digests else (None, None)
+
+    @staticmethod
+    def _fingerprint_hasher():
+        if xxhash is not None:
+            return "xxh3", xxhash.xxh3_128()
+        return "blake2b", hashlib.blake2b(digest_size=16)
+
+    @staticmethod
+    def _hash_file(file_path: str, *hashers) -> Optional[List[str]]:
         try:
-            with open(file_path, "rb") as f:
-                while chunk := f.read(8192):
-                    hasher.update(chunk)
-            return hasher.hexdigest()
+            with instrumentation.stage("hash"):
+                buffer = bytearray(HASH_BUFFER_SIZE)
+                view = memoryview(buffer)
+                with open(file_path, "rb", buffering=0) as f:
+                    while size := f.readinto(buffer):
+                        for hasher in hashers:
+                            hasher.update(view[:size])
+                return [hasher.hexdigest() for hasher in hashers]
         except Exception as e:
-            print(f"[ERROR] Could not hash file {file_path}: {e}")
+            logger.error("Could not hash file %s: %s", file_path, e, extra={"file": file_path})
             return None
 
     @staticmethod
-    def save_to_csv(results: List[Tuple[str, Dict[str, List[str]]]], output_file: str = "output/pii_results.csv"):
+    def save_to_csv(results: List[ScanResult], output_file: str = "output/pii_results.csv"):
         """Save PII detection results to a CSV file including file hashes for all scanned files."""
         with open(output_file, mode="w", newline="", encoding="utf-8") as file:
             writer = csv.writer(file)
-            writer.writerow(["File Path", "SHA256 Hash", "PII Type", "Detected Values"])
-
-            for file_path, pii_data in results:
-                file_hash = OutputHandler.compute_file_hash(file_path)
-                if not file_hash:
-                    continue  # Skip files that couldn't be hashed
+            writer.writerow(CSV_HEADER)
 
-                if pii_data:
-                    for pii_type, values in pii_data.items():
-                        writer.writerow([file_path, file_hash, pii_type, ", ".join(values)])
-                else:
-                    writer.writerow([file_path, file_hash, "NONE", "No PII Detected"])
+            for result in results:
+                writer.writerows(OutputHandler.csv_rows(result))
 
-        print(f"[INFO] Results saved to CSV: {output_file}")
+        logger.info("Results saved to CSV: %s", output_file)
 
     @staticmethod
-    def save_to_json(results: List[Tuple[str, Dict[str, List[str]]]], output_file: str = "output/pii_results.json"):
+    def save_to_json(results: List[ScanResult], output_file: str = "output/pii_results.json"):
         """Save PII detection results to a JSON file including file hashes for all scanned files."""
-        formatted_results = []
-        for file_path, pii_data in results:
-            file_hash = OutputHandler.compute_file_hash(file_path)
-            if not file_hash:
-                continue  # Skip files that couldn't be hashed
-
-            formatted_results.append({"file_path": file_path, "file_hash": file_hash, "pii_data": pii_data or {"NONE": ["No PII Detected"]}})
+        formatted_results = [record for record in map(OutputHandler.json_record, results) if record]
 
         with open(output_file, mode="w", encoding="utf-8") as file:
             json.dump(formatted_results, file, indent=4, ensure_ascii=False)
 
-        print(f"[INFO] Results saved to JSON: {output_file}")
+        logger.info("Results saved to JSON: %s", output_file)
+
+    @staticmethod
+    def csv_rows(result: ScanResult) -> List[List[str]]:
+        """CSV rows for one file - one per PII type, or a NONE row."""
+        if not result.file_hash or result.quarantined:
+            return []  # Skip files that couldn't be hashed or scanned
+
+        if result.pii_data:
+            return [[result.file_path, result.file_hash, pii_type, ", ".join(values),
+                     ", ".join(dict.fromkeys(result.pii_tiers.get(pii_type, [])))]
+                    for pii_type, values in result.pii_data.items()]
+        return [[result.file_path, result.file_hash, "NONE", "No PII Detected", ""]]
+
+    @staticmethod
+    def json_record(result: ScanResult) -> Optional[dict]:
+        """JSON object for one file, or None if it couldn't be hashed or scanned."""
+        if not result.file_hash or result.quarantined:
+            return None
+        record = {"file_path": result.file_path, "file_hash": result.file_hash, "pii_data": result.pii_data or {"NONE": ["No PII Detected"]}}
+        if result.pii_tiers:
+            record["pii_tiers"] = result.pii_tiers
+        if result.seconds_saved:
+            record["seconds_saved"] = round(result.seconds_saved, 3)
+        if result.duplicate_of:
+            record["duplicate_of"] = result.duplicate_of
+        if result.limits:
+            record["limits"] = result.limits  # The results are partial
+        return record
 
     @staticmethod
     def load_previous_hashes(input_file: str) -> Dict[str, str]:
-        """Load hashes from an existing CSV/JSON file to skip already scanned files."""
+        """Load hashes from an existing CSV/JSON/JSONL file to skip already scanned files."""
         previous_hashes = {}
 
         try:
@@ -66,28 +131,204 @@ class OutputHandler:
                     for entry in data:
                         previous_hashes[entry["file_hash"]] = entry["file_path"]
 
+            elif input_file.endswith(".jsonl"):
+                with open(input_file, "r", encoding="utf-8") as file:
+                    for line in file:
+                        if line.strip():
+                            entry = json.loads(line)
+                            previous_hashes[entry["file_hash"]] = entry["file_path"]
+
             elif input_file.endswith(".csv"):
                 with open(input_file, "r", encoding="utf-8") as file:
                     reader = csv.DictReader(file)
                     for row in reader:
                         previous_hashes[row["SHA256 Hash"]] = row["File Path"]
 
-            print(f"[INFO] Loaded {len(previous_hashes)} previously scanned files from {input_file}")
+            logger.info("Loaded %d previously scanned files from %s", len(previous_hashes), input_file)
         except Exception as e:
-            print(f"[WARNING] Could not load previous hashes from {input_file}: {e}")
+            logger.warning("Could not load previous hashes from %s: %s", input_file, e)
 
         return previous_hashes
 
     @staticmethod
-    def display_summary(results: List[Tuple[str, Dict[str, List[str]]]]):
+    def display_summary(results: List[ScanResult]):
         """Display a summary of detected PII."""
         print("\n=== PII Detection Summary ===")
-        for file_path, pii_data in results:
-            if pii_data and pii_data.get("NONE") is None:  # If PII was found
-                print(f"[PII DETECTED] {file_path}:")
-                for pii_type, values in pii_data.items():
-                    print(f"  - {pii_type.upper()}: {', '.join(values)}")
-            else:
-                print(f"[NO PII FOUND] {file_path}")
+        for result in results:
+            OutputHandler.display_result(result)
 
         print("\n[INFO] Scan complete. Check CSV/JSON reports for details.")
+
+    @staticmethod
+    def display_result(result: ScanResult):
+        """Display the detected PII of a single file."""
+        if result.quarantined:
+            print(f"[QUARANTINED] {result.file_path}: {'; '.join(result.limits.values())}")
+        elif result.pii_data and result.pii_data.get("NONE") is None:  # If PII was found
+            print(f"[PII DETECTED] {result.file_path}:")
+            for pii_type, values in result.pii_data.items():
+                print(f"  - {pii_type.upper()}: {', '.join(values)}")
+        else:
+            print(f"[NO PII FOUND] {result.file_path}")
+
+
+class ResultSink(ABC):
+    """Append-only report file written as results arrive.
+
+    Output is flushed every flush_every results or flush_interval seconds,
+    so an interrupted run loses at most that much. With resume=True an
+    existing file is kept: a partially written last record is cut off and
+    the paths already recorded are exposed in completed_paths so the scan
+    can skip them, and those recorded with PII in completed_pii_paths.
+    """
+
+    record_terminator = "\n"
+
+    def __init__(self, output_file: str, resume: bool = False, flush_every: int = 100, flush_interval: float = 5.0):
+        self.output_file = output_file
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.completed_paths = set()
+        self.completed_pii_paths = set()
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+
+        directory = os.path.dirname(output_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        if resume and os.path.exists(output_file):
+            self._truncate_partial_record()
+        if resume and os.path.exists(output_file) and os.path.getsize(output_file) > 0:
+            self.completed_paths = self._read_completed_paths()
+            self.file = open(output_file, mode="a", newline="", encoding="utf-8")
+        else:
+            self.file = open(output_file, mode="w", newline="", encoding="utf-8")
+            self._write_header()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, result: ScanResult):
+        with instrumentation.stage("write"):
+            self._write(result)
+
+    def _write(self, result: ScanResult):
+        text = self._format(result)
+        if text:
+            self.file.write(text)  # One write per result keeps records whole on interruption
+        self.completed_paths.add(result.file_path)
+        self._unflushed += 1
+        if self._unflushed >= self.flush_every or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        self.file.flush()
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+        logger.info("Results saved to %s", self.output_file)
+
+    def _truncate_partial_record(self):
+        """Cut the file back to the end of its last complete record, reading backwards from the end."""
+        terminator = self.record_terminator.encode("utf-8")
+        with open(self.output_file, "rb+") as file:
+            end = file.seek(0, os.SEEK_END)
+            position = end
+            tail = b""  # Bytes after position, kept as long as a terminator could straddle the block boundary
+            while position > 0:
+                size = min(position, TRUNCATE_BLOCK_BYTES)
+                position -= size
+                file.seek(position)
+                block = file.read(size) + tail
+                if position + len(block) == end and block.endswith(terminator):
+                    return  # The last record is complete
+                found = block.rfind(terminator)
+                if found != -1:
+                    file.truncate(position + found + len(terminator))
+                    return
+                tail = block[:len(terminator) - 1]
+            file.truncate(0)
+
+    def _write_header(self):
+        pass
+
+    @abstractmethod
+    def _format(self, result: ScanResult) -> str:
+        """The text to append for one result ("" to write nothing)."""
+
+    @abstractmethod
+    def _read_completed_paths(self) -> set:
+        """Paths recorded in the existing file, read when resuming."""
+
+
+class CsvResultSink(ResultSink):
+    """Streams rows in the same layout as OutputHandler.save_to_csv."""
+
+    # csv.writer ends records with \r\n, while newlines inside quoted values stay \n.
+    record_terminator = "\r\n"
+
+    def _write_header(self):
+        csv.writer(self.file).writerow(CSV_HEADER)
+        self.flush()
+
+    def _format(self, result: ScanResult) -> str:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(OutputHandler.csv_rows(result))
+        return buffer.getvalue()
+
+    def _read_completed_paths(self) -> set:
+        completed = set()
+        with open(self.output_file, "r", newline="", encoding="utf-8") as file:
+            for row in csv.DictReader(file):
+                completed.add(row["File Path"])
+                if row["PII Type"] != "NONE":
+                    self.completed_pii_paths.add(row["File Path"])
+        return completed
+
+
+class JsonlResultSink(ResultSink):
+    """Streams one JSON object per line, with the fields of OutputHandler.save_to_json."""
+
+    def _format(self, result: ScanResult) -> str:
+        record = OutputHandler.json_record(result)
+        return json.dumps(record, ensure_ascii=False) + "\n" if record else ""
+
+    def _read_completed_paths(self) -> set:
+        completed = set()
+        with open(self.output_file, "r", encoding="utf-8") as file:
+            for line in file:
+                if line.strip():
+                    record = json.loads(line)
+                    completed.add(record["file_path"])
+                    if set(record["pii_data"]) != {"NONE"}:
+                        self.completed_pii_paths.add(record["file_path"])
+        return completed
+
+
+class QuarantineSink(ResultSink):
+    """JSON Lines report of the files that ran into resource limits; other results are not written.
+
+    quarantined files have no results (their worker was killed or crashed);
+    the others were scanned only partly (e.g. pages skipped, images
+    downscaled) and are in the main reports too.
+    """
+
+    def _format(self, result: ScanResult) -> str:
+        if not result.limits:
+            return ""
+        record = {"file_path": result.file_path, "file_hash": result.file_hash, "size": result.size,
+                  "mime_type": result.mime_type, "quarantined": result.quarantined, "limits": result.limits}
+        return json.dumps(record, ensure_ascii=False) + "\n"
+
+    def _read_completed_paths(self) -> set:
+        return set()  # Files that hit a limit are scanned again when resuming
@@ -1,13 +1,250 @@
-from regex_detector import RegexDetector
-from ner_detector import NERDetector
+import re
+import time
+import collections
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import instrumentation
+from regex_detector import RegexDetector, ChunkScanner
+from ner_detector import NERDetector, ENTITY_KEYS, BATCH_SIZE, SMALL_MODEL, TRANSFORMER_MODEL
+
+# Tiered analysis: a window goes to the transformer if it has a regex hit, enough
+# capitalized words, or the small model finds any entity in it.
+TRIAGE_CAPITALIZED_DENSITY = 0.2
+
+# Why triage sent a window to the transformer, reported with its findings (e.g. "transformer via regex").
+TRIAGE_REGEX = "regex"
+TRIAGE_CAPITALIZED = "capitalized"
+TRIAGE_SMALL = "small model"
+
+_WORD = re.compile(r"[^\W\d_]+")
+
+# Tier reported for NER findings, by model.
+NER_TIERS = {SMALL_MODEL: "small", TRANSFORMER_MODEL: "transformer"}
+
+
+def capitalized_density(text: str) -> float:
+    """Share of words starting with an upper-case letter (names, organisations, months)."""
+    words = _WORD.findall(text)
+    if not words:
+        return 0.0
+    return sum(1 for word in words if word[0].isupper()) / len(words)
 
 
 class PIIAnalyzer:
+    # Measured cost of both NER tiers in this process, used to estimate the time tiering saves.
+    tier_totals = collections.Counter()
+
+    @staticmethod
+    def configure(detectors: str):
+        """Select "regex", "small" or "transformer" detectors (see NERDetector.configure)."""
+        NERDetector.configure(detectors)
+
+    @staticmethod
+    def load(tiered: bool = False):
+        """Load the selected models now rather than on the first document."""
+        if NERDetector.model_name is not None:
+            NERDetector.model()
+            if PIIAnalyzer._tiering(tiered):
+                NERDetector.small_model()
+
     @staticmethod
     def analyze(text: str) -> dict:
-        pii_matches = RegexDetector.detect(text)
-        ner_matches = NERDetector.detect(text)
+        with instrumentation.stage("regex"):
+            pii_matches = RegexDetector.detect(text)
+        with instrumentation.stage("ner"):
+            ner_matches = NERDetector.detect(text)
 
         # Merge regex and NER results
         pii_matches.update(ner_matches)
         return pii_matches
+
+    @staticmethod
+    def analyze_batch(texts: List[str], batch_size: int = BATCH_SIZE, n_process: int = 1) -> List[dict]:
+        """Analyze several documents, batching NER across all of them."""
+        ner_results = NERDetector.detect_batch(texts, batch_size=batch_size, n_process=n_process)
+
+        results = []
+        for text, ner_matches in zip(texts, ner_results):
+            pii_matches = RegexDetector.detect(text)
+            pii_matches.update(ner_matches)
+            results.append(pii_matches)
+        return results
+
+    @staticmethod
+    def analyze_batch_detailed(texts: List[str], batch_size: int = BATCH_SIZE, n_process: int = 1,
+                               tiered: bool = False) -> List[Tuple[dict, dict, float]]:
+        """Like analyze_batch, returning (pii_matches, tiers, seconds_saved) per document.
+
+        tiers maps each PII type to the tier that found each of its values
+        ("regex", "small" or "transformer"). With tiered=True (and the
+        transformer selected) only the NER windows picked by triage() go to
+        the transformer, its tier names the triage signal that sent the
+        window (e.g. "transformer via capitalized"), and seconds_saved
+        estimates the transformer time skipped, net of the triage cost. The
+        estimate is 0 until this process has run the transformer on some
+        escalated windows to measure its cost; findings never depend on it.
+        """
+        tiered = PIIAnalyzer._tiering(tiered)
+        chunks = [] if NERDetector.model_name is None else \
+            [(index, chunk) for index, text in enumerate(texts) for _offset, chunk in NERDetector.chunk_text(text)]
+        chunk_texts = [chunk for _index, chunk in chunks]
+        reasons = PIIAnalyzer.triage(chunk_texts, batch_size) if tiered else [None] * len(chunks)
+        # NER tier of each window, None for windows triage skipped
+        chunk_tiers = [PIIAnalyzer._ner_tier(reason) if reason or not tiered else None for reason in reasons]
+
+        started = time.perf_counter()
+        ner_results = [collections.defaultdict(list) for _ in texts]
+        ner_tiers = [collections.defaultdict(list) for _ in texts]
+        escalated = [(chunk, tier) for chunk, tier in zip(chunks, chunk_tiers) if tier]
+        entities = NERDetector.chunk_entities((chunk for (_index, chunk), _tier in escalated), batch_size=batch_size,
+                                              n_process=n_process)
+        for ((index, _chunk), tier), found in zip(escalated, entities):
+            for label, value in found:
+                ner_results[index][ENTITY_KEYS[label]].append(value)
+                ner_tiers[index][ENTITY_KEYS[label]].append(tier)
+        ner_seconds = time.perf_counter() - started
+        if escalated:
+            instrumentation.record("ner", ner_seconds)
+        if NERDetector.model_name == TRANSFORMER_MODEL:
+            PIIAnalyzer._record("transformer", ner_seconds, sum(len(c) for (_i, c), _tier in escalated))
+
+        skipped_chars = collections.Counter()
+        triaged_chars = collections.Counter()
+        for (index, chunk), tier in zip(chunks, chunk_tiers):
+            triaged_chars[index] += len(chunk) if tiered else 0
+            skipped_chars[index] += 0 if tier else len(chunk)
+
+        results = []
+        for index, text in enumerate(texts):
+            with instrumentation.stage("regex"):
+                pii_matches = RegexDetector.detect(text)
+            tiers = {pii_type: ["regex"] * len(values) for pii_type, values in pii_matches.items()}
+            for key in ENTITY_KEYS.values():
+                if ner_results[index].get(key):
+                    pii_matches[key] = ner_results[index][key]
+                    tiers[key] = ner_tiers[index][key]
+            saved = PIIAnalyzer.estimate_saved(skipped_chars[index], triaged_chars[index]) if tiered else 0.0
+            results.append((pii_matches, tiers, saved))
+        return results
+
+    @staticmethod
+    def analyze_chunks(chunks: Iterable[Tuple[int, str, int, int]], batch_size: int = BATCH_SIZE) -> dict:
+        """Analyze one document supplied as overlapping chunks (see FileReader.iter_text_chunks)."""
+        return PIIAnalyzer.analyze_chunks_detailed(chunks, batch_size)[0]
+
+    @staticmethod
+    def analyze_chunks_detailed(chunks: Iterable[Tuple[int, str, int, int]], batch_size: int = BATCH_SIZE,
+                                tiered: bool = False) -> Tuple[dict, dict, float]:
+        """analyze_chunks returning (pii_matches, tiers, seconds_saved) like analyze_batch_detailed.
+
+        Regex and NER consume the same pass over the chunks, so only a
+        chunk (plus NER's current batches) is in memory at a time.
+        """
+        tiered = PIIAnalyzer._tiering(tiered)
+        scanner = ChunkScanner()
+        sizes = collections.Counter()
+
+        def windows():
+            for offset, text, start, stop in chunks:
+                with instrumentation.stage("regex"):
+                    scanner.feed(offset, text, start, stop)
+                if NERDetector.model_name is None:
+                    continue
+                for _offset, window in NERDetector.chunk_text(text[start - offset:stop - offset]):
+                    yield window
+
+        window_tiers = collections.deque()  # NER tier of each window handed to the model, in order
+
+        def escalated():
+            for window, reason in PIIAnalyzer.iter_triage(windows(), batch_size):
+                sizes["triaged"] += len(window)
+                if reason:
+                    window_tiers.append(PIIAnalyzer._ner_tier(reason))
+                    yield window
+                else:
+                    sizes["skipped"] += len(window)
+
+        def untriaged():
+            for window in windows():
+                window_tiers.append(PIIAnalyzer._ner_tier())
+                yield window
+
+        entities = collections.defaultdict(list)
+        entity_tiers = collections.defaultdict(list)
+        # Reading, regex and NER of a streamed file interleave, so they are timed together.
+        with instrumentation.stage("stream_analysis"):
+            for found in NERDetector.chunk_entities(escalated() if tiered else untriaged(), batch_size=batch_size):
+                tier = window_tiers.popleft()
+                for label, value in found:
+                    entities[ENTITY_KEYS[label]].append(value)
+                    entity_tiers[ENTITY_KEYS[label]].append(tier)
+
+        pii_matches = scanner.result()
+        tiers = {pii_type: ["regex"] * len(values) for pii_type, values in pii_matches.items()}
+        for key, values in entities.items():
+            pii_matches[key] = values
+            tiers[key] = entity_tiers[key]
+        saved = PIIAnalyzer.estimate_saved(sizes["skipped"], sizes["triaged"]) if tiered else 0.0
+        return pii_matches, tiers, saved
+
+    @staticmethod
+    def triage(windows: List[str], batch_size: int = BATCH_SIZE) -> List[Optional[str]]:
+        """For each NER window, why it deserves the transformer (a TRIAGE_* reason), or None."""
+        started = time.perf_counter()
+        reasons = [reason for _window, reason in PIIAnalyzer.iter_triage(windows, batch_size)]
+        triage_seconds = time.perf_counter() - started
+        instrumentation.record("triage", triage_seconds)
+        PIIAnalyzer._record("triage", triage_seconds, sum(map(len, windows)))
+        return reasons
+
+    @staticmethod
+    def iter_triage(windows: Iterable[str], batch_size: int = BATCH_SIZE) -> Iterator[Tuple[str, Optional[str]]]:
+        """Yield (window, reason) in order; reason is the signal that escalates the window, or None.
+
+        Cheap signals (a regex hit, capitalized-word density) decide first;
+        the small statistical model only looks at the windows they don't flag.
+        """
+        def with_signals():
+            for window in windows:
+                if RegexDetector.detect(window):
+                    reason = TRIAGE_REGEX
+                elif capitalized_density(window) >= TRIAGE_CAPITALIZED_DENSITY:
+                    reason = TRIAGE_CAPITALIZED
+                else:
+                    reason = None
+                # Flagged windows pass through the model as empty docs, which cost nothing.
+                yield ("" if reason else window), (window, reason)
+
+        docs = NERDetector.small_model().pipe(with_signals(), as_tuples=True, batch_size=batch_size)
+        for doc, (window, reason) in docs:
+            if reason is None and any(ent.label_ in ENTITY_KEYS for ent in doc.ents):
+                reason = TRIAGE_SMALL
+            yield window, reason
+
+    @staticmethod
+    def estimate_saved(skipped_chars: int, triaged_chars: int) -> float:
+        """Transformer time not spent on skipped_chars, minus the triage time for triaged_chars."""
+        totals = PIIAnalyzer.tier_totals
+        if not totals["transformer_chars"]:
+            return 0.0
+        saved = skipped_chars * totals["transformer_seconds"] / totals["transformer_chars"]
+        if totals["triage_chars"]:
+            saved -= triaged_chars * totals["triage_seconds"] / totals["triage_chars"]
+        return saved
+
+    @staticmethod
+    def _tiering(tiered: bool) -> bool:
+        """Triage only makes sense in front of the transformer."""
+        return tiered and NERDetector.model_name == TRANSFORMER_MODEL
+
+    @staticmethod
+    def _ner_tier(reason: Optional[str] = None) -> str:
+        """Tier of the selected NER model's findings, with the triage reason that escalated the window if any."""
+        tier = NER_TIERS.get(NERDetector.model_name, NERDetector.model_name)
+        return f"{tier} via {reason}" if reason else tier
+
+    @staticmethod
+    def _record(tier: str, seconds: float, chars: int):
+        if chars:
+            PIIAnalyzer.tier_totals[f"{tier}_seconds"] += seconds
+            PIIAnalyzer.tier_totals[f"{tier}_chars"] += chars
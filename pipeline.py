@@ -0,0 +1,642 @@
+import os
+import time
+import logging
+import itertools
+import contextlib
+import threading
+import collections
+import multiprocessing
+import concurrent.futures
+from typing import Iterable, Iterator, List, Optional, Set, Tuple
+
+from output_handler import OutputHandler  # Module 5
+from ner_detector import DETECTOR_MODELS
+from ocr_backend import OcrConfig
+import instrumentation
+from instrumentation import InstrumentationConfig
+import limits
+from limits import ResourceLimits, WorkerMonitor
+from regex_detector import RegexDetector
+from scan_cache import ScanCache, detector_signature
+from scan_result import ScanResult
+
+logger = logging.getLogger(__name__)
+
+_ner_batch_size = None
+_return_text = False
+_tiered = False
+
+DEFAULT_DETECTORS = "transformer"
+
+# Completed scans remembered for in-run deduplication (least recently used are forgotten first).
+DEDUP_MAX_ENTRIES = 100_000
+
+WATCHDOG_INTERVAL_SECONDS = 1.0  # How often the workers are checked against their budgets while waiting
+MAX_UNEXPLAINED_RESTARTS = 3     # Crashes in a row with no worker busy with a file before the scan gives up
+
+
+def _init_worker(ner_batch_size: Optional[int] = None, return_text: bool = False,
+                 ocr_config: Optional[OcrConfig] = None, tiered: bool = False,
+                 detectors: str = DEFAULT_DETECTORS, instrumentation_config: Optional[InstrumentationConfig] = None,
+                 resource_limits: Optional[ResourceLimits] = None, slots=None, slot_counter=None):
+    """Load the detectors once per worker process instead of once per file."""
+    global _ner_batch_size, _return_text, _tiered
+    _ner_batch_size = ner_batch_size
+    _return_text = return_text
+    _tiered = tiered
+    if instrumentation_config is not None:
+        instrumentation.configure(instrumentation_config)
+    if resource_limits is not None:
+        limits.configure(resource_limits)
+    if slots is not None:
+        limits.attach_worker(slots, slot_counter)
+    if ocr_config is not None:
+        import ocr_backend
+        ocr_backend.configure(ocr_config)
+    from pii_analyzer import PIIAnalyzer
+    PIIAnalyzer.configure(detectors)
+    RegexDetector.ensure_loaded()
+    PIIAnalyzer.load(tiered)
+
+
+def process_file(file_path: str, mime_type: str) -> Tuple[str, dict]:
+    """Process a single file - Extract text & Detect PII."""
+    from filereader import FileReader      # Module 2
+    from pii_analyzer import PIIAnalyzer    # Module 3
+
+    reader = FileReader()
+    extracted_text = reader.extract_text(file_path, mime_type)
+
+    if not extracted_text.strip():
+        return (file_path, {})
+
+    pii_results = PIIAnalyzer.analyze(extracted_text)
+    return (file_path, pii_results)
+
+
+def process_batch(items: List[Tuple[str, str, Optional[str]]], batch_id: int = 0) \
+        -> Tuple[List[Tuple[str, dict, Optional[str], dict, float, float, dict]], Optional[dict]]:
+    """Extract every file in the batch, then run NER over all of them in one nlp.pipe stream.
+
+    Items are (file_path, mime_type, cached_text); files with cached text skip
+    extraction. Returns (file_path, pii_data, new_text, pii_tiers,
+    seconds_saved, seconds, limits_hit) per file; newly extracted text is
+    returned when the pipeline caches it, seconds is the time spent on the
+    file and limits_hit the resource limits it ran into. The second element
+    holds this worker's measurements since the last batch (None unless
+    instrumentation is enabled). Each file, and the joint analysis, runs
+    within a limits.budget so the parent's watchdog knows what this worker
+    is doing; a joint analysis that runs out of time is redone file by file.
+    """
+    from filereader import FileReader      # Module 2
+    from pii_analyzer import PIIAnalyzer    # Module 3
+
+    reader = FileReader()
+    kwargs = {"batch_size": _ner_batch_size} if _ner_batch_size else {}
+    kwargs["tiered"] = _tiered
+    texts = [""] * len(items)
+    pii_by_index = {}
+    alone = set()  # Streamed and profiled files, analyzed on their own
+    streamed = set()
+    seconds = [0.0] * len(items)
+    limits_hit = [{} for _ in items]
+    for i, (file_path, mime_type, cached_text) in enumerate(items):
+        started = time.perf_counter()
+        with limits.budget(batch_id, i, file_path):
+            if cached_text is None and reader.should_stream(file_path):
+                # Too big to hold as one string: analyze chunk by chunk and don't cache the text.
+                alone.add(i)
+                streamed.add(i)
+                pii_by_index[i] = PIIAnalyzer.analyze_chunks_detailed(reader.iter_text_chunks(file_path, mime_type),
+                                                                      **kwargs)
+            elif instrumentation.should_profile(file_path):
+                # Profiled files get their own NER pass, so the profile covers all of their work.
+                alone.add(i)
+                with instrumentation.profile(file_path):
+                    texts[i] = cached_text if cached_text is not None else reader.extract_text(file_path, mime_type)
+                    if texts[i].strip():
+                        pii_by_index[i] = PIIAnalyzer.analyze_batch_detailed([texts[i]], **kwargs)[0]
+            elif cached_text is not None:
+                texts[i] = cached_text
+            else:
+                with instrumentation.stage("extract"):
+                    texts[i] = reader.extract_text(file_path, mime_type)
+        seconds[i] = time.perf_counter() - started
+        limits_hit[i] = limits.drain_hits()
+
+    with_text = [i for i, text in enumerate(texts) if text.strip() and i not in alone]
+    started = time.perf_counter()
+    timeout = limits.get_limits().file_timeout
+    try:
+        with limits.budget(batch_id, limits.ANALYSIS, seconds=timeout * len(with_text)):
+            analyzed = PIIAnalyzer.analyze_batch_detailed([texts[i] for i in with_text], **kwargs)
+    except limits.FileTimeout:
+        # One slow text holds up the whole batch: analyze each on its own budget so only it is stopped.
+        analyzed = []
+        for i in with_text:
+            pii = ({}, {}, 0.0)
+            if len(with_text) == 1:
+                limits.hit(items[i][0], "file_timeout", f"analysis stopped after {timeout:g}s")
+            else:
+                with limits.budget(batch_id, i, items[i][0]):
+                    pii = PIIAnalyzer.analyze_batch_detailed([texts[i]], **kwargs)[0]
+            limits_hit[i].update(limits.drain_hits())
+            analyzed.append(pii)
+    # Analysis is batched across files: charge each file its share by text length.
+    analysis_seconds = time.perf_counter() - started
+    total_chars = sum(len(texts[i]) for i in with_text)
+    for i in with_text:
+        seconds[i] += analysis_seconds * len(texts[i]) / total_chars
+
+    pii_by_index.update(zip(with_text, analyzed))
+    results = []
+    for i, (file_path, mime_type, cached_text) in enumerate(items):
+        new_text = texts[i] if _return_text and cached_text is None and i not in streamed else None
+        pii_data, pii_tiers, seconds_saved = pii_by_index.get(i, ({}, {}, 0.0))
+        results.append((file_path, pii_data, new_text, pii_tiers, seconds_saved, seconds[i], limits_hit[i]))
+        if instrumentation.enabled:
+            instrumentation.record("file", seconds[i])
+            instrumentation.file_done(file_path, mime_type, _file_size(file_path), seconds[i])
+    return results, instrumentation.drain()
+
+
+def _file_size(file_path: str) -> Optional[int]:
+    try:
+        return os.path.getsize(file_path)
+    except OSError:
+        return None
+
+
+def _bounded_map(executor, func, iterable: Iterable, limit: int) -> Iterator:
+    """Like executor.map, but keeps at most `limit` calls in flight and consumes `iterable` lazily."""
+    pending = collections.deque()
+    for item in iterable:
+        pending.append(executor.submit(func, item))
+        if len(pending) >= limit:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+class InRunDedup:
+    """Shares one extraction and detection between all paths with the same content in a run.
+
+    Files are keyed by (size, content key) - the content key is the SHA-256
+    hash or fast fingerprint the pipeline computes anyway, so grouping costs
+    no extra reads. The first path with a key that is actually scanned
+    (not answered from the cache) registers with start(); duplicates that
+    arrive while it is in flight wait on it, later ones reuse its result.
+    Every path still gets its own ScanResult.
+    """
+
+    def __init__(self, max_entries: int = DEDUP_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._done = collections.OrderedDict()  # key -> (path, pii_data, pii_tiers, seconds, limits, quarantined)
+        self._waiting = {}  # key -> plans of duplicates of a file being scanned
+        self.stats = {"duplicates": 0, "bytes_saved": 0, "seconds_saved": 0.0}
+
+    @staticmethod
+    def key(plan) -> Optional[Tuple[int, str]]:
+        result, _stat, content_key, _cached, _text = plan
+        return (result.size, content_key) if content_key and result.size else None
+
+    def reuse(self, plan) -> Optional[list]:
+        """None if no file with this content was scanned in this run; otherwise the plans ready to report now."""
+        key = self.key(plan)
+        if key in self._done:
+            self._done.move_to_end(key)
+            self._reuse(plan, self._done[key])
+            return [plan]
+        if key in self._waiting:
+            self._waiting[key].append(plan)
+            return []
+        return None
+
+    def start(self, plan):
+        """`plan` is about to be scanned: later files with the same content wait for it."""
+        key = self.key(plan)
+        if key is not None:
+            self._waiting[key] = []
+
+    def complete(self, plan, seconds: float) -> list:
+        """Record the scan of `plan` and return the duplicates that were waiting for it, filled in."""
+        key = self.key(plan)
+        if key not in self._waiting:
+            return []
+        result = plan[0]
+        done = (result.file_path, result.pii_data, result.pii_tiers, seconds, result.limits, result.quarantined)
+        self._done[key] = done
+        if len(self._done) > self.max_entries:
+            self._done.popitem(last=False)
+        waiting = self._waiting.pop(key, [])
+        for duplicate in waiting:
+            self._reuse(duplicate, done)
+        return waiting
+
+    def _reuse(self, plan, done):
+        result = plan[0]
+        result.duplicate_of, pii_data, pii_tiers, seconds, result_limits, result.quarantined = done
+        result.pii_data, result.pii_tiers, result.limits = dict(pii_data), dict(pii_tiers), dict(result_limits)
+        self.stats["duplicates"] += 1
+        self.stats["bytes_saved"] += result.size or 0
+        self.stats["seconds_saved"] += seconds
+
+
+class WorkerPool:
+    """The process pool running process_batch, with the watchdog slots of its workers.
+
+    A worker the watchdog kills (or one that crashes) breaks the whole
+    ProcessPoolExecutor; restart() replaces it with a fresh pool, so the
+    scan carries on. Workers are only started on the first submit.
+    """
+
+    def __init__(self, workers: int, initargs: tuple, resource_limits: ResourceLimits):
+        self.workers = workers
+        self.initargs = initargs
+        self.resource_limits = resource_limits
+        self.batch_ids = itertools.count(1)
+        self.killed = {}  # (batch id, file index) -> (limit, detail) of the workers killed since the last restart
+        self.unexplained = 0  # Crashes in a row that no file could be blamed for
+        self._start()
+
+    def _start(self):
+        context = multiprocessing.get_context("spawn")
+        self.monitor = WorkerMonitor(context, self.workers, self.resource_limits)
+        self.executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_init_worker,
+            initargs=self.initargs + (self.resource_limits, self.monitor.slots, self.monitor.slot_counter),
+            mp_context=context)
+
+    def submit(self, batch: list) -> Tuple[int, concurrent.futures.Future]:
+        items = [(result.file_path, result.mime_type, cached_text) for result, _stat, _key, _cached, cached_text in batch]
+        batch_id = next(self.batch_ids)
+        return batch_id, self.executor.submit(process_batch, items, batch_id)
+
+    def watch(self):
+        """Kill the workers that overran their budget, remembering what they were working on."""
+        for pid, batch_id, index, limit, detail in self.monitor.overruns():
+            logger.warning("Killing worker %d: %s", pid, detail)
+            self.killed[(batch_id, index)] = (limit, detail)
+            self.monitor.kill(pid)
+
+    def restart(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.killed = {}
+        self._start()
+
+    def shutdown(self, wait: bool = True, cancel_futures: bool = False):
+        self.executor.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+
+class ScanPipeline:
+    """Runs a scan with I/O-bound and CPU-bound stages on separate executors.
+
+    Stat/cache lookups and hashing are I/O-bound and run on a thread pool.
+    Parsing, OCR and NER are CPU-bound Python that the GIL would serialize,
+    so they run in a process pool whose workers each load the models once.
+    Files are sent to the workers in chunks, which keeps IPC from dominating
+    small files and lets NER batch the chunks of every file in a chunk.
+
+    Every file runs within the budgets of resource_limits. A worker that
+    overruns them is killed and the pool replaced; the file responsible is
+    reported as quarantined (ScanResult.quarantined) instead of holding up
+    or failing the scan. Files that might have crashed a worker are rerun
+    one at a time in a pool of their own to find out (see _recover).
+    """
+
+    DEFAULT_CHUNK_SIZE = 8
+
+    def __init__(self, cpu_workers: Optional[int] = None, io_workers: Optional[int] = None,
+                 chunk_size: Optional[int] = None, ner_batch_size: Optional[int] = None,
+                 cache: Optional[ScanCache] = None, include_cached: bool = False,
+                 fast_fingerprint: bool = False, ocr_config: Optional[OcrConfig] = None, tiered: bool = False,
+                 detectors: str = DEFAULT_DETECTORS, resource_limits: Optional[ResourceLimits] = None):
+        self.cpu_workers = cpu_workers or os.cpu_count() or 1
+        self.io_workers = io_workers or min(32, (os.cpu_count() or 1) + 4)
+        self.chunk_size = chunk_size or self.DEFAULT_CHUNK_SIZE
+        self.ner_batch_size = ner_batch_size
+        self.cache = cache
+        self.include_cached = include_cached
+        self.changed_only = False  # Only report paths whose content key differs from their own cached one
+        self.fast_fingerprint = fast_fingerprint
+        self.ocr_config = ocr_config
+        self.tiered = tiered  # Triage NER windows with regex/small model before the transformer
+        if detectors not in DETECTOR_MODELS:
+            raise ValueError(f"Unknown detectors {detectors!r}, expected one of {', '.join(DETECTOR_MODELS)}")
+        self.detectors = detectors  # "regex", "small" or "transformer"
+        self.resource_limits = resource_limits or ResourceLimits()
+        self.dedup_stats = {"duplicates": 0, "bytes_saved": 0, "seconds_saved": 0.0}  # Of the last run
+        self._executors = None  # (io, cpu, isolation) pools kept between runs, see open()
+        self.restarts = 0  # Worker pools replaced after a worker was killed or crashed
+        self._next_watch = 0.0  # When the workers are next checked against their budgets
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def open(self):
+        """Start the worker pools now and reuse them for every iter_results call until close().
+
+        Without this each call starts its own workers, which then load the
+        models again - fine for one scan, wasteful for the many small scans
+        of watch mode.
+        """
+        if self._executors is None:
+            self._executors = self._start_executors()
+
+    def close(self):
+        if self._executors is not None:
+            for executor in self._executors:
+                executor.shutdown(wait=True, cancel_futures=True)
+            self._executors = None
+
+    def _start_executors(self):
+        # Workers are started while traversal threads are running, and forking a
+        # threaded process can deadlock - spawn them fresh as Windows always does.
+        io_executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.io_workers)
+        initargs = (self.ner_batch_size, self.cache is not None, self.ocr_config, self.tiered, self.detectors,
+                    instrumentation.get_config())
+        cpu_pool = WorkerPool(self.cpu_workers, initargs, self.resource_limits)
+        isolation_pool = WorkerPool(1, initargs, self.resource_limits)
+        return io_executor, cpu_pool, isolation_pool
+
+    def run(self, files_with_mime: Iterable[Tuple[str, str]]) -> List[ScanResult]:
+        """Process all files and return their ScanResults."""
+        return list(self.iter_results(files_with_mime))
+
+    def iter_results(self, files_with_mime: Iterable[Tuple[str, str]],
+                     skip_paths: Optional[Set[str]] = None,
+                     stop: Optional[threading.Event] = None) -> Iterator[ScanResult]:
+        """Yield ScanResults as they complete, so callers can write them out immediately.
+
+        Input is consumed lazily and only a bounded number of batches is in
+        flight, so memory doesn't grow with the number of files. Paths in
+        skip_paths (e.g. from a resumed report) are not scanned. With a
+        cache, files already scanned with the current detectors are skipped
+        (or reported from the cache if include_cached is set). With
+        changed_only, a cached result is reported only if the path is new
+        or last had other content.
+
+        Paths with identical content are scanned once per run (see
+        InRunDedup); dedup_stats reports what that saved.
+
+        Setting `stop` cancels the scan: no new files are read or scheduled,
+        batches not yet started are dropped, and the batches already running
+        are finished and yielded.
+
+        A file that makes its worker overrun its budget or crash is yielded
+        with quarantined set and no findings (see _recover); the other files
+        of its batch are scanned again by a replacement pool.
+        """
+        RegexDetector.ensure_loaded()
+        ner_model = DETECTOR_MODELS[self.detectors] or "none"
+        mode = "tiered" if self.tiered and self.detectors == "transformer" else "full"
+        signature = detector_signature(RegexDetector.PATTERNS, ner_model, mode) if self.cache else None
+        skip_paths = skip_paths or set()
+        stop = stop or threading.Event()
+        to_scan = (f for f in files_with_mime if f[0] not in skip_paths)
+        max_in_flight = self.cpu_workers * 2
+
+        with contextlib.ExitStack() as executors:
+            if self._executors is not None:
+                io_executor, cpu_pool, isolation_pool = self._executors
+            else:
+                io_executor, cpu_pool, isolation_pool = (executors.enter_context(e) for e in self._start_executors())
+            pools = (cpu_pool, isolation_pool)
+            plans = _bounded_map(io_executor, lambda f: self._plan(f, signature), to_scan, self.io_workers * 4)
+            in_flight = {}
+            batch = []
+            dedup = InRunDedup()
+            self.dedup_stats = dedup.stats
+
+            for plan in plans:
+                if stop.is_set():
+                    break
+                self._watch(pools)
+                result, stat, content_key, cached_result, _text = plan
+                duplicates = dedup.reuse(plan)
+                if duplicates is not None:
+                    yield from self._report_duplicates(duplicates, signature)
+                    continue
+                if cached_result is not None:
+                    unchanged = self.changed_only and self.cache.path_key(result.file_path) == content_key
+                    if self.changed_only:
+                        # Record the path's stat and key, so the next event compares against this content.
+                        self.cache.put(result.file_path, stat, content_key, result.file_hash, signature,
+                                       cached_result[0], None, cached_result[1])
+                    if self.include_cached and not unchanged:
+                        result.pii_data, result.pii_tiers = cached_result
+                        yield result
+                    else:
+                        logger.info("Skipped %s (already scanned)", result.file_path, extra={"file": result.file_path})
+                    continue
+
+                dedup.start(plan)
+                batch.append(plan)
+                if len(batch) >= self.chunk_size:
+                    self._submit(cpu_pool, in_flight, batch)
+                    batch = []
+                    while len(in_flight) >= max_in_flight and not stop.is_set():
+                        yield from self._collect(pools, in_flight, signature, dedup)
+
+            if stop.is_set():
+                plans.close()
+                for future in [f for f in in_flight if f.cancel()]:
+                    del in_flight[future]
+            elif batch:
+                self._submit(cpu_pool, in_flight, batch)
+            while in_flight:
+                yield from self._collect(pools, in_flight, signature, dedup)
+            if self.cache and self.changed_only:
+                self.cache.commit()
+
+    def _plan(self, file_with_mime: Tuple[str, str], signature: Optional[str]):
+        """Stat, hash and consult the cache for one file, reading it at most once.
+
+        Returns (result, stat, content_key, cached_result, cached_text). The
+        content key is the SHA-256 hash, or the fast fingerprint when enabled;
+        in that mode SHA-256 is only computed for files that end up in the
+        report, in the same read as the fingerprint when all of them do.
+        """
+        file_path, mime_type = file_with_mime
+        result = ScanResult(file_path, mime_type=mime_type)
+        try:
+            stat = os.stat(file_path)
+        except OSError as e:
+            logger.error("Could not stat file %s: %s", file_path, e, extra={"file": file_path})
+            return (result, None, None, None, None)
+        result.size = stat.st_size
+        result.mtime = stat.st_mtime
+
+        content_key = None
+        if self.cache:
+            # Fast path: an unchanged (path, size, mtime, inode) needs no read at all.
+            with instrumentation.stage("cache"):
+                known = self.cache.lookup_path(file_path, stat)
+            if known:
+                content_key, result.file_hash = known
+        if content_key is None:
+            if self.cache and self.fast_fingerprint and self.include_cached:
+                # Every file is reported with its SHA-256, so get both digests from one read.
+                content_key, result.file_hash = OutputHandler.compute_fingerprint_and_hash(file_path)
+            elif self.cache and self.fast_fingerprint:
+                content_key = OutputHandler.compute_fingerprint(file_path)
+            else:
+                content_key = result.file_hash = OutputHandler.compute_file_hash(file_path)
+
+        cached_result = cached_text = None
+        if self.cache and content_key:
+            with instrumentation.stage("cache"):
+                cached_result = self.cache.get_result(content_key, signature)
+                if cached_result is None:
+                    cached_text = self.cache.get_text(content_key)
+        if result.file_hash is None and (cached_result is None or self.include_cached):
+            result.file_hash = OutputHandler.compute_file_hash(file_path)
+        return (result, stat, content_key, cached_result, cached_text)
+
+    @staticmethod
+    def _submit(pool: WorkerPool, in_flight: dict, batch: list):
+        batch_id, future = pool.submit(batch)
+        in_flight[future] = (pool, batch_id, batch)
+
+    def _collect(self, pools: Tuple[WorkerPool, WorkerPool], in_flight: dict, signature: Optional[str],
+                 dedup: InRunDedup) -> Iterator[ScanResult]:
+        """Wait for at least one batch to finish and yield its results, and those of their duplicates.
+
+        pools are the cpu and isolation pools. Workers are checked against
+        their budgets while waiting. When a pool breaks, every batch in
+        flight in it fails with it: the pool is restarted and the batches
+        are sorted out by _recover.
+        """
+        done = set()
+        while not done:
+            done, _pending = concurrent.futures.wait(in_flight, timeout=WATCHDOG_INTERVAL_SECONDS,
+                                                     return_when=concurrent.futures.FIRST_COMPLETED)
+            self._watch(pools)
+        failed = collections.defaultdict(list)  # Broken pool -> its batches that failed
+        while done:
+            for future in done:
+                pool, batch_id, batch = in_flight.pop(future)
+                try:
+                    processed_batch, measurements = future.result()
+                except concurrent.futures.process.BrokenProcessPool:
+                    failed[pool].append((batch_id, batch))
+                    continue
+                except Exception as e:
+                    yield from self._retry_failed_batch(pool, in_flight, batch, e, dedup)
+                    continue
+                pool.unexplained = 0
+                instrumentation.merge(measurements)
+                for plan, processed in zip(batch, processed_batch):
+                    result, stat, content_key, _cached, _text = plan
+                    _path, result.pii_data, new_text, result.pii_tiers, result.seconds_saved, seconds, \
+                        result.limits = processed
+                    if self.cache and content_key and not result.limits:
+                        self.cache.put(result.file_path, stat, content_key, result.file_hash, signature,
+                                       result.pii_data, new_text, result.pii_tiers)
+                    yield result
+                    yield from self._report_duplicates(dedup.complete(plan, seconds), signature)
+            # Once a pool is broken, its other batches in flight fail with it (or finished just before).
+            done = concurrent.futures.wait([f for f, (pool, *_) in in_flight.items() if pool in failed])[0]
+        isolation_pool = pools[1]
+        for pool, batches in failed.items():
+            yield from self._recover(pool, isolation_pool, in_flight, batches, dedup)
+        if self.cache:
+            self.cache.commit()
+
+    def _watch(self, pools: Tuple[WorkerPool, WorkerPool]):
+        """Check the workers against their budgets every WATCHDOG_INTERVAL_SECONDS.
+
+        Called on every pass of the scan loops, so neither batches that keep
+        finishing nor a slow stream of input delays killing a stuck worker.
+        """
+        now = time.monotonic()
+        if now >= self._next_watch:
+            self._next_watch = now + WATCHDOG_INTERVAL_SECONDS
+            for pool in pools:
+                pool.watch()
+
+    def _recover(self, pool: WorkerPool, isolation_pool: WorkerPool, in_flight: dict, failed: list,
+                 dedup: InRunDedup) -> Iterator[ScanResult]:
+        """Restart a broken pool, yield the files to blame as quarantined and resubmit the rest.
+
+        Files the watchdog killed a worker over are quarantined with that
+        limit. A crash can't be pinned on one file while several workers
+        were busy, so those files are rerun one at a time in isolation_pool,
+        where a crash is the file's own; the same goes for the files of a
+        batch killed during their joint analysis. The other batches are
+        resubmitted as they were.
+        """
+        killed = pool.killed
+        busy = {(batch_id, index) for _pid, batch_id, index, _deadline in pool.monitor.busy()}
+        pool.restart()
+        self.restarts += 1
+        isolated = pool.workers == 1
+        blamed = False
+        for batch_id, batch in failed:
+            if killed:
+                culprits = {index: cause for (killed_batch, index), cause in killed.items() if killed_batch == batch_id}
+            else:
+                culprits = {index: ("crash", "worker crashed") for busy_batch, index in busy if busy_batch == batch_id}
+            blamed = blamed or bool(culprits)
+            if limits.ANALYSIS in culprits and len(batch) > 1:
+                for plan in batch:
+                    self._submit(isolation_pool, in_flight, [plan])
+                continue
+            rest = []
+            for index, plan in enumerate(batch):
+                cause = culprits.get(index, culprits.get(limits.ANALYSIS))
+                if cause is None:
+                    rest.append(plan)
+                elif killed or isolated:
+                    yield from self._quarantine(plan, *cause, dedup)
+                else:
+                    self._submit(isolation_pool, in_flight, [plan])
+            if rest:
+                self._submit(pool, in_flight, rest)
+
+        if blamed:
+            pool.unexplained = 0
+        else:
+            pool.unexplained += 1
+            if pool.unexplained >= MAX_UNEXPLAINED_RESTARTS:
+                raise concurrent.futures.process.BrokenProcessPool(
+                    f"Worker pool crashed {pool.unexplained} times in a row without a file to blame")
+        logger.warning("Restarted a worker pool; %d batches in flight.", len(in_flight))
+
+    def _retry_failed_batch(self, pool: WorkerPool, in_flight: dict, batch: list, error: Exception,
+                            dedup: InRunDedup) -> Iterator[ScanResult]:
+        """Rerun the files of a batch that raised one per batch; a file that raises on its own is quarantined."""
+        if len(batch) == 1:
+            yield from self._quarantine(batch[0], "error", f"worker raised {type(error).__name__}: {error}", dedup)
+            return
+        logger.warning("A batch of %d files failed (%s: %s); rerunning them one by one.",
+                       len(batch), type(error).__name__, error)
+        for plan in batch:
+            self._submit(pool, in_flight, [plan])
+
+    def _quarantine(self, plan, limit: str, detail: str, dedup: InRunDedup) -> Iterator[ScanResult]:
+        result = plan[0]
+        result.pii_data, result.pii_tiers = {}, {}
+        result.limits, result.quarantined = {limit: detail}, True
+        logger.warning("Quarantined %s: %s", result.file_path, detail, extra={"file": result.file_path,
+                                                                             "limit": limit})
+        yield result
+        yield from self._report_duplicates(dedup.complete(plan, 0.0), None)
+
+    def _report_duplicates(self, plans: list, signature: Optional[str]) -> Iterator[ScanResult]:
+        for result, stat, content_key, _cached, _text in plans:
+            if self.cache and not result.limits:
+                # Cache the path too, so the next run finds it without reading the file.
+                self.cache.put(result.file_path, stat, content_key, result.file_hash, signature,
+                               result.pii_data, None, result.pii_tiers)
+            yield result
@@ -1,36 +1,431 @@
+import os
 import re
 import json
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:  # pragma: no cover - older interpreters
+    import sre_parse
+
+logger = logging.getLogger(__name__)
+
+# Next to this module, so loading doesn't depend on the working directory.
+PATTERN_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "regex_patterns.json")
+
+_CATEGORY_SOURCE = {
+    sre_parse.CATEGORY_DIGIT: r"\d",
+    sre_parse.CATEGORY_NOT_DIGIT: r"\D",
+    sre_parse.CATEGORY_WORD: r"\w",
+    sre_parse.CATEGORY_NOT_WORD: r"\W",
+    sre_parse.CATEGORY_SPACE: r"\s",
+    sre_parse.CATEGORY_NOT_SPACE: r"\S",
+}
+
+
+def _class_source(items) -> Optional[str]:
+    """Rebuild the source of a parsed character class, or None if it can't be expressed."""
+    parts = []
+    for op, av in items:
+        if op == sre_parse.NEGATE:
+            parts.append("^")
+        elif op == sre_parse.LITERAL:
+            parts.append(re.escape(chr(av)))
+        elif op == sre_parse.RANGE:
+            parts.append(f"{re.escape(chr(av[0]))}-{re.escape(chr(av[1]))}")
+        elif op == sre_parse.CATEGORY and av in _CATEGORY_SOURCE:
+            parts.append(_CATEGORY_SOURCE[av])
+        else:
+            return None
+    return "[" + "".join(parts) + "]"
+
+
+def _required_atoms(parsed) -> set:
+    """Collect single-character atoms that every match of `parsed` must contain.
+
+    Atoms are ("lit", char) for literal characters and ("cls", source) for
+    character classes. Anything optional or too complex is simply ignored,
+    so the result is always a safe (possibly empty) necessary condition.
+    """
+    atoms = set()
+    for op, av in parsed:
+        if op == sre_parse.LITERAL:
+            atoms.add(("lit", chr(av)))
+        elif op == sre_parse.IN:
+            if len(av) == 1 and av[0][0] == sre_parse.LITERAL:
+                atoms.add(("lit", chr(av[0][1])))
+            else:
+                source = _class_source(av)
+                if source:
+                    atoms.add(("cls", source))
+        elif op == sre_parse.SUBPATTERN:
+            _group, add_flags, del_flags, sub = av
+            if not add_flags and not del_flags:
+                atoms |= _required_atoms(sub)
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT, getattr(sre_parse, "POSSESSIVE_REPEAT", None)):
+            low, _high, sub = av
+            if low >= 1:
+                atoms |= _required_atoms(sub)
+        elif op == sre_parse.BRANCH:
+            branches = [_required_atoms(branch) for branch in av[1]]
+            atoms |= set.intersection(*branches) if branches else set()
+    return atoms
+
+
+def _build_prefilter(pattern: re.Pattern) -> Optional[Tuple[Tuple[str, ...], Tuple[re.Pattern, ...]]]:
+    """Derive a cheap (literals, classes) check that text must pass for `pattern` to match."""
+    if pattern.flags & re.IGNORECASE:
+        return None
+    try:
+        atoms = _required_atoms(sre_parse.parse(pattern.pattern, pattern.flags))
+    except Exception:
+        return None
+    literals = tuple(sorted(value for kind, value in atoms if kind == "lit"))
+    classes = tuple(re.compile(value) for value in sorted(value for kind, value in atoms if kind == "cls"))
+    if not literals and not classes:
+        return None
+    return literals, classes
+
+
+def _first_chars(parsed) -> Optional[List[str]]:
+    """Return class fragments covering every possible first character of a match.
+
+    None means the first character can't be bounded (negated classes, `.`,
+    lookarounds, nullable alternatives ...).
+    """
+    fragments: List[str] = []
+    for op, av in parsed:
+        if op == sre_parse.AT:
+            continue  # Zero-width, e.g. \\b
+        if op == sre_parse.LITERAL:
+            return fragments + [re.escape(chr(av))]
+        if op == sre_parse.IN:
+            source = _class_source(av)
+            if source is None or source.startswith("[^"):
+                return None
+            return fragments + [source[1:-1]]
+        if op == sre_parse.SUBPATTERN:
+            _group, add_flags, del_flags, sub = av
+            if add_flags or del_flags or sub.getwidth()[0] == 0:
+                return None
+            first = _first_chars(sub)
+            return None if first is None else fragments + first
+        if op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT, getattr(sre_parse, "POSSESSIVE_REPEAT", None)):
+            low, _high, sub = av
+            first = _first_chars(sub)
+            if first is None:
+                return None
+            fragments = fragments + first
+            if low >= 1:
+                return fragments
+            continue  # Optional prefix - the next item may come first
+        if op == sre_parse.BRANCH:
+            for branch in av[1]:
+                first = _first_chars(branch)
+                if first is None:
+                    return None
+                fragments = fragments + first
+            return fragments
+        return None
+    return None  # Nothing consumed a character
+
+
+def _findall_value(match: re.Match):
+    """The item findall would have returned for this match."""
+    if match.re.groups == 0:
+        return match.group()
+    if match.re.groups == 1:
+        return match.group(1) or ""
+    return tuple(group or "" for group in match.groups())
+
+
+def _is_dense(scanned: int) -> bool:
+    """Whether DENSE_SAMPLE_MATCHES matches in `scanned` characters are too many for the single pass."""
+    return scanned < DENSE_SAMPLE_MATCHES * DENSE_CHARS_PER_MATCH
+
+
+# Characters that make up most of ordinary prose. A pattern that can start on
+# any of them would be tried almost everywhere, so it gains nothing from
+# sharing the guarded single-pass scan and is run on its own instead.
+_PROSE_SAMPLE = "etaoinshrdlu "
+
+
+def _start_guard(pattern: re.Pattern) -> Optional[str]:
+    """Character class source that every match of `pattern` starts with, if it is selective."""
+    if pattern.groups or pattern.flags & re.IGNORECASE:
+        return None  # findall would return groups / case folding widens the class
+    try:
+        parsed = sre_parse.parse(pattern.pattern, pattern.flags)
+        if parsed.getwidth()[0] == 0:
+            return None
+        first = _first_chars(parsed)
+        if not first:
+            return None
+        guard = "[" + "".join(first) + "]"
+        if re.search(guard, _PROSE_SAMPLE):
+            return None
+        return guard
+    except Exception:
+        return None
+
+
+# Per-match Python work (and the conflict check) makes the single pass lose
+# to one C-level findall per type once matches are dense, as in a CSV of
+# customer records. After DENSE_SAMPLE_MATCHES matches the scan checks how
+# much text they came from and hands over to the per-type scans below
+# DENSE_CHARS_PER_MATCH characters per match.
+DENSE_SAMPLE_MATCHES = 256
+DENSE_CHARS_PER_MATCH = 100
 
 
 class RegexDetector:
     PATTERNS = {}
+    PREFILTERS = {}
+    GUARDS = {}
+    STANDALONE = set()
+    _COMBINED_CACHE = {}
+    _loaded = False
+
+    @staticmethod
+    def ensure_loaded():
+        """Load the default pattern file on first use (unless patterns were set explicitly)."""
+        if not RegexDetector._loaded:
+            RegexDetector.load_patterns()
 
     @staticmethod
-    def load_patterns(pattern_file="data/regex_patterns.json"):
+    def load_patterns(pattern_file=PATTERN_FILE):
         """Load regex patterns from an external JSON file."""
         try:
             with open(pattern_file, "r", encoding="utf-8-sig") as file:
                 file.seek(0)
                 patterns = json.load(file)
-                # Convert regex strings to compiled patterns
-                RegexDetector.PATTERNS = {key: re.compile(value) for key, value in patterns.items()}
+                RegexDetector.set_patterns(patterns)
         except Exception as e:
-            print(f"[ERROR] Failed to load regex patterns: {e}")
-            RegexDetector.PATTERNS = {}  # Fail-safe
+            logger.error("Failed to load regex patterns: %s", e)
+            RegexDetector.set_patterns({})  # Fail-safe
+
+    @staticmethod
+    def set_patterns(patterns: Dict[str, str]):
+        """Compile patterns and rebuild the prefilters used by the single-pass scanner."""
+        # Convert regex strings to compiled patterns
+        RegexDetector.PATTERNS = {key: re.compile(value) for key, value in patterns.items()}
+        RegexDetector.PREFILTERS = {key: _build_prefilter(p) for key, p in RegexDetector.PATTERNS.items()}
+        RegexDetector.GUARDS = {key: _start_guard(p) for key, p in RegexDetector.PATTERNS.items()}
+        RegexDetector.STANDALONE = {key for key, guard in RegexDetector.GUARDS.items() if guard is None}
+        RegexDetector._COMBINED_CACHE = {}
+        RegexDetector._loaded = True
 
     @staticmethod
     def detect(text: str) -> dict:
-        """Detect PII using regex patterns."""
-        if not RegexDetector.PATTERNS:
-            RegexDetector.load_patterns()  # Ensure patterns are loaded
+        """Detect PII using regex patterns.
+
+        Patterns with a selective first character are scanned in one pass over
+        `text` through a guarded named-group alternation; the rest (e.g. email,
+        which can start on any letter) run on their own. Types whose prefilter
+        fails are skipped, types that overlap another type's match are
+        rescanned on their own, and text dense with matches is scanned per
+        type throughout, so the result is identical to running `findall` per
+        pattern.
+        """
+        RegexDetector.ensure_loaded()
+
+        active = RegexDetector._prefiltered_types(text)
+        combinable = [t for t in active if t not in RegexDetector.STANDALONE]
+
+        found: Dict[str, List[str]] = {}
+        if len(combinable) == 1:
+            found[combinable[0]] = RegexDetector.PATTERNS[combinable[0]].findall(text)
+        elif combinable:
+            found.update(RegexDetector._scan_combined(text, tuple(combinable)))
+
+        for pii_type in active:
+            if pii_type in RegexDetector.STANDALONE:
+                found[pii_type] = RegexDetector.PATTERNS[pii_type].findall(text)
+
+        # Keep the pattern-file order of the per-type loop this replaces.
+        return {pii_type: found[pii_type] for pii_type in RegexDetector.PATTERNS if found.get(pii_type)}
+
+    @staticmethod
+    def detect_chunks(chunks: Iterable[Tuple[int, str, int, int]]) -> dict:
+        """detect() over a document supplied as overlapping chunks (see ChunkScanner)."""
+        scanner = ChunkScanner()
+        for chunk in chunks:
+            scanner.feed(*chunk)
+        return scanner.result()
+
+    @staticmethod
+    def _scan_window(text: str, pos: int, stop: int, resume: Dict[str, int]) -> Tuple[Dict[str, list], Dict[str, int]]:
+        """Scan text for matches starting in [pos, stop), as findall over the whole document would.
+
+        resume maps a type to where its previous match ended; types whose
+        previous match runs past pos continue from there on their own so
+        no match is reported twice. Returns the values per type and the end
+        of each type's last match (positions relative to text).
+        """
+        active = RegexDetector._prefiltered_types(text)
+        combinable = tuple(t for t in active if t not in RegexDetector.STANDALONE and resume.get(t, 0) <= pos)
+        found: Dict[str, list] = {}
+        ends: Dict[str, int] = {}
+
+        combined = None
+        if len(combinable) > 1:
+            try:
+                combined, names = RegexDetector._combined_for(combinable)
+            except re.error:
+                pass
+        if combined is not None:
+            spans = []
+            for pii_type in combinable:
+                found[pii_type] = []
+            for match in combined.finditer(text, pos):
+                if match.start() >= stop:
+                    break
+                pii_type = names[match.lastgroup]
+                found[pii_type].append(match.group())
+                ends[pii_type] = match.end()
+                spans.append((match.start(), match.end(), pii_type))
+                if len(spans) == DENSE_SAMPLE_MATCHES and _is_dense(match.end() - pos):
+                    found, ends, spans = {}, {}, []  # Scanned per type below
+                    break
+            for pii_type in RegexDetector._find_conflicts(text, spans, combinable):
+                found[pii_type] = []
+                ends.pop(pii_type, None)
+                RegexDetector._find_in_range(pii_type, text, pos, stop, found, ends)
+
+        for pii_type in active:
+            if pii_type not in found:
+                found[pii_type] = []
+                RegexDetector._find_in_range(pii_type, text, max(pos, resume.get(pii_type, 0)), stop, found, ends)
+        return found, ends
+
+    @staticmethod
+    def _find_in_range(pii_type: str, text: str, pos: int, stop: int, found: Dict[str, list], ends: Dict[str, int]):
+        for match in RegexDetector.PATTERNS[pii_type].finditer(text, pos):
+            if match.start() >= stop:
+                break
+            found[pii_type].append(_findall_value(match))
+            ends[pii_type] = match.end()
+
+    @staticmethod
+    def _prefiltered_types(text: str) -> List[str]:
+        """Return the PII types whose required literals/classes all occur in `text`."""
+        class_hits: Dict[str, bool] = {}
+        active = []
+        for pii_type in RegexDetector.PATTERNS:
+            prefilter = RegexDetector.PREFILTERS.get(pii_type)
+            if prefilter:
+                literals, classes = prefilter
+                if not all(literal in text for literal in literals):
+                    continue
+                passed = True
+                for cls in classes:
+                    if cls.pattern not in class_hits:
+                        class_hits[cls.pattern] = cls.search(text) is not None
+                    if not class_hits[cls.pattern]:
+                        passed = False
+                        break
+                if not passed:
+                    continue
+            active.append(pii_type)
+        return active
+
+    @staticmethod
+    def _combined_for(types: Tuple[str, ...]) -> Tuple[re.Pattern, Dict[str, str]]:
+        """Compile (and cache) the alternation for one set of active types."""
+        cached = RegexDetector._COMBINED_CACHE.get(types)
+        if cached is None:
+            # Group names are generated because PII type keys need not be identifiers.
+            names = {f"g{i}": pii_type for i, pii_type in enumerate(types)}
+            alternation = "|".join(
+                f"(?P<{name}>(?:{RegexDetector.PATTERNS[pii_type].pattern}))" for name, pii_type in names.items()
+            )
+            # The leading lookahead lets the engine skip positions no pattern can start at.
+            guard = "".join(RegexDetector.GUARDS[pii_type][1:-1] for pii_type in types)
+            source = f"(?=[{guard}])(?:{alternation})"
+            cached = (re.compile(source), names)
+            RegexDetector._COMBINED_CACHE[types] = cached
+        return cached
+
+    @staticmethod
+    def _scan_combined(text: str, types: Tuple[str, ...]) -> Dict[str, List[str]]:
+        try:
+            combined, names = RegexDetector._combined_for(types)
+        except re.error:
+            # e.g. inline global flags that can't be nested - fall back to per-type scans.
+            return {pii_type: RegexDetector.PATTERNS[pii_type].findall(text) for pii_type in types}
+
+        found: Dict[str, List[str]] = {pii_type: [] for pii_type in types}
+        spans = []
+        for match in combined.finditer(text):
+            pii_type = names[match.lastgroup]
+            found[pii_type].append(match.group())
+            spans.append((match.start(), match.end(), pii_type))
+            if len(spans) == DENSE_SAMPLE_MATCHES and _is_dense(match.end()):
+                return {pii_type: RegexDetector.PATTERNS[pii_type].findall(text) for pii_type in types}
+
+        for pii_type in RegexDetector._find_conflicts(text, spans, types):
+            found[pii_type] = RegexDetector.PATTERNS[pii_type].findall(text)
+        return found
+
+    @staticmethod
+    def _find_conflicts(text: str, spans, types: Tuple[str, ...]) -> set:
+        """Find types whose own matches were shadowed by another type's match.
+
+        The alternation reports at most one match per position and never
+        overlapping matches, whereas independent `findall` calls can. A type
+        is only affected if it could match at the start of another type's
+        match (losing on priority) or somewhere inside it. Each type's next
+        match is found with one `search` and reused until a span passes it,
+        so dense text costs a few calls per match rather than one per
+        character.
+        """
+        dirty = set()
+        priority = {pii_type: i for i, pii_type in enumerate(types)}
+        patterns = RegexDetector.PATTERNS
+        # Per type: (position searched from, start of the first match from there or len(text)).
+        upcoming: Dict[str, Tuple[int, int]] = {}
+        for start, end, owner in spans:
+            for pii_type in types:
+                if pii_type == owner or pii_type in dirty:
+                    continue
+                pos = start if priority[pii_type] > priority[owner] else start + 1
+                searched_from, next_start = upcoming.get(pii_type, (len(text) + 1, 0))
+                if not searched_from <= pos <= next_start:
+                    match = patterns[pii_type].search(text, pos)
+                    next_start = match.start() if match else len(text)
+                    upcoming[pii_type] = (pos, next_start)
+                if next_start < end:
+                    dirty.add(pii_type)
+            if len(dirty) == len(types):
+                break
+        return dirty
+
+
+class ChunkScanner:
+    """Incremental RegexDetector.detect over one document read in chunks.
+
+    Chunks are (offset, text, start, stop): text begins at absolute
+    position offset, and only matches starting in [start, stop) belong to
+    the chunk. The text around that range is context, so a match crossing a
+    chunk boundary is found whole (as long as it is shorter than the
+    context) and reported once. Only the current chunk is held in memory.
+    """
+
+    def __init__(self):
+        RegexDetector.ensure_loaded()
+        self.found: Dict[str, list] = {}
+        self.resume: Dict[str, int] = {}  # Absolute end of each type's last match
 
-        matches = {}
-        for pii_type, pattern in RegexDetector.PATTERNS.items():
-            found = pattern.findall(text)
-            if found:
-                matches[pii_type] = found
-        return matches
+    def feed(self, offset: int, text: str, start: int, stop: int):
+        relative = {pii_type: end - offset for pii_type, end in self.resume.items()}
+        found, ends = RegexDetector._scan_window(text, start - offset, stop - offset, relative)
+        for pii_type, values in found.items():
+            if values:
+                self.found.setdefault(pii_type, []).extend(values)
+        for pii_type, end in ends.items():
+            self.resume[pii_type] = offset + end
 
+    def result(self) -> dict:
+        return {pii_type: self.found[pii_type] for pii_type in RegexDetector.PATTERNS if self.found.get(pii_type)}
 
-# Load patterns when the module is imported
-RegexDetector.load_patterns()
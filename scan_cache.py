@@ -0,0 +1,189 @@
+import os
+import re
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, Optional, Tuple
+
+
+def detector_signature(patterns: Dict[str, re.Pattern], ner_model: str, analysis_mode: str = "full") -> str:
+    """Identify the detector configuration a cached result was produced with."""
+    hasher = hashlib.sha256()
+    for pii_type, pattern in sorted(patterns.items()):
+        hasher.update(f"{pii_type}\0{pattern.pattern}\0".encode("utf-8"))
+    hasher.update(ner_model.encode("utf-8"))
+    if analysis_mode != "full":  # Keeps signatures of existing full-mode results valid
+        hasher.update(f"\0{analysis_mode}".encode("utf-8"))
+    return hasher.hexdigest()[:16]
+
+
+class ScanCache:
+    """Persistent, content-addressed cache of extracted text and PII results.
+
+    Three tables are kept in one SQLite file:
+      * files   - (path, size, mtime, inode) -> content key and SHA-256, so
+                  unchanged files are recognised from a stat() without being read.
+      * texts   - content hash -> extracted text (compressed), so a change to
+                  the detectors doesn't re-run OCR or PDF parsing.
+      * results - (content hash, detector signature) -> PII results.
+    """
+
+    def __init__(self, db_path: str = "output/scan_cache.db"):
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                inode INTEGER NOT NULL,
+                content_hash TEXT NOT NULL,
+                sha256 TEXT,
+                last_seen REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS texts (
+                content_hash TEXT PRIMARY KEY,
+                text BLOB NOT NULL,
+                last_used REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS results (
+                content_hash TEXT NOT NULL,
+                signature TEXT NOT NULL,
+                pii_data TEXT NOT NULL,
+                pii_tiers TEXT,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (content_hash, signature)
+            );
+        """)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(results)")}
+        if "pii_tiers" not in columns:  # Caches created before tiers were recorded
+            self._conn.execute("ALTER TABLE results ADD COLUMN pii_tiers TEXT")
+        self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def lookup_path(self, file_path: str, stat: os.stat_result) -> Optional[Tuple[str, Optional[str]]]:
+        """Return (content key, SHA-256) if the file looks unchanged since it was last scanned."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content_hash, sha256 FROM files WHERE path = ? AND size = ? AND mtime_ns = ? AND inode = ?",
+                (file_path, stat.st_size, stat.st_mtime_ns, stat.st_ino),
+            ).fetchone()
+            if row:
+                self._conn.execute("UPDATE files SET last_seen = ? WHERE path = ?", (time.time(), file_path))
+        return (row[0], row[1]) if row else None
+
+    def path_key(self, file_path: str) -> Optional[str]:
+        """Return the content key last recorded for a path, whatever its stat."""
+        with self._lock:
+            row = self._conn.execute("SELECT content_hash FROM files WHERE path = ?", (file_path,)).fetchone()
+        return row[0] if row else None
+
+    def get_result(self, content_hash: str, signature: str) -> Optional[Tuple[dict, dict]]:
+        """Return (pii_data, pii_tiers) of a cached result."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT pii_data, pii_tiers FROM results WHERE content_hash = ? AND signature = ?",
+                (content_hash, signature),
+            ).fetchone()
+            if row:
+                self._conn.execute(
+                    "UPDATE results SET last_used = ? WHERE content_hash = ? AND signature = ?",
+                    (time.time(), content_hash, signature),
+                )
+        return (json.loads(row[0]), json.loads(row[1] or "{}")) if row else None
+
+    def get_text(self, content_hash: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT text FROM texts WHERE content_hash = ?", (content_hash,)).fetchone()
+            if row:
+                self._conn.execute("UPDATE texts SET last_used = ? WHERE content_hash = ?", (time.time(), content_hash))
+        return zlib.decompress(row[0]).decode("utf-8") if row else None
+
+    def put(self, file_path: str, stat: os.stat_result, content_hash: str, sha256: Optional[str],
+            signature: str, pii_data: dict, text: Optional[str] = None, pii_tiers: Optional[dict] = None):
+        """Record a scanned file, its result and (if given) its extracted text.
+
+        content_hash is the cache key (SHA-256 or a fast fingerprint); sha256
+        is kept alongside so skipped files can still be reported.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files (path, size, mtime_ns, inode, content_hash, sha256, last_seen) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (file_path, stat.st_size, stat.st_mtime_ns, stat.st_ino, content_hash, sha256, now),
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (content_hash, signature, pii_data, pii_tiers, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (content_hash, signature, json.dumps(pii_data, ensure_ascii=False),
+                 json.dumps(pii_tiers) if pii_tiers else None, now),
+            )
+            if text is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO texts (content_hash, text, last_used) VALUES (?, ?, ?)",
+                    (content_hash, zlib.compress(text.encode("utf-8")), now),
+                )
+
+    def commit(self):
+        with self._lock:
+            self._conn.commit()
+
+    def evict(self, max_age_days: Optional[float] = None, max_text_bytes: Optional[int] = None) -> int:
+        """Drop stale entries and return how many rows were removed.
+
+        Entries unused for more than max_age_days are removed. If the text
+        cache is still larger than max_text_bytes, the least recently used
+        texts are dropped until it fits. Texts and results whose content hash
+        no file points to any more are removed as well.
+        """
+        removed = 0
+        with self._lock:
+            if max_age_days is not None:
+                cutoff = time.time() - max_age_days * 86400
+                removed += self._conn.execute("DELETE FROM files WHERE last_seen < ?", (cutoff,)).rowcount
+                removed += self._conn.execute("DELETE FROM texts WHERE last_used < ?", (cutoff,)).rowcount
+                removed += self._conn.execute("DELETE FROM results WHERE last_used < ?", (cutoff,)).rowcount
+
+            if max_text_bytes is not None:
+                total = self._conn.execute("SELECT COALESCE(SUM(LENGTH(text)), 0) FROM texts").fetchone()[0]
+                rows = self._conn.execute("SELECT content_hash, LENGTH(text) FROM texts ORDER BY last_used")
+                stale = []
+                for content_hash, size in rows:
+                    if total <= max_text_bytes:
+                        break
+                    stale.append((content_hash,))
+                    total -= size
+                removed += self._conn.executemany("DELETE FROM texts WHERE content_hash = ?", stale).rowcount
+
+            for table in ("texts", "results"):
+                removed += self._conn.execute(
+                    f"DELETE FROM {table} WHERE content_hash NOT IN (SELECT content_hash FROM files)"
+                ).rowcount
+            self._conn.commit()
+        return removed
+
+    def compact(self):
+        """Reclaim space freed by evict()."""
+        with self._lock:
+            self._conn.commit()
+            self._conn.execute("VACUUM")
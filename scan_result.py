@@ -0,0 +1,18 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+
+@dataclass
+class ScanResult:
+    """One scanned file with everything the report needs, so writers never re-read it."""
+    file_path: str
+    pii_data: Dict[str, List[str]] = field(default_factory=dict)
+    file_hash: Optional[str] = None  # SHA-256 of the content, as written to the report
+    size: Optional[int] = None
+    mtime: Optional[float] = None
+    mime_type: Optional[str] = None
+    pii_tiers: Dict[str, List[str]] = field(default_factory=dict)  # Tier that found each value in pii_data
+    seconds_saved: float = 0.0  # Estimated NER time skipped by tiered analysis
+    duplicate_of: Optional[str] = None  # Path whose scan was reused because the content is identical
+    limits: Dict[str, str] = field(default_factory=dict)  # Resource limits the file ran into: limit -> what happened
+    quarantined: bool = False  # The file's worker was killed or crashed, so it has no results at all
@@ -1,54 +1,118 @@
+import logging
+import threading
 import cv2
 import numpy as np
 
-def CropSpace(img):
-    """Crop whitespace from an OpenCV image."""
+WHITE_LEVEL = 200        # Pixels brighter than this count as whitespace
+CONTENT_LEVEL = 240      # Pixels darker than this count as content when cropping
+WHITESPACE_RATIO = 0.7   # If >70% whitespace, crop before OCR
+ANALYSIS_MAX_SIDE = 1024  # Whitespace/bounding-box analysis runs on a copy no larger than this
+
+_buffers = threading.local()  # Per-thread scratch buffers for the downscaled analysis copy
+
+logger = logging.getLogger(__name__)
+
+
+def to_gray(img):
+    """Convert a BGR/BGRA image to grayscale, leaving grayscale input untouched."""
+    if img.ndim == 2:
+        return img
+    code = cv2.COLOR_BGRA2GRAY if img.shape[2] == 4 else cv2.COLOR_BGR2GRAY
+    return cv2.cvtColor(img, code)
+
+
+def _scratch(name, shape):
+    """Reuse a per-thread uint8 buffer when consecutive images share a size (typical for scans)."""
+    buffer = getattr(_buffers, name, None)
+    if buffer is None or buffer.shape != shape:
+        buffer = np.empty(shape, dtype=np.uint8)
+        setattr(_buffers, name, buffer)
+    return buffer
+
+
+def _analysis_copy(gray):
+    """Downscale with area averaging, so isolated specks fade instead of counting as content."""
+    height, width = gray.shape
+    scale = min(1.0, ANALYSIS_MAX_SIDE / max(height, width))
+    if scale == 1.0:
+        return gray, 1.0
+    size = (max(1, int(width * scale)), max(1, int(height * scale)))
+    small = cv2.resize(gray, size, dst=_scratch("small", (size[1], size[0])), interpolation=cv2.INTER_AREA)
+    return small, scale
+
+
+def analyze(gray):
+    """Return (white_ratio, content_box) for a grayscale image.
+
+    Both are computed on a downscaled copy. The content box is the extent
+    of all rows/columns holding content (row/column projections), mapped
+    back to full resolution as (x, y, w, h), or None for a blank image.
+    """
+    small, scale = _analysis_copy(gray)
+    white_ratio = np.count_nonzero(small > WHITE_LEVEL) / small.size
+
+    content = np.less(small, CONTENT_LEVEL, out=_scratch("mask", small.shape).view(bool))
+    rows = np.flatnonzero(content.any(axis=1))
+    cols = np.flatnonzero(content.any(axis=0))
+    if rows.size == 0:
+        return white_ratio, None
+
+    # Map back with a one-pixel margin of the analysis copy, so rounding never clips content.
+    height, width = gray.shape
+    x0 = max(0, int((cols[0] - 1) / scale))
+    y0 = max(0, int((rows[0] - 1) / scale))
+    x1 = min(width, int(np.ceil((cols[-1] + 2) / scale)))
+    y1 = min(height, int(np.ceil((rows[-1] + 2) / scale)))
+    return white_ratio, (x0, y0, x1 - x0, y1 - y0)
+
+
+def preprocess(img):
+    """Grayscale an image once and crop surrounding whitespace if it is mostly empty.
+
+    Returns the grayscale image ready for OCR (a view into the converted
+    image when cropped).
+    """
     if img is None:
-        print("[ERROR] Invalid image input for CropSpace.")
+        logger.error("Invalid image input for preprocessing.")
         return None
 
-    ## (1) convert to grayscale and threshold
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    _, threshed = cv2.threshold(gray, 240, 255, cv2.THRESH_BINARY_INV)
+    gray = to_gray(img)
+    white_ratio, box = analyze(gray)
+    if white_ratio <= WHITESPACE_RATIO:
+        return gray
+    if box is None:
+        logger.warning("No significant content found in image.")
+        return gray  # Return original image if no text found
+    x, y, w, h = box
+    return gray[y:y + h, x:x + w]
 
-    ## (2) Morphological operations to remove noise
-    kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (11,11))
-    morphed = cv2.morphologyEx(threshed, cv2.MORPH_CLOSE, kernel)
 
-    ## (3) Find the largest contour
-    cnts = cv2.findContours(morphed, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)[-2]
+def CropSpace(img):
+    """Crop whitespace from an OpenCV image."""
+    if img is None:
+        logger.error("Invalid image input for CropSpace.")
+        return None
 
-    if not cnts:
-        print("[WARNING] No significant content found in image.")
+    _, box = analyze(to_gray(img))
+    if box is None:
+        logger.warning("No significant content found in image.")
         return img  # Return original image if no text found
 
-    cnt = max(cnts, key=cv2.contourArea)  # Get the largest contour
-
-    ## (4) Crop to bounding box
-    x, y, w, h = cv2.boundingRect(cnt)
-    cropped = img[y:y+h, x:x+w]
+    x, y, w, h = box
+    return img[y:y + h, x:x + w]
 
-    return cropped  # ✅ Return the cropped image
 
 def is_mostly_whitespace(image_cv) -> bool:
     """Detects if an image has a large amount of empty space."""
-    gray = cv2.cvtColor(image_cv, cv2.COLOR_BGR2GRAY)
-    _, threshold = cv2.threshold(gray, 200, 255, cv2.THRESH_BINARY)
-    
-    white_pixels = np.sum(threshold == 255)
-    total_pixels = threshold.size
-    white_ratio = white_pixels / total_pixels
+    white_ratio, _ = analyze(to_gray(image_cv))
+    return white_ratio > WHITESPACE_RATIO
 
-    return white_ratio > 0.7  # If >70% whitespace, crop before OCR
 
 def wrapper(image_cv):
-    flag=0
-    if is_mostly_whitespace(image_cv):
-        # print("yes image is whitespace")
-        flag=1
-        return CropSpace(image_cv), flag
-    else:
-        return image_cv, flag
-# img=cv2.imread("001.png")
-# img=wrapper(img)
-# cv2.imwrite("002.png",img)
\ No newline at end of file
+    """Kept for callers of the old API: returns (image, flag) with flag=1 when cropped."""
+    gray = to_gray(image_cv)
+    white_ratio, box = analyze(gray)
+    if white_ratio > WHITESPACE_RATIO and box is not None:
+        x, y, w, h = box
+        return image_cv[y:y + h, x:x + w], 1
+    return image_cv, 0
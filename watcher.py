@@ -0,0 +1,283 @@
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from input_handler import InputHandler
+
+logger = logging.getLogger(__name__)
+
+DEBOUNCE_SECONDS = 2.0       # A changed path is scanned once it has been quiet this long
+MAX_DELAY_SECONDS = 30.0     # ... or this long after its first change, if it keeps changing
+POLL_INTERVAL_SECONDS = 5.0  # Polling fallback: time between snapshots of the tree
+WAIT_SLICE_SECONDS = 1.0     # Longest wait for events before checking whether to stop
+
+CHANGED, DELETED, RESCAN = "changed", "deleted", "rescan"
+
+# inotify(7)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_EXCL_UNLINK = 0x04000000
+IN_ISDIR = 0x40000000
+INOTIFY_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len; followed by len bytes of name
+INOTIFY_READ_BYTES = 64 * 1024
+
+
+@dataclass
+class ChangeBatch:
+    """Paths whose changes have settled. rescan means events were lost and the whole tree must be rescanned."""
+    changed: List[str] = field(default_factory=list)
+    deleted: List[str] = field(default_factory=list)
+    rescan: bool = False
+
+
+def _walk(handler: InputHandler, path: str, depth: int,
+          enter: Optional[Callable[[str, int], bool]] = None) -> Iterator[os.DirEntry]:
+    """Files below `path` in the directories the walk would enter; enter(directory, depth) can veto one."""
+    pending = [(path, depth)]
+    while pending:
+        directory, level = pending.pop()
+        if enter is not None and not enter(directory, level):
+            continue
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if handler.wants_directory(entry.path, level + 1):
+                                pending.append((entry.path, level + 1))
+                        elif handler.include_hidden or not entry.name.startswith("."):
+                            yield entry
+                    except OSError:
+                        continue  # Entry vanished
+        except OSError:
+            continue  # Directory vanished or can't be listed
+
+
+class InotifyWatcher:
+    """Change events from Linux inotify, with one watch per directory the walk enters."""
+
+    MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE \
+        | IN_ONLYDIR | IN_DONT_FOLLOW | IN_EXCL_UNLINK
+
+    def __init__(self, handlers: List[InputHandler]):
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify is only available on Linux")
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, f"inotify_init1: {os.strerror(error)}")
+        self._directories: Dict[int, Tuple[str, InputHandler, int]] = {}  # wd -> (path, handler, depth)
+        self._limit_warned = False
+        try:
+            for handler in handlers:
+                for _ in _walk(handler, handler.base_path, 0, lambda d, level, h=handler: self._watch(d, h, level, True)):
+                    pass
+        except OSError:
+            self.close()
+            raise
+        logger.info("Watching %d directories with inotify.", len(self._directories))
+
+    def _watch(self, directory: str, handler: InputHandler, depth: int, strict: bool = False) -> bool:
+        """Add a watch before the directory is listed, so no file created meanwhile is missed."""
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), self.MASK)
+        if wd >= 0:
+            self._directories[wd] = (directory, handler, depth)
+            return True
+        error = ctypes.get_errno()
+        if error == errno.ENOSPC:
+            message = "inotify watch limit reached (raise fs.inotify.max_user_watches)"
+            if strict:
+                raise OSError(error, message)
+            if not self._limit_warned:
+                logger.warning("%s: %s and the directories created after it are not watched.", message, directory)
+                self._limit_warned = True
+        return False  # Also when the directory vanished or can't be read
+
+    def _unwatch(self, directory: str):
+        """Drop the watches of a directory moved or deleted away, and of everything below it."""
+        prefix = directory + os.sep
+        for wd, (path, _handler, _depth) in list(self._directories.items()):
+            if path == directory or path.startswith(prefix):
+                self._libc.inotify_rm_watch(self._fd, wd)
+                del self._directories[wd]
+
+    def read(self, timeout: float) -> List[Tuple[str, str]]:
+        """(kind, path) events that arrived within `timeout` seconds."""
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data = os.read(self._fd, INOTIFY_READ_BYTES)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _cookie, length = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+            events += self._translate(wd, mask, name)
+        return events
+
+    def _translate(self, wd: int, mask: int, name: str) -> List[Tuple[str, str]]:
+        if mask & IN_Q_OVERFLOW:
+            return [(RESCAN, "")]
+        if mask & IN_IGNORED:
+            self._directories.pop(wd, None)  # The kernel removed the watch
+            return []
+        if wd not in self._directories:
+            return []
+        directory, handler, depth = self._directories[wd]
+        path = os.path.join(directory, name)
+        if mask & IN_ISDIR:
+            if mask & (IN_MOVED_FROM | IN_DELETE):
+                self._unwatch(path)
+                return [(DELETED, path)]
+            if mask & (IN_CREATE | IN_MOVED_TO) and handler.wants_directory(path, depth + 1):
+                # Files may have been created, or moved in with the directory, before it was watched.
+                enter = lambda d, level: self._watch(d, handler, level)  # noqa: E731
+                return [(CHANGED, entry.path) for entry in _walk(handler, path, depth + 1, enter)]
+            return []
+        if mask & (IN_MOVED_FROM | IN_DELETE):
+            return [(DELETED, path)]
+        return [(CHANGED, path)]
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class PollingWatcher:
+    """Change events from comparing snapshots of the tree (size, mtime, inode of each file) every interval."""
+
+    def __init__(self, handlers: List[InputHandler], interval: float = POLL_INTERVAL_SECONDS):
+        self.handlers = handlers
+        self.interval = interval
+        self._snapshot = self._take()
+        self._next = time.monotonic() + interval
+        logger.info("Watching %d files by polling every %.1fs.", len(self._snapshot), interval)
+
+    def _take(self) -> Dict[str, Tuple[int, int, int]]:
+        snapshot = {}
+        for handler in self.handlers:
+            for entry in _walk(handler, handler.base_path, 0):
+                try:
+                    if entry.is_file(follow_symlinks=False):
+                        stat = entry.stat(follow_symlinks=False)
+                        snapshot[entry.path] = (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+                except OSError:
+                    continue
+        return snapshot
+
+    def read(self, timeout: float) -> List[Tuple[str, str]]:
+        """(kind, path) events found by the next snapshot, if it is due within `timeout` seconds."""
+        wait = self._next - time.monotonic()
+        if wait > timeout:
+            time.sleep(timeout)
+            return []
+        time.sleep(max(0.0, wait))
+        snapshot = self._take()
+        self._next = time.monotonic() + self.interval
+        events = [(CHANGED, path) for path, signature in snapshot.items() if self._snapshot.get(path) != signature]
+        events += [(DELETED, path) for path in self._snapshot.keys() - snapshot.keys()]
+        self._snapshot = snapshot
+        return events
+
+    def close(self):
+        pass
+
+
+class ChangeBatcher:
+    """Debounces change events: a path is released once it has had no event for `debounce` seconds.
+
+    Events for the same path are coalesced and the last one wins (created
+    then deleted is reported as deleted). A path that keeps changing is
+    released anyway max_delay seconds after its first event, so a file
+    written continuously still gets scanned.
+    """
+
+    def __init__(self, debounce: float = DEBOUNCE_SECONDS, max_delay: float = MAX_DELAY_SECONDS):
+        self.debounce = debounce
+        self.max_delay = max(max_delay, debounce)
+        self._pending: Dict[str, Tuple[str, float, float]] = {}  # path -> (kind, first event, last event)
+        self._rescan = False
+
+    def add(self, kind: str, path: str, now: float):
+        if kind == RESCAN:
+            self._rescan = True
+            return
+        first = self._pending[path][1] if path in self._pending else now
+        self._pending[path] = (kind, first, now)
+
+    def _deadline(self, first: float, last: float) -> float:
+        return min(last + self.debounce, first + self.max_delay)
+
+    def due(self, now: float) -> Optional[ChangeBatch]:
+        """The settled changes, or None if nothing is due yet."""
+        batch = ChangeBatch(rescan=self._rescan)
+        for path, (kind, first, last) in list(self._pending.items()):
+            if self._deadline(first, last) <= now:
+                (batch.deleted if kind == DELETED else batch.changed).append(path)
+                del self._pending[path]
+        self._rescan = False
+        return batch if batch.changed or batch.deleted or batch.rescan else None
+
+    def wait(self, now: float) -> float:
+        """Seconds until the next path is due (or the longest wait when nothing is pending)."""
+        if self._rescan:
+            return 0.0
+        if not self._pending:
+            return WAIT_SLICE_SECONDS
+        deadline = min(self._deadline(first, last) for _kind, first, last in self._pending.values())
+        return min(WAIT_SLICE_SECONDS, max(0.0, deadline - now))
+
+
+def open_watcher(handlers: List[InputHandler], backend: str = "auto", poll_interval: float = POLL_INTERVAL_SECONDS):
+    """Start watching the handlers' trees: with inotify ("inotify", or "auto" where available) or by polling ("poll").
+
+    Open the watcher before the baseline scan, so changes made while it
+    runs are picked up afterwards.
+    """
+    if backend != "poll":
+        try:
+            return InotifyWatcher(handlers)
+        except OSError as e:
+            if backend == "inotify":
+                raise
+            logger.warning("inotify is not usable (%s), polling every %.1fs instead.", e, poll_interval)
+    return PollingWatcher(handlers, poll_interval)
+
+
+def iter_batches(watcher, stop: Optional[threading.Event] = None, debounce: float = DEBOUNCE_SECONDS,
+                 max_delay: float = MAX_DELAY_SECONDS) -> Iterator[ChangeBatch]:
+    """Yield batches of settled changes from `watcher` until `stop` is set."""
+    stop = stop or threading.Event()
+    batcher = ChangeBatcher(debounce, max_delay)
+    while not stop.is_set():
+        for kind, path in watcher.read(batcher.wait(time.monotonic())):
+            batcher.add(kind, path, time.monotonic())
+        batch = batcher.due(time.monotonic())
+        if batch:
+            yield batch